@@ -1,90 +1,143 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from collections import Counter
 import json
 
-# 读取模拟数据
-df = pd.read_excel('simulated_samples.xlsx')
-
-print("=== 模拟数据分析 ===")
-print(f"数据形状: {df.shape}")
-print(f"列名: {list(df.columns)}")
-
-# 数值列统计
-print("\n=== 数值列统计 ===")
-numeric_cols = df.select_dtypes(include=['int64']).columns
-for col in numeric_cols:
-    stats = df[col].describe()
-    print(f"\n{col}:")
-    print(f"  均值: {stats['mean']:.2f}")
-    print(f"  标准差: {stats['std']:.2f}")
-    print(f"  最小值: {stats['min']}")
-    print(f"  最大值: {stats['max']}")
-    print(f"  中位数: {stats['50%']:.2f}")
-
-# 分类变量分布
-print("\n=== 分类变量分布 ===")
-categorical_cols = ['age_group', 'gender', 'internet_access', 'education_level', 'economic_status']
-for col in categorical_cols:
-    print(f"\n{col} 分布:")
-    value_counts = df[col].value_counts()
-    for val, count in value_counts.items():
-        print(f"  {val}: {count} ({count/len(df)*100:.1f}%)")
-
-# 检查数据质量
-print("\n=== 数据质量检查 ===")
-print(f"缺失值统计:")
-print(df.isnull().sum())
-
-# 相关性分析
-print("\n=== 数值变量相关性 ===")
-correlation_matrix = df[numeric_cols].corr()
-print("相关性最高的变量对:")
-correlations = []
-for i in range(len(numeric_cols)):
-    for j in range(i+1, len(numeric_cols)):
-        corr = correlation_matrix.iloc[i, j]
-        correlations.append((numeric_cols[i], numeric_cols[j], abs(corr)))
-
-correlations.sort(key=lambda x: x[2], reverse=True)
-for var1, var2, corr in correlations[:10]:
-    print(f"  {var1} vs {var2}: {corr:.3f}")
-
-print("\n=== 可视化建议 ===")
-print("1. 密集数据点点阵:")
-print("   - 适合变量: age_group, gender, internet_access")
-print("   - 可以用颜色编码不同的群体特征")
-print("   - 支持条件筛选和区域高亮")
-
-print("\n2. 箱线图与点图结合:")
-print(f"   - 数值变量数量: {len(numeric_cols)}")
-print("   - 适合按分类变量分组显示分布")
-print("   - 可以展示中位数、异常值等统计信息")
-
-print("\n3. 数据质量:")
-if df.isnull().sum().sum() == 0:
-    print("   ✓ 无缺失值，数据完整")
-else:
-    print(f"   ⚠ 存在缺失值，需要处理")
-
-print(f"\n4. 样本量: {len(df)} - 适合统计分析")
-
-# 保存分析结果
-analysis_result = {
-    'data_shape': df.shape,
-    'numeric_columns': list(numeric_cols),
-    'categorical_columns': categorical_cols,
-    'correlations': correlations[:10],
-    'recommendations': [
-        '密集数据点点阵 - 支持条件筛选',
-        '箱线图+点图 - 展示分布特征',
-        '交互式仪表板 - 多维度探索'
-    ]
-}
-
-with open('simulated_data_analysis.json', 'w', encoding='utf-8') as f:
-    json.dump(analysis_result, f, ensure_ascii=False, indent=2)
-
-print("\n分析结果已保存到 simulated_data_analysis.json")
+SOURCE_PATH = 'simulated_samples.xlsx'
+OUTPUT_PATH = 'simulated_data_analysis.json'
+
+CORRELATION_BLOCK_SIZE = 1024
+
+
+def _select_top(values, rows, cols, k):
+    """
+    从候选变量对中选出 |r| 最大的 k 对，返回 (values, rows, cols)。
+
+    argpartition 找到第 k 大的值作为阈值，与阈值相等的候选全部保留后再排序，
+    因此并列时与逐对枚举后稳定排序的结果一致（先比 |r|，再按列顺序）。
+    """
+    keep = ~np.isnan(values)
+    values, rows, cols = values[keep], rows[keep], cols[keep]
+    if len(values) > k:
+        threshold = values[np.argpartition(-values, k - 1)[k - 1]]
+        keep = values >= threshold
+        values, rows, cols = values[keep], rows[keep], cols[keep]
+    order = np.lexsort((cols, rows, -values))[:k]
+    return values[order], rows[order], cols[order]
+
+
+def top_correlations(df, k=10, block_size=CORRELATION_BLOCK_SIZE):
+    """
+    返回绝对相关系数最高的 k 对变量 [(变量1, 变量2, |r|)]，按 |r| 降序排列。
+
+    先把各列标准化，再按列分块计算 Z_i^T Z_j 的上三角部分，每块只保留前 k 个
+    候选，不生成完整的相关矩阵，几千列的宽表也只占用 block_size^2 的额外内存。
+    含缺失值时退回 pandas 的成对相关；常数列的相关系数为 NaN，不参与排名。
+    """
+    columns = list(df.columns)
+    values = df.to_numpy(dtype=float)
+    best = (np.empty(0), np.empty(0, dtype=int), np.empty(0, dtype=int))
+
+    if np.isnan(values).any():
+        matrix = df.corr().to_numpy()
+        rows, cols = np.triu_indices(len(columns), k=1)
+        best = _select_top(np.abs(matrix[rows, cols]), rows, cols, k)
+    else:
+        centered = values - values.mean(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = centered / np.sqrt((centered ** 2).sum(axis=0))
+        for start_i in range(0, len(columns), block_size):
+            z_i = z[:, start_i:start_i + block_size]
+            for start_j in range(start_i, len(columns), block_size):
+                block = np.abs(z_i.T @ z[:, start_j:start_j + block_size])
+                rows, cols = np.indices(block.shape)
+                rows, cols = rows.ravel() + start_i, cols.ravel() + start_j
+                upper = cols > rows
+                candidates = _select_top(block.ravel()[upper], rows[upper], cols[upper], k)
+                best = _select_top(*(np.concatenate(pair) for pair in zip(best, candidates)), k)
+
+    return [(columns[i], columns[j], float(v)) for v, i, j in zip(*best)]
+
+
+def analyze(df, output_path=OUTPUT_PATH):
+    """输出模拟数据的统计、分布与相关性，并保存分析结果"""
+    print("=== 模拟数据分析 ===")
+    print(f"数据形状: {df.shape}")
+    print(f"列名: {list(df.columns)}")
+
+    # 数值列统计
+    print("\n=== 数值列统计 ===")
+    numeric_cols = df.select_dtypes(include=['int64']).columns
+    for col in numeric_cols:
+        stats = df[col].describe()
+        print(f"\n{col}:")
+        print(f"  均值: {stats['mean']:.2f}")
+        print(f"  标准差: {stats['std']:.2f}")
+        print(f"  最小值: {stats['min']}")
+        print(f"  最大值: {stats['max']}")
+        print(f"  中位数: {stats['50%']:.2f}")
+
+    # 分类变量分布
+    print("\n=== 分类变量分布 ===")
+    categorical_cols = ['age_group', 'gender', 'internet_access', 'education_level', 'economic_status']
+    for col in categorical_cols:
+        print(f"\n{col} 分布:")
+        value_counts = df[col].value_counts()
+        for val, count in value_counts.items():
+            print(f"  {val}: {count} ({count/len(df)*100:.1f}%)")
+
+    # 检查数据质量
+    print("\n=== 数据质量检查 ===")
+    print(f"缺失值统计:")
+    print(df.isnull().sum())
+
+    # 相关性分析
+    print("\n=== 数值变量相关性 ===")
+    print("相关性最高的变量对:")
+    correlations = top_correlations(df[numeric_cols], k=10)
+    for var1, var2, corr in correlations:
+        print(f"  {var1} vs {var2}: {corr:.3f}")
+
+    print("\n=== 可视化建议 ===")
+    print("1. 密集数据点点阵:")
+    print("   - 适合变量: age_group, gender, internet_access")
+    print("   - 可以用颜色编码不同的群体特征")
+    print("   - 支持条件筛选和区域高亮")
+
+    print("\n2. 箱线图与点图结合:")
+    print(f"   - 数值变量数量: {len(numeric_cols)}")
+    print("   - 适合按分类变量分组显示分布")
+    print("   - 可以展示中位数、异常值等统计信息")
+
+    print("\n3. 数据质量:")
+    if df.isnull().sum().sum() == 0:
+        print("   ✓ 无缺失值，数据完整")
+    else:
+        print(f"   ⚠ 存在缺失值，需要处理")
+
+    print(f"\n4. 样本量: {len(df)} - 适合统计分析")
+
+    # 保存分析结果
+    analysis_result = {
+        'data_shape': df.shape,
+        'numeric_columns': list(numeric_cols),
+        'categorical_columns': categorical_cols,
+        'correlations': correlations,
+        'recommendations': [
+            '密集数据点点阵 - 支持条件筛选',
+            '箱线图+点图 - 展示分布特征',
+            '交互式仪表板 - 多维度探索'
+        ]
+    }
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(analysis_result, f, ensure_ascii=False, indent=2)
+
+    print(f"\n分析结果已保存到 {output_path}")
+
+    return analysis_result
+
+
+if __name__ == '__main__':
+    # 读取模拟数据
+    analyze(pd.read_excel(SOURCE_PATH))
@@ -10,59 +10,82 @@ from wordcloud import WordCloud
 import matplotlib.pyplot as plt
 import io
 import base64
+import os
+import sys
 from collections import Counter
 import pandas as pd
 import visdcc
-
-# 加载模拟数据
-try:
-    simulated_df = pd.read_csv('simulated_samples_clean.csv')
+from survey_tables import load_tables, lookup_values
+import survey_store
+from fix_encoding import CATEGORY_MAPPINGS
+import traffic_capture
+import callback_cache
+import callback_pool
+import warmup
+import callback_metrics
+import server_timing
+import request_profiler
+import memory_report
+from dataset_manager import DatasetManager, install_events
+
+SIMULATED_DATA_PATH = 'simulated_samples_clean.csv'
+
+
+def load_simulated_samples(path):
+    """读取并整理模拟样本，数据热更新时在后台线程中重新调用（见 dataset_manager.py）"""
+    df = pd.read_csv(path)
 
     # CSV文件列名已经是英文，无需映射
 
     # 标准化分类字段，便于前端筛选
-    category_mappings = {
-        'internet_access': {
-            '有接入互联网': 'Has Internet Access',
-            '没有接入互联网': 'No Internet Access'
-        },
-        'internet_type': {
-            '手机流动数据': 'Mobile Data',
-            '家居宽带': 'Home Broadband',
-            '公共Wi-Fi': 'Public Wi-Fi'
-        },
-        'education_level': {
-            '小学或以下': 'Primary or Below',
-            '初中': 'Lower Secondary',
-            '高中': 'Upper Secondary',
-            '专上教育': 'Tertiary',
-            '研究生及以上': 'Postgraduate+'
-        },
-        'economic_status': {
-            '就业人口': 'Employed',
-            '退休人口': 'Retired',
-            '待业人口': 'Unemployed',
-            '其他非劳动力人口': 'Non-labour Force'
-        }
-    }
-
-    for col, mapping in category_mappings.items():
-        if col in simulated_df.columns:
-            simulated_df[col] = simulated_df[col].replace(mapping)
+    for col, mapping in CATEGORY_MAPPINGS.items():
+        if col in df.columns:
+            df[col] = df[col].replace(mapping)
 
     # 统一性别字段
-    if 'gender' in simulated_df.columns:
-        simulated_df['gender'] = simulated_df['gender'].replace({'男': 'male', '女': 'female'}).str.lower()
+    if 'gender' in df.columns:
+        df['gender'] = df['gender'].replace({'男': 'male', '女': 'female'}).str.lower()
 
     # 预计算用于散点图的轻微抖动值（避免每次回调重新生成）
     rng = np.random.default_rng(42)
-    if {'mobile_phone', 'laptop_computer'}.issubset(simulated_df.columns):
-        simulated_df['mobile_phone_jitter'] = simulated_df['mobile_phone'] + rng.normal(0, 0.08, len(simulated_df))
-        simulated_df['laptop_computer_jitter'] = simulated_df['laptop_computer'] + rng.normal(0, 0.08, len(simulated_df))
-    print(f"Simulated data loaded successfully: {simulated_df.shape}")
+    if {'mobile_phone', 'laptop_computer'}.issubset(df.columns):
+        df['mobile_phone_jitter'] = df['mobile_phone'] + rng.normal(0, 0.08, len(df))
+        df['laptop_computer_jitter'] = df['laptop_computer'] + rng.normal(0, 0.08, len(df))
+    print(f"Simulated data loaded successfully: {df.shape}")
+    return df
+
+
+# 加载模拟数据；文件更新后由 simulated_samples 替换 simulated_df，加载失败时为 None
+simulated_samples = DatasetManager(load_simulated_samples, [SIMULATED_DATA_PATH])
+simulated_df = simulated_samples.current.frame
+
+
+def use_simulated_snapshot(snapshot):
+    """替换样本数据，再更新缓存版本（顺序保证新版本的缓存项只由新数据计算）"""
+    global simulated_df
+    simulated_df = snapshot.frame
+    callback_cache.refresh_version()
+
+
+simulated_samples.on_swap(use_simulated_snapshot)
+
+# 加载统计局原始表格（长格式，见 survey_tables.py），失败时图表使用内置数值
+try:
+    survey_tables = load_tables()
+    print(f"Survey tables loaded successfully: {len(survey_tables)} values")
 except Exception as e:
-    print(f"Error loading simulated data: {e}")
-    simulated_df = None
+    print(f"Error loading survey tables: {e}")
+    survey_tables = None
+
+# 各年份的统计表（按年份分区，见 survey_store.py）：启动时只读取已导入的分区，
+# 导入新增的年度工作簿由 pipeline.py 或 python survey_store.py 完成；
+# 趋势章节据此绘制多年序列，只有一年的数据时使用内置数值
+try:
+    survey_history = survey_store.load_store()
+    print(f"Survey store loaded successfully: years {survey_store.store_years(survey_history)}")
+except Exception as e:
+    print(f"Error loading survey store: {e}")
+    survey_history = None
 
 USAGE_ACTIVITY_LABELS = {
     'mobile_phone': 'Mobile Phone Usage',
@@ -592,7 +615,9 @@ app.layout = html.Div([
                                   'color': '#495057', 'cursor': 'pointer', 'marginRight': '10px'}),
                 html.Span("Leave filters empty to show all data", id='filter-status',
                          style={'fontFamily': 'Source Sans Pro', 'fontSize': '0.85em',
-                                'color': '#6c757d', 'fontStyle': 'italic'})
+                                'color': '#6c757d', 'fontStyle': 'italic'}),
+                # 样本数据版本，数据更新时由 assets/dataset_events.js 修改，触发第六章图表刷新
+                dcc.Store(id='dataset-version', data=simulated_samples.version)
             ], style={'marginBottom': '30px'}),
 
             # Visualization Area - Simulated Data Analysis
@@ -1190,7 +1215,10 @@ def update_usage_purpose_chart(*args):
             'Communication/Social', 'Entertainment', 'Mobile Banking/Payment',
             'Information Search', 'Government Services', 'Reading/News', 'Online Shopping'
         ]
-        users = [578.6, 547.3, 457.4, 449.2, 338.2, 258.6, 245.5]  # thousands
+        users = lookup_values(survey_tables, 3, '上网目的', [
+            '通讯/浏览社交平台', '娱乐', '银行服务/移动支付', '资讯搜寻',
+            '网上政府服务', '阅读报章、杂志及电子书', '购买商品及服务'
+        ]) or [578.6, 547.3, 457.4, 449.2, 338.2, 258.6, 245.5]  # thousands
         title = 'Internet Usage by Purpose'
         color_scheme = [academic_colors['primary'], academic_colors['muted'], academic_colors['secondary'], academic_colors['success'], academic_colors['accent'], academic_colors['warning'], academic_colors['highlight']]
 
@@ -1200,7 +1228,10 @@ def update_usage_purpose_chart(*args):
             'Food Delivery', 'Fashion/Apparel', 'Personal Care', 'Travel Services',
             'Home Goods', 'Electronics', 'Tickets/Events'
         ]
-        users = [151.9, 140.2, 41.4, 30.7, 30.5, 15.0, 13.9]  # thousands
+        users = lookup_values(survey_tables, 6, '商品及服务类别', [
+            '外卖餐饮', '衣履、手袋及相关配件', '个人护理用品', '旅游服务',
+            '家俱、家居用品及摆设', '电子及电器产品', '门票(电影、表演等)'
+        ]) or [151.9, 140.2, 41.4, 30.7, 30.5, 15.0, 13.9]  # thousands
         title = 'Online Shopping by Category'
         color_scheme = [academic_colors['accent'], academic_colors['warning'], academic_colors['highlight'], academic_colors['tertiary'], academic_colors['muted'], academic_colors['success'], academic_colors['primary']]
 
@@ -1723,6 +1754,90 @@ def update_analysis_insights(*args):
         html.P("🔄 Analysis updating, please wait...", style={'fontStyle': 'italic'})
     ])
 
+# 趋势章节的分析维度 -> 表2（手提电话、互联网及个人电脑使用者）中的维度与类别（中文 -> 显示名称）
+TREND_DIMENSIONS = {
+    'age_gender': ('岁组', {'15-24': '15-24', '25-34': '25-34', '35-44': '35-44', '45-54': '45-54',
+                           '55-64': '55-64', '65-74': '65-74', '≧75': '75+'}),
+    'education': ('学历', {'小学教育及以下': 'Primary or below', '初中教育': 'Junior secondary',
+                          '高中教育': 'Senior secondary', '高等教育': 'Higher education'}),
+    'economic': ('经济活动状况', {'就业人口': 'Employed', '非劳动人口': 'Not in labour force'}),
+}
+TREND_TITLES = {'age_gender': 'Age Groups', 'education': 'Education Level', 'economic': 'Economic Status'}
+
+
+def trend_history_figure(selected_analysis):
+    """数据仓中有两年以上数据时，按年份绘制各类别的互联网使用者；否则返回 None"""
+    years = survey_store.store_years(survey_history)
+    if len(years) < 2 or selected_analysis not in TREND_DIMENSIONS:
+        return None
+    dimension, labels = TREND_DIMENSIONS[selected_analysis]
+    series = survey_store.trend_series(survey_history, 2, '互联网使用者', dimension, list(labels))
+    if series is None:
+        return None
+
+    colors = [academic_colors[name] for name in ('primary', 'secondary', 'accent', 'highlight',
+                                                 'success', 'warning', 'tertiary')]
+    fig = go.Figure()
+    for index, (category, label) in enumerate(labels.items()):
+        fig.add_trace(go.Scatter(
+            x=series['value'].index,
+            y=series['value'][category],
+            name=label,
+            mode='lines+markers',
+            line=dict(color=colors[index % len(colors)], width=2),
+            # 第一年没有可比较的上一年，不显示变化
+            text=['' if pd.isna(delta) else f' ({delta:+.1f}k, {growth * 100:+.1f}%)'
+                  for delta, growth in zip(series['delta'][category], series['growth'][category])],
+            hovertemplate=f'{label}: %{{y:.1f}}k%{{text}}<extra></extra>'
+        ))
+
+    fig.update_layout(
+        title=dict(text=f"Internet Users by {TREND_TITLES[selected_analysis]}, {years[0]}–{years[-1]}",
+                   x=0.5, font=dict(family="Source Sans Pro", size=16, color="#2c3e50")),
+        xaxis=dict(title='Survey Year', tickmode='array', tickvals=years),
+        yaxis_title='Internet Users (thousand)',
+        hovermode='x unified',
+        clickmode='event',
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='white',
+        modebar_remove=['zoom', 'pan', 'select', 'lasso', 'zoomIn', 'zoomOut', 'autoScale', 'toImage'],
+        showlegend=True,
+        legend=dict(x=0.7, y=0.98, bgcolor='rgba(255,255,255,0.9)', bordercolor='rgba(0,0,0,0.1)', borderwidth=1, font=dict(family="Source Sans Pro", size=9, color="#2c3e50")),
+        font=dict(family="Source Sans Pro", size=10, color="#2c3e50"),
+        hoverlabel=dict(
+            bgcolor="white",
+            bordercolor="#3498db",
+            font=dict(family="Source Sans Pro", size=12, color="#2c3e50")
+        )
+    )
+    return fig
+
+
+def trend_history_insights(selected_analysis):
+    """最近一年相对上一年的变化：总数、增长最快与最慢的类别；没有可比较的年份时返回 None"""
+    if selected_analysis not in TREND_DIMENSIONS:
+        return None
+    dimension, labels = TREND_DIMENSIONS[selected_analysis]
+    changes = survey_store.latest_changes(survey_history, 2, '互联网使用者', dimension)
+    overall = survey_store.latest_changes(survey_history, 2, '互联网使用者', '总数')
+    if changes is None or overall is None:
+        return None
+    year, previous_year, rows = changes
+    rows = rows[rows.index.isin(list(labels))]
+    if rows.empty:
+        return None
+    total = overall[2].iloc[0]
+    fastest, slowest = rows.index[0], rows.index[-1]
+    return html.Div([
+        html.P(f"📈 Year-over-year Change ({previous_year}→{year}):", style={'fontWeight': '600', 'marginBottom': '10px'}),
+        html.P(f"Internet users reached {total['value']:.1f}k, {total['delta']:+.1f}k ({total['growth'] * 100:+.1f}%) "
+               f"compared with {previous_year}."),
+        html.P(f"Fastest growth by {TREND_TITLES[selected_analysis].lower()}: {labels[fastest]} "
+               f"({rows.at[fastest, 'growth'] * 100:+.1f}%); slowest: {labels[slowest]} "
+               f"({rows.at[slowest, 'growth'] * 100:+.1f}%).")
+    ])
+
+
 # Trend prediction chart callback
 @app.callback(
     Output('trend-prediction-chart', 'figure'),
@@ -1746,6 +1861,10 @@ def update_trend_prediction_chart(*args):
         else:
             selected_analysis = 'age_gender'
 
+    history = trend_history_figure(selected_analysis)
+    if history is not None:
+        return history
+
     # Technology usage distribution data by different dimensions
     if selected_analysis == 'age_gender':
         # Age and gender distribution
@@ -1876,6 +1995,12 @@ def update_trend_insights(*args):
         elif button_id == 'trend-long':
             selected_trend = 'long'
 
+    # 与趋势图的按钮对应：current 为岁组，short 为学历，medium 为经济活动状况
+    history = trend_history_insights({'current': 'age_gender', 'short': 'education',
+                                      'medium': 'economic'}.get(selected_trend))
+    if history is not None:
+        return history
+
     if selected_trend == 'current':
         return html.Div([
             html.P("📊 Current Status Overview:", style={'fontWeight': '600', 'marginBottom': '10px'}),
@@ -2129,9 +2254,12 @@ def update_policy_button_styles(*args):
      Output('filter-status', 'children')],
     [Input('simulated-age-filter', 'value'),
      Input('simulated-gender-filter', 'value'),
-     Input('reset-simulated-filters', 'n_clicks')]
+     Input('reset-simulated-filters', 'n_clicks'),
+     Input('dataset-version', 'data')]
 )
-def update_simulated_scatter_plot(selected_ages, selected_genders, reset_clicks):
+@callback_pool.offload
+def update_simulated_scatter_plot(selected_ages, selected_genders, reset_clicks, _dataset_version):
+    timer = server_timing.PhaseTimer()
     # Handle reset button
     ctx = dash.callback_context
     if ctx.triggered and 'reset-simulated-filters' in ctx.triggered[0]['prop_id']:
@@ -2145,6 +2273,7 @@ def update_simulated_scatter_plot(selected_ages, selected_genders, reset_clicks)
             return go.Figure(), [], [], "Leave filters empty to show all data"
 
         filtered_df = simulated_df.copy()
+        timer.mark('filter')
         # Create plot logic here
         plot_df = filtered_df.copy()
         if 'mobile_phone_jitter' in plot_df.columns:
@@ -2157,6 +2286,7 @@ def update_simulated_scatter_plot(selected_ages, selected_genders, reset_clicks)
         else:
             plot_df['laptop_for_plot'] = plot_df['laptop_computer']
         plot_df['gender_label'] = plot_df['gender'].str.title()
+        timer.mark('aggregate')
 
         age_order = ['3-14', '15-24', '25-34', '35-44', '45-54', '55-64', '65-74', '>=75']
         color_map = {
@@ -2187,6 +2317,7 @@ def update_simulated_scatter_plot(selected_ages, selected_genders, reset_clicks)
                                         '<b>Internet Access:</b> %{customdata[2]}<br><b>Mobile Usage:</b> %{customdata[3]:.2f}<br>'
                                         '<b>Laptop Usage:</b> %{customdata[4]:.2f}<br><b>Economic Status:</b> %{customdata[5]}<extra></extra>')
 
+        timer.mark('figure')
         status_msg = f"Showing all data ({len(filtered_df)} records)"
         return fig, [], [], status_msg
 
@@ -2206,6 +2337,8 @@ def update_simulated_scatter_plot(selected_ages, selected_genders, reset_clicks)
     if selected_genders:
         filtered_df = filtered_df[filtered_df['gender'].isin(selected_genders)]
 
+    timer.mark('filter')
+
     if filtered_df.empty:
         status_msg = f"No data matches current filters (0 records)"
         return go.Figure(), selected_ages, selected_genders, status_msg
@@ -2233,6 +2366,7 @@ def update_simulated_scatter_plot(selected_ages, selected_genders, reset_clicks)
     else:
         plot_df['laptop_for_plot'] = plot_df['laptop_computer']
     plot_df['gender_label'] = plot_df['gender'].str.title()
+    timer.mark('aggregate')
 
     age_order = ['3-14', '15-24', '25-34', '35-44', '45-54', '55-64', '65-74', '>=75']
     color_map = {
@@ -2296,15 +2430,19 @@ def update_simulated_scatter_plot(selected_ages, selected_genders, reset_clicks)
             '<b>Economic Status:</b> %{customdata[5]}<extra></extra>'
         )
     )
+    timer.mark('figure')
 
     return fig, selected_ages, selected_genders, status_msg
 
 @app.callback(
     Output('simulated-box-dot-plot', 'figure'),
     [Input('simulated-age-filter', 'value'),
-     Input('simulated-gender-filter', 'value')]
+     Input('simulated-gender-filter', 'value'),
+     Input('dataset-version', 'data')]
 )
-def update_simulated_box_dot_plot(selected_ages, selected_genders):
+@callback_pool.offload
+def update_simulated_box_dot_plot(selected_ages, selected_genders, _dataset_version):
+    timer = server_timing.PhaseTimer()
     selected_variable = 'mobile_phone'
     if simulated_df is None or simulated_df.empty:
         return go.Figure()
@@ -2322,11 +2460,14 @@ def update_simulated_box_dot_plot(selected_ages, selected_genders):
     if selected_genders:
         filtered_df = filtered_df[filtered_df['gender'].isin(selected_genders)]
 
+    timer.mark('filter')
+
     if filtered_df.empty:
         return go.Figure()
 
     age_order = ['3-14', '15-24', '25-34', '35-44', '45-54', '55-64', '65-74', '>=75']
     age_filtered = filtered_df[filtered_df['age_group'].isin(age_order)]
+    timer.mark('aggregate')
 
     fig = make_subplots(rows=1, cols=2, subplot_titles=('By Age Group', 'By Gender'))
 
@@ -2375,15 +2516,18 @@ def update_simulated_box_dot_plot(selected_ages, selected_genders):
     fig.update_xaxes(title_text="Gender", row=1, col=2)
     fig.update_yaxes(title_text="Usage Intensity", row=1, col=1)
     fig.update_yaxes(title_text="Usage Intensity", row=1, col=2)
+    timer.mark('figure')
 
     return fig
 
 @app.callback(
     Output('usage-pattern-ranking-chart', 'figure'),
     [Input('simulated-age-filter', 'value'),
-     Input('simulated-gender-filter', 'value')]
+     Input('simulated-gender-filter', 'value'),
+     Input('dataset-version', 'data')]
 )
-def update_usage_pattern_ranking_chart(selected_ages, selected_genders):
+def update_usage_pattern_ranking_chart(selected_ages, selected_genders, _dataset_version):
+    timer = server_timing.PhaseTimer()
     if simulated_df is None or simulated_df.empty:
         return go.Figure()
 
@@ -2400,6 +2544,8 @@ def update_usage_pattern_ranking_chart(selected_ages, selected_genders):
     if selected_genders:
         filtered_df = filtered_df[filtered_df['gender'].isin(selected_genders)]
 
+    timer.mark('filter')
+
     if len(filtered_df) < 5:
         return go.Figure()
 
@@ -2418,6 +2564,7 @@ def update_usage_pattern_ranking_chart(selected_ages, selected_genders):
 
     labels = [USAGE_ACTIVITY_LABELS.get(col, col.replace('_', ' ').title()) for col in averages.index]
     hover_format = '.1f' if is_fraction else '.2f'
+    timer.mark('aggregate')
 
     fig = go.Figure()
     fig.add_trace(go.Bar(
@@ -2451,11 +2598,39 @@ def update_usage_pattern_ranking_chart(selected_ages, selected_genders):
         font=dict(size=12, color='#7F8C8D'),
         text=f"Filtered sample size: {len(filtered_df):,} respondents"
     )
+    timer.mark('figure')
 
     return fig
 
+# 可选：采集回调请求用于回放（CAPTURE_CALLBACKS 环境变量，见 traffic_capture.py）
+traffic_capture.install_from_env(app.server)
+
+# 回调响应缓存（CALLBACK_CACHE_MB 环境变量，见 callback_cache.py），需在指标之前安装
+callback_cache.install_from_env(app)
+
+# /ready：worker 预热完成前返回 503（预热由 gunicorn.conf.py 在 worker 启动后开始，见 warmup.py）
+warmup.install_ready(app.server)
+
+# 回调指标：/metrics（Prometheus 格式）与 /admin/metrics（设置 METRICS_TOKEN 后注册），需在全部回调注册之后安装
+callback_metrics.install_from_env(app)
+
+# 回调响应的 Server-Timing 分段计时（SERVER_TIMING / SERVER_TIMING_LOG 环境变量，见 server_timing.py）
+server_timing.install_from_env(app)
+
+# 可选：按比例或按耗时采样分析回调请求（PROFILE_DIR 环境变量，见 request_profiler.py）
+request_profiler.install_from_env(app.server)
+
+# 样本数据热更新：/events/dataset 推送新版本；进程池子进程计算前同步到 worker 的数据版本
+install_events(app.server, simulated_samples,
+               [callback_metrics.callback_label(output_key) for output_key, entry in app.callback_map.items()
+                if any(item['id'] == 'dataset-version' for item in entry['inputs'])])
+callback_pool.sync_state(lambda: simulated_samples.version, simulated_samples.ensure)
+
+# /admin/memory：当前 worker 的内存构成（与 /metrics 一样需要 METRICS_TOKEN，见 memory_report.py）
+memory_report.install_from_env(app.server, sys.modules[__name__])
+
 if __name__ == '__main__':
-    import os
+    simulated_samples.watch_from_env()
     port = int(os.environ.get('PORT', 8050))
     app.run(
         debug=False,
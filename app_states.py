@@ -0,0 +1,145 @@
+"""
+枚举 app.py 中各章节按钮的所有状态，并在没有HTTP请求的情况下直接调用回调。
+
+静态导出、基准测试与缓存预热都通过这里驱动回调，保证它们看到的
+状态集合与线上页面一致。
+"""
+
+import inspect
+from contextlib import contextmanager
+
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+
+
+@contextmanager
+def trigger_context(prop_id=None, value=1):
+    """模拟 dash.callback_context：prop_id 为 None 时表示页面初次加载"""
+    triggered = [{'prop_id': prop_id, 'value': value}] if prop_id else []
+    token = context_value.set(AttributeDict(triggered_inputs=triggered))
+    try:
+        yield
+    finally:
+        context_value.reset(token)
+
+
+def _parse_outputs(output_key):
+    """把 callback_map 的键拆成 [(组件id, 属性)]，兼容多输出的 '..a.b...c.d..' 格式"""
+    if output_key.startswith('..') and output_key.endswith('..'):
+        parts = output_key[2:-2].split('...')
+    else:
+        parts = [output_key]
+    return [tuple(part.rsplit('.', 1)) for part in parts]
+
+
+def registered_callbacks(dash_app):
+    """
+    返回应用中注册的所有回调。
+
+    每项为 {'outputs': [(id, prop)], 'inputs': [(id, prop)], 'func': 原始函数}，
+    func 是去掉 Dash（以及 callback_metrics 等）包装后的原始函数，可以直接调用。
+    """
+    callbacks = []
+    for output_key, entry in dash_app.callback_map.items():
+        wrapped = entry['callback']
+        callbacks.append({
+            'outputs': _parse_outputs(output_key),
+            'inputs': [(item['id'], item['property']) for item in entry['inputs']],
+            'func': inspect.unwrap(wrapped),
+        })
+    return callbacks
+
+
+def find_component(layout, component_id):
+    """在布局树中按 id 查找组件"""
+    if isinstance(layout, (list, tuple)):
+        for child in layout:
+            found = find_component(child, component_id)
+            if found is not None:
+                return found
+        return None
+    if getattr(layout, 'id', None) == component_id:
+        return layout
+    children = getattr(layout, 'children', None)
+    if children is None or isinstance(children, (str, int, float)):
+        return None
+    return find_component(children, component_id)
+
+
+def default_input_values(dash_app, callbacks=None):
+    """各回调输入在布局中的初始值，键为 (id, prop)"""
+    values = {}
+    for callback in callbacks or registered_callbacks(dash_app):
+        for component_id, prop in callback['inputs']:
+            if prop == 'id':
+                values[(component_id, prop)] = component_id
+                continue
+            component = find_component(dash_app.layout, component_id)
+            values[(component_id, prop)] = getattr(component, prop, None) if component is not None else None
+    return values
+
+
+def run_callback(callback, triggered=None, values=None, defaults=None):
+    """
+    调用单个回调并返回与 outputs 一一对应的结果列表。
+
+    triggered 为触发的 (id, prop)，按钮的 n_clicks 会被置为 1；
+    values 可以覆盖其余输入（如下拉框选择），未覆盖的输入使用布局初始值。
+    """
+    values = values or {}
+    defaults = defaults or {}
+    args = []
+    for key in callback['inputs']:
+        if key in values:
+            args.append(values[key])
+        elif key == triggered and key[1] == 'n_clicks':
+            args.append(1)
+        else:
+            args.append(defaults.get(key))
+
+    prop_id = f'{triggered[0]}.{triggered[1]}' if triggered else None
+    with trigger_context(prop_id):
+        result = callback['func'](*args)
+
+    if len(callback['outputs']) == 1:
+        return [result]
+    return list(result)
+
+
+def clickable_buttons(dash_app, callbacks=None):
+    """所有作为回调输入的按钮 id（按布局中首次出现的顺序）"""
+    buttons = []
+    for callback in callbacks or registered_callbacks(dash_app):
+        for component_id, prop in callback['inputs']:
+            if prop == 'n_clicks' and component_id not in buttons:
+                buttons.append(component_id)
+    return buttons
+
+
+def iter_button_states(dash_app):
+    """
+    逐一产出 (状态名, {'id.prop': 输出值})。
+
+    'initial' 为页面初次加载时所有回调的输出；其后每个按钮一个状态，
+    只包含以该按钮为输入的回调在点击后产生的输出。
+    """
+    callbacks = registered_callbacks(dash_app)
+    defaults = default_input_values(dash_app, callbacks)
+
+    initial = {}
+    for callback in callbacks:
+        outputs = run_callback(callback, defaults=defaults)
+        for (component_id, prop), value in zip(callback['outputs'], outputs):
+            initial[f'{component_id}.{prop}'] = value
+    yield 'initial', initial
+
+    for button_id in clickable_buttons(dash_app, callbacks):
+        triggered = (button_id, 'n_clicks')
+        state = {}
+        for callback in callbacks:
+            if triggered not in callback['inputs']:
+                continue
+            outputs = run_callback(callback, triggered=triggered, defaults=defaults)
+            for (component_id, prop), value in zip(callback['outputs'], outputs):
+                state[f'{component_id}.{prop}'] = value
+        yield button_id, state
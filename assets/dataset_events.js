@@ -0,0 +1,42 @@
+// 样本数据更新后刷新第六章图表（服务端见 dataset_manager.py 的 /events/dataset）
+(function () {
+    if (!window.EventSource || location.protocol === 'file:') {
+        return;
+    }
+    // 页面中 dcc.Store('dataset-version') 的初始值，布局尚未加载时为 undefined
+    function initialVersion() {
+        try {
+            var api = window.dash_component_api;
+            var store = api && api.getLayout && api.getLayout('dataset-version');
+            return store && store.props ? store.props.data : undefined;
+        } catch (e) {
+            return undefined;
+        }
+    }
+
+    // 以页面的版本为基准订阅：页面渲染后、连接建立前数据已更新时，
+    // 服务端按 ?version= 比较后立即发出事件，图表随即刷新
+    function subscribe(current) {
+        var url = 'events/dataset' + (current ? '?version=' + encodeURIComponent(current) : '');
+        var source = new EventSource(url);
+        source.addEventListener('dataset', function (event) {
+            var version = JSON.parse(event.data).version;
+            if (version !== current && window.dash_clientside) {
+                window.dash_clientside.set_props('dataset-version', {data: version});
+            }
+            current = version;
+        });
+    }
+
+    // 布局由 dash-renderer 异步加载，等 dataset-version 出现后再订阅；页面中没有它时 60 秒后放弃
+    var attempts = 0;
+    var timer = setInterval(function () {
+        var version = initialVersion();
+        if (version !== undefined || ++attempts >= 300) {
+            clearInterval(timer);
+            if (version !== undefined) {
+                subscribe(version);
+            }
+        }
+    }, 200);
+})();
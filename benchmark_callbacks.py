@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+回调基准测试：直接调用 app.py 与 viz_simulated_data.py 的全部回调，
+记录延迟分位数、内存峰值与序列化后的响应大小，并与基线比较。
+
+参数网格由布局自动生成：
+- 页面初次加载（所有输入为布局初始值）；
+- 每个按钮点击一次；
+- 下拉框：多选下拉框取 {初始值, 第一项, 全部选项}，单选下拉框取全部选项，逐个遍历，
+  另加所有多选下拉框同时只选第一项的组合筛选；
+- 数据规模：读取样本数据的回调再在放大 --scales 倍的数据上各跑一遍。
+
+每个用例先跑一次预热，再计时 --repeats 次；内存峰值用 tracemalloc 单独跑一次，
+不影响计时。输出的 JSON 哈希用于确认优化没有改变图表内容。
+
+延迟按最快一次（min_ms）与基线比较：机器上的其他负载只会让某次调用变慢，最快一次最稳定。
+--update 时默认计时 UPDATE_REPEATS 次，计时用例再跑一轮，基线取两轮中较快的结果，
+并按两轮之间的差异设定延迟阈值，阈值不超过 MAX_LATENCY_MIN；有用例出错时不写入基线。
+检查时超过阈值的用例再重测 RECHECK_ROUNDS 轮，取各轮最快的结果，仍超过阈值才算回归。
+
+另在新进程中运行 memory_report.py --warm，把常驻内存的各组件（RSS、各包的存活分配、
+DataFrame、回调缓存、布局）记为 memory:<组件> 用例，某个组件增长超过阈值时同样报告回归。
+按包的统计只保留 requirements.txt 中的包及其依赖、标准库与本项目模块；环境里碰巧装了、
+被顺带导入的包（如 IPython、jedi）因机器而异，不计入基线。
+
+    python benchmark_callbacks.py                  # 运行并与基线比较，回归时退出码为 1
+    python benchmark_callbacks.py --update         # 运行并写入新基线
+    python benchmark_callbacks.py --filter radar   # 只跑名称包含 radar 的用例
+    python benchmark_callbacks.py --filter memory  # 只统计内存构成
+"""
+
+import argparse
+import gc
+import hashlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly
+import dash
+from dash._utils import to_json
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
+
+import app
+import memory_report
+import viz_simulated_data
+from app_states import (registered_callbacks, default_input_values, run_callback,
+                        find_component, clickable_buttons)
+
+BASELINE_PATH = 'callback_benchmark.json'
+REQUIREMENTS_PATH = 'requirements.txt'
+DEFAULT_REPEATS = 10
+# --update 记录基线时的默认计时次数，次数越多两轮最快一次越接近
+UPDATE_REPEATS = 30
+DEFAULT_SCALES = (10,)
+# 检查时延迟超过阈值的用例再重测的轮数
+RECHECK_ROUNDS = 2
+# --update 按两轮计时之间差异的这个分位数设定 latency_min 阈值
+NOISE_PERCENTILE = 99
+# latency_min 阈值的上限，否则在嘈杂的机器上翻倍的回归也查不出来；
+# 两轮差异超过上限时只提示，检查时由 RECHECK_ROUNDS 轮重测过滤机器一时变慢的情况
+MAX_LATENCY_MIN = 0.5
+
+# 应用名称 -> (模块, 样本数据的全局变量名)；回调代码引用该变量时按数据规模扩展用例
+APPS = {
+    'app': (app, 'simulated_df'),
+    'viz': (viz_simulated_data, 'df'),
+}
+
+# 相对基线的允许增幅。延迟按最快一次判断（p50/p95/p99 只记录，随机器负载波动大），
+# latency_min 为下限，--update 时按实测的两轮差异调高（不超过 MAX_LATENCY_MIN）；
+# 延迟与内存同时要求绝对差超过 *_floor，避免把测量噪声当作回归
+DEFAULT_THRESHOLDS = {
+    'latency_min': 0.25,
+    'latency_floor_ms': 2.0,
+    'peak_memory': 0.5,
+    'peak_memory_floor_kb': 256,
+    'payload_bytes': 0.05,
+    'memory_component': 0.2,
+    'memory_component_floor_kb': 1024,
+}
+
+
+def _option_values(component):
+    return [option['value'] if isinstance(option, dict) else option
+            for option in getattr(component, 'options', None) or []]
+
+
+def _dropdown_choices(dash_app, key, default):
+    """下拉框输入的取值集合；不是带选项的下拉框时返回 None"""
+    component_id, prop = key
+    component = find_component(dash_app.layout, component_id)
+    options = _option_values(component) if prop == 'value' and component is not None else []
+    if not options:
+        return None
+    if getattr(component, 'multi', False):
+        choices = [default, options[:1], options]
+    else:
+        choices = [default] + [value for value in options if value != default]
+    # 去重并保持顺序（如只有一个选项时 "第一项" 与 "全部" 相同）
+    unique = []
+    for choice in choices:
+        if choice not in unique:
+            unique.append(choice)
+    return unique
+
+
+def _describe(value):
+    if isinstance(value, list):
+        return '+'.join(map(str, value)) if value else 'none'
+    return 'default' if value is None else str(value)
+
+
+def build_cases(app_name, dash_app):
+    """
+    生成一个应用的全部用例 [(名称, 回调, triggered, values)]。
+
+    名称形如 'app:update_radar_chart[age-25-44]'。
+    """
+    callbacks = registered_callbacks(dash_app)
+    defaults = default_input_values(dash_app, callbacks)
+    buttons = clickable_buttons(dash_app, callbacks)
+    cases = []
+    for callback in callbacks:
+        name = f"{app_name}:{callback['func'].__name__}"
+        cases.append((f'{name}[initial]', callback, None, {}))
+
+        for key in callback['inputs']:
+            if key[1] == 'n_clicks' and key[0] in buttons:
+                cases.append((f'{name}[{key[0]}]', callback, key, {}))
+
+        dropdowns = {key: _dropdown_choices(dash_app, key, defaults.get(key)) for key in callback['inputs']}
+        dropdowns = {key: choices for key, choices in dropdowns.items() if choices}
+        # 每个下拉框单独遍历取值，另加一个所有多选下拉框同时只选第一项的组合筛选
+        combinations = [{key: choice} for key, choices in dropdowns.items() for choice in choices]
+        if len(dropdowns) > 1:
+            combinations.append({key: choices[1] for key, choices in dropdowns.items()
+                                 if isinstance(choices[-1], list) and len(choices) > 2})
+        for values in combinations:
+            changed = [key for key, value in values.items() if value != defaults.get(key)]
+            if not changed or any(values == dict(case[3]) for case in cases if case[1] is callback):
+                continue
+            label = ','.join(f'{key[0]}={_describe(values[key])}' for key in changed)
+            cases.append((f'{name}[{label}]', callback, changed[0], values))
+    return callbacks, defaults, cases
+
+
+def _call(callback, triggered, values, defaults):
+    """固定随机种子后调用回调（viz_simulated_data 的抖动使用全局随机数）"""
+    np.random.seed(0)
+    random.seed(0)
+    return run_callback(callback, triggered=triggered, values=values, defaults=defaults)
+
+
+def _payload(outputs):
+    """按 Dash 的方式序列化回调输出，返回 (字节数, sha256)"""
+    payload = to_json(outputs).encode('utf-8')
+    return len(payload), hashlib.sha256(payload).hexdigest()
+
+
+def measure(callback, triggered, values, defaults, repeats):
+    """
+    计时 repeats 次并单独测量内存峰值，返回结果字典。
+
+    回调抛出异常时（线上会返回 500）只记录异常，不计时。
+    """
+    try:
+        outputs = _call(callback, triggered, values, defaults)
+    except Exception as e:
+        return {'error': f'{type(e).__name__}: {e}'}
+    payload_bytes, digest = _payload(outputs)
+
+    # 与 timeit 一样计时期间关闭垃圾回收，减少各次之间的抖动
+    timings = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            _call(callback, triggered, values, defaults)
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    try:
+        outputs = _call(callback, triggered, values, defaults)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # 同样的输入两次得到不同输出（如词云的随机布局）时不做内容比较
+    deterministic = _payload(outputs)[1] == digest
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {
+        'min_ms': round(min(timings), 3),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'peak_kb': round(peak / 1024, 1),
+        'payload_bytes': payload_bytes,
+        'hash': digest if deterministic else None,
+        'repeats': repeats,
+    }
+
+
+def required_modules(path=REQUIREMENTS_PATH):
+    """requirements.txt 中的包及其依赖（递归，不含 extras）提供的顶层模块名"""
+    from importlib import metadata
+
+    with open(path, 'r', encoding='utf-8') as f:
+        pending = [Requirement(line).name for line in (line.split('#')[0].strip() for line in f) if line]
+    distributions = set()
+    while pending:
+        name = canonicalize_name(pending.pop())
+        if name in distributions:
+            continue
+        try:
+            requires = metadata.requires(name) or []
+        except metadata.PackageNotFoundError:
+            continue
+        distributions.add(name)
+        for requirement in map(Requirement, requires):
+            if requirement.marker is None or requirement.marker.evaluate({'extra': ''}):
+                pending.append(requirement.name)
+    return {module for module, owners in metadata.packages_distributions().items()
+            if any(canonicalize_name(owner) in distributions for owner in owners)}
+
+
+def _baseline_module(name, required):
+    """memory_report 的模块分组是否计入基线：依赖的包、标准库、本项目模块与 other"""
+    return (name in required or name in ('stdlib', 'other')
+            or os.path.exists(os.path.join(memory_report.PROJECT_DIR, name + '.py')))
+
+
+def _memory_report(*options):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'memory.json')
+        # 不读写磁盘缓存，各次运行都从相同的状态开始
+        env = {**os.environ, 'CALLBACK_CACHE_PATH': '', 'METRICS_DIR': os.path.join(tmp, 'metrics')}
+        subprocess.run([sys.executable, 'memory_report.py', '--json', path, *options],
+                       check=True, stdout=subprocess.DEVNULL, env=env,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def measure_memory():
+    """
+    在新进程中运行 memory_report.py，返回 {'memory:<组件>': {'kb': 大小}}。
+
+    跟踪分配会增大 RSS，所以分两次：预热后不跟踪，得到 RSS、DataFrame、缓存与布局；
+    另一次只取按模块的统计。
+    """
+    components = memory_report.components(_memory_report('--warm', '--no-modules'))
+    required = required_modules()
+    traced = memory_report.components(_memory_report(), keep=lambda name: _baseline_module(name, required))
+    components.update({name: size for name, size in traced.items() if name.startswith('module.')})
+    return {f'memory:{name}': {'kb': size} for name, size in components.items()}
+
+
+def run_benchmarks(repeats=DEFAULT_REPEATS, scales=DEFAULT_SCALES, pattern=None, names=None):
+    """运行全部用例，返回 {用例名称: 结果}；names 不为空时只重测其中的计时用例"""
+    results = {}
+    for app_name, (module, data_name) in APPS.items():
+        callbacks, defaults, cases = build_cases(app_name, module.app)
+        original = getattr(module, data_name)
+        for scale in (1,) + tuple(s for s in scales if s != 1):
+            if scale != 1:
+                if original is None:
+                    continue
+                setattr(module, data_name, pd.concat([original] * scale, ignore_index=True))
+            try:
+                for name, callback, triggered, values in cases:
+                    if scale != 1:
+                        # 只有读取样本数据的回调才随数据规模变化
+                        if data_name not in callback['func'].__code__.co_names:
+                            continue
+                        name = f'{name}@x{scale}'
+                    if (pattern and pattern not in name) or (names is not None and name not in names):
+                        continue
+                    results[name] = measure(callback, triggered, values, defaults, repeats)
+                    result = results[name]
+                    if 'error' in result:
+                        print(f"  {name}: ✗ {result['error']}")
+                        continue
+                    print(f"  {name}: 最快 {result['min_ms']:.1f}ms  p50 {result['p50_ms']:.1f}ms  "
+                          f"p95 {result['p95_ms']:.1f}ms  峰值 {result['peak_kb']:.0f}KB  响应 {result['payload_bytes'] / 1024:.1f}KB")
+            finally:
+                setattr(module, data_name, original)
+
+    # --filter memory 只运行内存用例，--filter memory:module.pandas 只看一个组件
+    if names is None and (not pattern or 'memory' in pattern):
+        memory = {name: result for name, result in measure_memory().items() if not pattern or pattern in name}
+        for name, result in memory.items():
+            print(f"  {name}: {result['kb'] / 1024:.2f}MB")
+        results.update(memory)
+    return results
+
+
+def _slower(result, base, thresholds):
+    """最快一次比基线慢，且相对与绝对差都超过阈值"""
+    return ('min_ms' in result and 'min_ms' in base
+            and result['min_ms'] > base['min_ms'] * (1 + thresholds['latency_min'])
+            and result['min_ms'] - base['min_ms'] > thresholds['latency_floor_ms'])
+
+
+def slower_cases(results, baseline):
+    """延迟超过阈值的用例名称"""
+    thresholds = {**DEFAULT_THRESHOLDS, **baseline.get('thresholds', {})}
+    cases = baseline.get('cases', {})
+    return [name for name, result in results.items()
+            if name in cases and _slower(result, cases[name], thresholds)]
+
+
+def keep_fastest(results, rerun):
+    """用重测中更快的结果替换 results 中的对应用例"""
+    for name, result in rerun.items():
+        if 'min_ms' in result and 'min_ms' in results.get(name, {}) and result['min_ms'] < results[name]['min_ms']:
+            results[name] = result
+    return results
+
+
+def latency_noise(first, second, floor_ms=DEFAULT_THRESHOLDS['latency_floor_ms']):
+    """
+    同一用例两轮计时的最快一次之比，取 NOISE_PERCENTILE 分位，返回相对差（0.4 表示 40%）。
+
+    只统计耗时不低于 floor_ms 的用例，更快的用例由 latency_floor_ms 兜底。
+    """
+    ratios = [abs(np.log(first[name]['min_ms'] / second[name]['min_ms']))
+              for name in first if 'min_ms' in first[name] and 'min_ms' in second.get(name, {})
+              and min(first[name]['min_ms'], second[name]['min_ms']) >= floor_ms]
+    return float(np.expm1(np.percentile(ratios, NOISE_PERCENTILE))) if ratios else 0.0
+
+
+def compare(results, baseline, partial=False):
+    """与基线比较，返回 (回归列表, 提示列表)；partial 为 True 时不提示基线中未运行的用例"""
+    thresholds = {**DEFAULT_THRESHOLDS, **baseline.get('thresholds', {})}
+    regressions, notes = [], []
+    for name, result in results.items():
+        base = baseline.get('cases', {}).get(name)
+        if base is None:
+            notes.append(f"新用例: {name}")
+            continue
+        if 'error' in result:
+            if 'error' not in base:
+                regressions.append(f"{name}: 回调出错 {result['error']}")
+            continue
+        if 'error' in base:
+            notes.append(f"已修复: {name}")
+            continue
+        if 'kb' in result:
+            if (result['kb'] > base['kb'] * (1 + thresholds['memory_component'])
+                    and result['kb'] - base['kb'] > thresholds['memory_component_floor_kb']):
+                regressions.append(f"{name}: {base['kb'] / 1024:.1f}MB -> {result['kb'] / 1024:.1f}MB")
+            continue
+        if _slower(result, base, thresholds):
+            regressions.append(f"{name}: 最快 {base['min_ms']:.1f}ms -> {result['min_ms']:.1f}ms")
+        if (result['peak_kb'] > base['peak_kb'] * (1 + thresholds['peak_memory'])
+                and result['peak_kb'] - base['peak_kb'] > thresholds['peak_memory_floor_kb']):
+            regressions.append(f"{name}: 内存峰值 {base['peak_kb']:.0f}KB -> {result['peak_kb']:.0f}KB")
+        # 输出不确定（如词云的随机布局）时响应大小同样随机，不比较
+        if base.get('hash') and result['payload_bytes'] > base['payload_bytes'] * (1 + thresholds['payload_bytes']):
+            regressions.append(f"{name}: 响应 {base['payload_bytes']}B -> {result['payload_bytes']}B")
+        if result['hash'] and base.get('hash') and result['hash'] != base['hash']:
+            regressions.append(f"{name}: 输出内容与基线不同")
+    for name in [] if partial else baseline.get('cases', {}):
+        if name not in results:
+            notes.append(f"基线中的用例未运行: {name}")
+    return regressions, notes
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'dash': dash.__version__,
+        'plotly': plotly.__version__,
+        'pandas': pd.__version__,
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def load_baseline(path=BASELINE_PATH):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return None
+
+
+def save_baseline(results, path=BASELINE_PATH, thresholds=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(),
+                   'thresholds': thresholds or DEFAULT_THRESHOLDS,
+                   'cases': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='回调基准测试与回归检查')
+    parser.add_argument('--repeats', type=int, default=None,
+                        help=f'每个用例的计时次数，默认 {DEFAULT_REPEATS}，--update 时 {UPDATE_REPEATS}')
+    parser.add_argument('--scales', type=int, nargs='*', default=list(DEFAULT_SCALES),
+                        help='样本数据的放大倍数（原始规模总会运行）')
+    parser.add_argument('--filter', default=None, help='只运行名称包含该字符串的用例')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='基线文件')
+    parser.add_argument('--update', action='store_true', help='把本次结果写为新基线')
+    parser.add_argument('--output', default=None, help='另存本次结果')
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    update = args.update or baseline is None
+    if args.repeats is None:
+        args.repeats = UPDATE_REPEATS if update else DEFAULT_REPEATS
+
+    print("=== 回调基准测试 ===")
+    start = time.perf_counter()
+    results = run_benchmarks(args.repeats, tuple(args.scales), args.filter)
+    print(f"\n{len(results)} 个用例，用时 {time.perf_counter() - start:.1f}s")
+
+    if args.output:
+        save_baseline(results, args.output)
+
+    if update:
+        # 出错的用例不写入基线，否则之后一直出错也不会报告
+        errors = [name for name, result in results.items() if 'error' in result]
+        if errors:
+            print(f"\n{len(errors)} 个用例出错，未写入基线:")
+            for name in errors:
+                print(f"  ✗ {name}: {results[name]['error']}")
+            sys.exit(1)
+        thresholds = {name: (baseline or {}).get('thresholds', {}).get(name, value)
+                      for name, value in DEFAULT_THRESHOLDS.items()}
+        timed = {name for name, result in results.items() if 'min_ms' in result}
+        print(f"\n第二轮计时（{len(timed)} 个用例）")
+        second = run_benchmarks(args.repeats, tuple(args.scales), names=timed)
+        noise = latency_noise(results, second, thresholds['latency_floor_ms'])
+        print(f"两轮最快一次的差异（{NOISE_PERCENTILE} 分位）: {noise:.0%}")
+        if noise > MAX_LATENCY_MIN:
+            print(f"  ! 差异超过上限 {MAX_LATENCY_MIN:.0%}，机器负载不稳定，检查时可能需要重测；"
+                  f"最好在空闲时重新 --update")
+        keep_fastest(results, second)
+        if args.filter and baseline is not None:
+            # 部分运行时只更新对应用例，保留其余基线与阈值
+            results = {**baseline['cases'], **results}
+        else:
+            thresholds['latency_min'] = round(min(max(DEFAULT_THRESHOLDS['latency_min'], noise), MAX_LATENCY_MIN), 2)
+        print(f"延迟阈值: {thresholds['latency_min']:.0%}")
+        save_baseline(results, args.baseline, thresholds)
+        print(f"基线已写入 {args.baseline}")
+        sys.exit(0)
+
+    for _ in range(RECHECK_ROUNDS):
+        slower = slower_cases(results, baseline)
+        if not slower:
+            break
+        print(f"\n重测 {len(slower)} 个变慢的用例")
+        keep_fastest(results, run_benchmarks(args.repeats, tuple(args.scales), names=set(slower)))
+
+    regressions, notes = compare(results, baseline, partial=bool(args.filter))
+    for note in notes:
+        print(f"  - {note}")
+    if regressions:
+        print(f"\n发现 {len(regressions)} 项回归:")
+        for regression in regressions:
+            print(f"  ✗ {regression}")
+        sys.exit(1)
+    print("\n✓ 与基线相比没有回归")
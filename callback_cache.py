@@ -0,0 +1,306 @@
+"""
+回调响应缓存：以 (回调, 输入值, 触发的输入, 数据版本) 为键，在进程内缓存 Dash 序列化后的
+响应 JSON，命中时既不重新计算图表也不重新编码。
+
+本应用的回调只通过 callback_context.triggered 判断点击了哪个按钮，不读取点击次数，
+所以键中的 n_clicks 只区分 "点过/没点过"，第 1 次和第 5 次点击同一按钮命中同一项。
+
+同一个键的并发请求只计算一次（single-flight）：分享链接后大量用户同时打开页面时，
+第一个未命中的请求负责计算，其余请求等待它的结果（或异常），不再各自重复计算。
+
+两级缓存：
+- L1：进程内 LRU，总大小不超过 CALLBACK_CACHE_MB（默认 64，0 表示关闭整个缓存）；
+- L2：本机 SQLite 文件（CALLBACK_CACHE_PATH，默认 .cache/callbacks.sqlite3），
+  所有 gunicorn worker 共用，worker 按 max_requests 重启或服务重启后仍然有效。
+  超过 CALLBACK_CACHE_TTL 秒（默认一天）的项过期，总大小超过 CALLBACK_CACHE_DISK_MB
+  （默认 512）时淘汰最久未访问的项；CALLBACK_CACHE_PATH 设为空字符串时只用 L1。
+
+L2 出错（多个 worker 争用时的 database is locked、磁盘已满等）只打印日志，
+当作未命中或不写入，请求照常由 L1 或重新计算完成。
+
+数据版本默认是代码与数据文件内容的摘要（见 fingerprint），修改 app.py 或样本数据后
+重启，L2 中的旧结果不会再命中。
+
+命中与未命中记入 callback_metrics（/admin/metrics 的 Cache hit 列），
+L2 命中与等待其他请求计算结果的请求都记为命中。
+"""
+
+import functools
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from callback_metrics import callback_label, record_cache
+
+DEFAULT_MAX_MB = 64
+DISK_PATH = '.cache/callbacks.sqlite3'
+DEFAULT_DISK_MB = 512
+DEFAULT_TTL = 24 * 3600
+# 参与数据版本计算的文件
+VERSION_PATTERNS = ('*.py', '*.csv', '*.xls', 'viz_data.json', 'detailed_analysis.json')
+# 访问时间只在超过这个间隔后才写回，避免每次读取都写数据库
+TOUCH_INTERVAL = 60
+# 每写入多少项检查一次总大小
+EVICT_EVERY = 20
+
+
+class CallbackCache:
+    """线程安全的 LRU，按响应字符串长度计算大小"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.size, 'max_bytes': self.max_bytes}
+
+
+class DiskCache:
+    """多进程共用的 SQLite 缓存，带 TTL 与总大小限制"""
+
+    def __init__(self, path=DISK_PATH, max_bytes=DEFAULT_DISK_MB * 1024 * 1024, ttl=DEFAULT_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.local = threading.local()
+        self.writes = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT, '
+                       'size INTEGER, created REAL, accessed REAL)')
+            db.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+
+    def _connect(self):
+        # 连接不能跨线程，也不能在 fork 后继续使用
+        if getattr(self.local, 'pid', None) != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self.local.db, self.local.pid = db, os.getpid()
+        return self.local.db
+
+    def get(self, key):
+        db = self._connect()
+        row = db.execute('SELECT value, created, accessed FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        value, created, accessed = row
+        now = time.time()
+        if now - created > self.ttl:
+            db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            return None
+        if now - accessed > TOUCH_INTERVAL:
+            db.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        return value
+
+    def set(self, key, value):
+        now = time.time()
+        db = self._connect()
+        db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)', (key, value, len(value), now, now))
+        self.writes += 1
+        if self.writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """删除过期项；总大小仍超限时按访问时间从旧到新删除，直到降到上限的 90%"""
+        db = self._connect()
+        db.execute('DELETE FROM entries WHERE created < ?', (time.time() - self.ttl,))
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target, removed = total - self.max_bytes * 0.9, 0
+        doomed = []
+        for key, size in db.execute('SELECT key, size FROM entries ORDER BY accessed'):
+            doomed.append((key,))
+            removed += size
+            if removed >= target:
+                break
+        db.executemany('DELETE FROM entries WHERE key = ?', doomed)
+
+    def clear(self):
+        self._connect().execute('DELETE FROM entries')
+
+    def stats(self):
+        entries, size = self._connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return {'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes, 'path': self.path}
+
+
+def fingerprint(patterns=VERSION_PATTERNS):
+    """文件内容的摘要，作为默认的数据版本"""
+    digest = hashlib.sha1()
+    for path in sorted({path for pattern in patterns for path in glob.glob(pattern)}):
+        digest.update(path.encode('utf-8'))
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+class _Flight:
+    """一次正在进行的计算"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+cache = CallbackCache()
+# L2，install_cache 设置；None 表示只用 L1
+disk_cache = None
+# 缓存键 -> _Flight
+_inflight = {}
+_inflight_lock = threading.Lock()
+# 数据版本，数据或代码变化后更新，旧版本的缓存项不再命中
+data_version = 0
+
+
+def refresh_version():
+    """数据文件更新后重新计算数据版本，并清空进程内缓存中的旧版本结果"""
+    global data_version
+    data_version = fingerprint()
+    cache.clear()
+
+
+def cache_key(label, args, click_positions, triggered):
+    """把回调名称、输入值、触发的输入与数据版本编码为缓存键"""
+    values = [bool(value) if index in click_positions else value for index, value in enumerate(args)]
+    return json.dumps([label, values, sorted(triggered), data_version],
+                      sort_keys=True, default=str, separators=(',', ':'))
+
+
+def _disk_get(key):
+    """读取 L2；出错时当作未命中"""
+    try:
+        return disk_cache.get(key)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Callback cache L2 read failed: {e}", flush=True)
+        return None
+
+
+def _disk_set(key, value):
+    """写入 L2；出错时放弃写入"""
+    try:
+        disk_cache.set(key, value)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Callback cache L2 write failed: {e}", flush=True)
+
+
+def _compute_once(key, compute):
+    """同一个键同时只计算一次，其余调用等待结果；返回 (响应, 是否由本次调用计算)"""
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.response, False
+
+    try:
+        flight.response = compute()
+        if isinstance(flight.response, str):
+            cache.set(key, flight.response)
+            if disk_cache is not None:
+                _disk_set(key, flight.response)
+    except BaseException as e:
+        # 包括 PreventUpdate：等待的请求得到同样的结果
+        flight.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        flight.done.set()
+    return flight.response, True
+
+
+def _instrument(func, label, click_positions):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        context = kwargs.get('callback_context')
+        triggered = [item['prop_id'] for item in getattr(context, 'triggered_inputs', None) or []]
+        key = cache_key(label, args, click_positions, triggered)
+        response = cache.get(key)
+        if response is None and disk_cache is not None:
+            response = _disk_get(key)
+            if response is not None:
+                cache.set(key, response)
+        if response is not None:
+            record_cache(True, label)
+            return response
+        response, computed = _compute_once(key, lambda: func(*args, **kwargs))
+        record_cache(not computed, label)
+        return response
+    return wrapper
+
+
+def install_cache(dash_app, max_bytes=None, disk=None, version=None):
+    """
+    包装已注册的全部回调；需在 callback_metrics 之前安装，使命中记到当前回调。
+
+    disk 为 DiskCache 时启用 L2；version 为数据版本，默认为 fingerprint()。
+    """
+    global disk_cache, data_version
+    if max_bytes is not None:
+        cache.max_bytes = max_bytes
+    disk_cache = disk
+    data_version = version if version is not None else fingerprint()
+    for output_key, entry in dash_app.callback_map.items():
+        # 回调的位置参数依次为 inputs 与 state 的值
+        items = list(entry['inputs']) + list(entry.get('state', []))
+        click_positions = {index for index, item in enumerate(items) if item.get('property') == 'n_clicks'}
+        entry['callback'] = _instrument(entry['callback'], callback_label(output_key), click_positions)
+    return dash_app
+
+
+def install_from_env(dash_app, environ=os.environ):
+    """默认开启；CALLBACK_CACHE_MB=0 时跳过"""
+    max_mb = float(environ.get('CALLBACK_CACHE_MB', DEFAULT_MAX_MB))
+    if max_mb <= 0:
+        return False
+    path = environ.get('CALLBACK_CACHE_PATH', DISK_PATH)
+    disk = None
+    if path:
+        try:
+            disk = DiskCache(path,
+                             max_bytes=int(float(environ.get('CALLBACK_CACHE_DISK_MB', DEFAULT_DISK_MB)) * 1024 * 1024),
+                             ttl=float(environ.get('CALLBACK_CACHE_TTL', DEFAULT_TTL)))
+        except (sqlite3.Error, OSError) as e:
+            # 如只读文件系统：只用 L1
+            print(f"Callback cache L2 unavailable ({path}): {e}", flush=True)
+    install_cache(dash_app, int(max_mb * 1024 * 1024), disk)
+    return True
@@ -0,0 +1,327 @@
+"""
+回调指标：每个回调的延迟直方图、错误数、响应字节数与缓存命中，
+以 Prometheus 文本格式在 /metrics 输出，并在 /admin/metrics 显示为表格。
+
+gunicorn 的每个 worker 在内存中累计自己的指标，每隔 FLUSH_INTERVAL 秒
+把快照写到 METRICS_DIR/metrics-<pid>.json；/metrics 读取全部快照相加，
+因此无论请求落到哪个 worker，看到的都是所有 worker 的合计。
+重启服务前应清空 METRICS_DIR（start.sh 已处理），否则计数会接着上一次累加。
+快照先写到唯一的临时文件再替换，同一进程同时只有一个线程写出；写出失败只打印日志，
+不会影响回调的响应。
+
+/metrics 与 /admin/metrics 是内部页面，默认不注册：设置 METRICS_TOKEN 后注册并要求
+?token=<值>；只在内网可访问时也可以设置 METRICS_ENDPOINTS=1 不带令牌注册。
+未注册时仍然统计指标（写出快照），只是不对外提供。
+
+环境变量：
+    METRICS_DIR            快照目录，默认 .metrics
+    METRICS_TOKEN          注册 /metrics 与 /admin/metrics，访问需要 ?token=<值>
+    METRICS_ENDPOINTS=1    没有 METRICS_TOKEN 时也注册（不做验证）
+    METRICS_DISABLED=1     不安装指标
+"""
+
+import contextvars
+import functools
+import html
+import json
+import os
+import tempfile
+import threading
+import time
+
+from dash.exceptions import PreventUpdate
+from flask import Response, abort, has_request_context, request
+
+from warmup import is_warmup_request
+
+METRICS_DIR = '.metrics'
+FLUSH_INTERVAL = 1.0
+# 直方图上界（秒），最后一个桶为 +Inf
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPDATE_PATH = '_dash-update-component'
+
+# 正在执行的回调名称，供缓存层调用 record_cache 时使用
+current_callback = contextvars.ContextVar('current_callback', default=None)
+
+
+def callback_label(output_key):
+    """回调名称：多输出回调取第一个输出，如 'simulated-scatter-plot.figure'"""
+    if output_key.startswith('..') and output_key.endswith('..'):
+        return output_key[2:-2].split('...')[0]
+    return output_key
+
+
+def _empty():
+    return {'count': 0, 'sum': 0.0, 'buckets': [0] * (len(BUCKETS) + 1),
+            'errors': 0, 'bytes': 0, 'responses': 0, 'cache_hits': 0, 'cache_misses': 0}
+
+
+class MetricsStore:
+    """单个进程内的指标，定期写出快照；read_all 合并所有进程的快照"""
+
+    def __init__(self, directory=METRICS_DIR):
+        self.directory = directory
+        self.lock = threading.Lock()
+        # 同一进程同时只有一个线程写出快照
+        self.flush_lock = threading.Lock()
+        self.callbacks = {}
+        self.last_flush = 0.0
+
+    def _row(self, label):
+        if label not in self.callbacks:
+            self.callbacks[label] = _empty()
+        return self.callbacks[label]
+
+    def observe(self, label, seconds, error=False):
+        with self.lock:
+            row = self._row(label)
+            row['count'] += 1
+            row['sum'] += seconds
+            row['buckets'][next((i for i, bound in enumerate(BUCKETS) if seconds <= bound), len(BUCKETS))] += 1
+            if error:
+                row['errors'] += 1
+        self.maybe_flush()
+
+    def add_response(self, label, size):
+        with self.lock:
+            row = self._row(label)
+            row['bytes'] += size
+            row['responses'] += 1
+
+    def add_cache(self, label, hit):
+        with self.lock:
+            self._row(label)['cache_hits' if hit else 'cache_misses'] += 1
+
+    def _path(self, pid=None):
+        return os.path.join(self.directory, f'metrics-{pid or os.getpid()}.json')
+
+    def flush(self, blocking=True):
+        """
+        写出本进程的快照，返回是否写出。
+
+        blocking 为 False 时若其他线程正在写出则直接返回；写入失败（如磁盘已满）只打印日志。
+        """
+        if not self.flush_lock.acquire(blocking=blocking):
+            return False
+        try:
+            with self.lock:
+                snapshot = json.dumps(self.callbacks)
+                self.last_flush = time.monotonic()
+            os.makedirs(self.directory, exist_ok=True)
+            # 临时文件名不以 metrics- 开头，read_all 不会读到写了一半的文件
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.metrics-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(snapshot)
+                os.replace(tmp_path, self._path())
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            return True
+        except OSError as e:
+            print(f"Error writing metrics snapshot (pid {os.getpid()}): {e}", flush=True)
+            return False
+        finally:
+            self.flush_lock.release()
+
+    def maybe_flush(self):
+        if time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+            self.flush(blocking=False)
+
+    def snapshot_files(self):
+        try:
+            filenames = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(os.path.join(self.directory, filename) for filename in filenames
+                      if filename.startswith('metrics-') and filename.endswith('.json'))
+
+    def read_all(self):
+        """合并目录中所有进程的快照（本进程先写出最新值）"""
+        self.flush()
+        merged = {}
+        for path in self.snapshot_files():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for label, row in snapshot.items():
+                total = merged.setdefault(label, _empty())
+                for key, value in row.items():
+                    if key == 'buckets':
+                        total[key] = [a + b for a, b in zip(total[key], value)]
+                    else:
+                        total[key] += value
+        return merged
+
+
+store = MetricsStore()
+
+
+def _counted():
+    """预热请求（warmup.py）不计入指标"""
+    return not (has_request_context() and is_warmup_request(request))
+
+
+def record_cache(hit, label=None):
+    """缓存层调用：记录当前回调的一次缓存命中或未命中"""
+    label = label or current_callback.get()
+    if label and _counted():
+        store.add_cache(label, hit)
+
+
+def _quantile(row, q):
+    """按直方图桶估计分位数（取所在桶的上界）"""
+    if not row['count']:
+        return None
+    target, seen = q * row['count'], 0
+    for bound, count in zip(BUCKETS + (float('inf'),), row['buckets']):
+        seen += count
+        if seen >= target:
+            return bound
+    return float('inf')
+
+
+def _format_bound(bound):
+    if bound is None:
+        return '-'
+    if bound == float('inf'):
+        return f'>{BUCKETS[-1] * 1000:g}'
+    return f'≤{bound * 1000:g}'
+
+
+def render_prometheus(metrics):
+    lines = [
+        '# HELP dash_callback_duration_seconds Callback execution time.',
+        '# TYPE dash_callback_duration_seconds histogram',
+    ]
+    for label, row in sorted(metrics.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), row['buckets']):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'dash_callback_duration_seconds_bucket{{callback="{label}",le="{le}"}} {cumulative}')
+        lines.append(f'dash_callback_duration_seconds_sum{{callback="{label}"}} {row["sum"]:.6f}')
+        lines.append(f'dash_callback_duration_seconds_count{{callback="{label}"}} {row["count"]}')
+
+    counters = [
+        ('dash_callback_errors_total', 'Callbacks that raised an exception.', 'errors', ''),
+        ('dash_callback_response_bytes_total', 'Response body bytes.', 'bytes', ''),
+        ('dash_callback_cache_total', 'Callback cache lookups.', 'cache_hits', ',result="hit"'),
+    ]
+    for name, help_text, key, extra in counters:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for label, row in sorted(metrics.items()):
+            lines.append(f'{name}{{callback="{label}"{extra}}} {row[key]}')
+            if key == 'cache_hits':
+                lines.append(f'{name}{{callback="{label}",result="miss"}} {row["cache_misses"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def render_admin(metrics):
+    rows = []
+    for label, row in sorted(metrics.items(), key=lambda item: -item[1]['sum']):
+        lookups = row['cache_hits'] + row['cache_misses']
+        cells = [
+            label,
+            row['count'],
+            row['errors'],
+            f"{row['sum'] / row['count'] * 1000:.1f}" if row['count'] else '-',
+            _format_bound(_quantile(row, 0.5)),
+            _format_bound(_quantile(row, 0.95)),
+            f"{row['bytes'] / row['responses'] / 1024:.1f}" if row['responses'] else '-',
+            f"{row['cache_hits'] / lookups:.0%}" if lookups else '-',
+        ]
+        rows.append('<tr>' + ''.join(f'<td>{html.escape(str(cell))}</td>' for cell in cells) + '</tr>')
+    headers = ['Callback', 'Calls', 'Errors', 'Mean (ms)', 'p50 (ms)', 'p95 (ms)', 'Avg response (KB)', 'Cache hit']
+    return f'''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Callback metrics</title>
+<style>
+body {{font-family: 'Source Sans Pro', sans-serif; margin: 32px; color: #2C3E50;}}
+table {{border-collapse: collapse;}}
+th, td {{padding: 6px 12px; border-bottom: 1px solid #dee2e6; text-align: right;}}
+th:first-child, td:first-child {{text-align: left;}}
+</style></head>
+<body><h2>Callback metrics</h2>
+<p>Aggregated across {len(store.snapshot_files())} worker snapshot(s).
+Raw data: <a href="/metrics{'?token=' + html.escape(request.args['token']) if 'token' in request.args else ''}">/metrics</a></p>
+<table><tr>{''.join(f'<th>{h}</th>' for h in headers)}</tr>{''.join(rows)}</table>
+</body></html>'''
+
+
+def _instrument(func, label):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = current_callback.set(label)
+        start = time.perf_counter()
+        error = False
+        try:
+            return func(*args, **kwargs)
+        except PreventUpdate:
+            raise
+        except Exception:
+            error = True
+            raise
+        finally:
+            try:
+                if _counted():
+                    store.observe(label, time.perf_counter() - start, error)
+            except Exception as e:
+                # 指标出错不能让已经算好的回调变成 500
+                print(f"Error recording metrics for {label}: {e}", flush=True)
+            current_callback.reset(token)
+    return wrapper
+
+
+def admin_enabled(environ=os.environ):
+    """是否注册内部页面（/metrics、/admin/metrics、/admin/memory）：设置了令牌或显式开启"""
+    return bool(environ.get('METRICS_TOKEN')) or environ.get('METRICS_ENDPOINTS') in ('1', 'true', 'yes')
+
+
+def install_metrics(dash_app, directory=None, token=None, endpoints=True):
+    """包装已注册的全部回调；endpoints 为 True 时注册 /metrics 与 /admin/metrics"""
+    if directory:
+        store.directory = directory
+    for output_key, entry in dash_app.callback_map.items():
+        entry['callback'] = _instrument(entry['callback'], callback_label(output_key))
+
+    server = dash_app.server
+
+    def check_token():
+        if token and request.args.get('token') != token:
+            abort(403)
+
+    @server.after_request
+    def _record_response(response):
+        if request.path.endswith(UPDATE_PATH) and response.status_code == 200 and _counted():
+            body = request.get_json(silent=True) or {}
+            size = response.calculate_content_length()
+            if body.get('output') and size is not None:
+                store.add_response(callback_label(body['output']), size)
+        return response
+
+    if not endpoints:
+        return dash_app
+
+    @server.route('/metrics')
+    def metrics_endpoint():
+        check_token()
+        return Response(render_prometheus(store.read_all()), mimetype='text/plain; version=0.0.4')
+
+    @server.route('/admin/metrics')
+    def metrics_admin():
+        check_token()
+        return render_admin(store.read_all())
+
+    return dash_app
+
+
+def install_from_env(dash_app, environ=os.environ):
+    """默认统计指标，页面见 admin_enabled；METRICS_DISABLED=1 时跳过"""
+    if environ.get('METRICS_DISABLED') in ('1', 'true', 'yes'):
+        return False
+    install_metrics(dash_app, environ.get('METRICS_DIR', METRICS_DIR), environ.get('METRICS_TOKEN'),
+                    endpoints=admin_enabled(environ))
+    return True
@@ -0,0 +1,215 @@
+"""
+把 CPU 密集的回调放到子进程中计算。
+
+散点图等回调构建图表时一直持有 GIL，同一 worker 的其他线程（按钮样式、文字说明等
+轻量回调）只能等待。用 @offload 标记的回调改在进程池中运行：
+
+    @app.callback(...)
+    @callback_pool.offload
+    def update_simulated_scatter_plot(...):
+
+子进程在 gunicorn worker 启动时（post_fork，此时还没有其他线程）由 fork 创建，
+直接继承已加载的 app 模块和数据，不需要重新读取；子进程把回调输出编码为 JSON 字符串
+返回，worker 解码后交给 Dash 输出。没有调用 start_pool 的进程（主进程预热、本地开发、
+基准测试、静态导出）仍在当前线程中运行回调。
+
+排队中的请求最多 CALLBACK_POOL_QUEUE 个，超出时等待 CALLBACK_POOL_TIMEOUT 秒仍无空位
+返回 503；子进程计算超过同样的时间返回 504。子进程中的计算无法中断，会继续运行到结束，
+它占用的排队位置在计算真正结束时才释放，所以反复超时也不会让积压超过上限。
+
+子进程意外退出（如因内存不足被杀死）后进程池不可再用，此时重建进程池并重试一次，
+仍然失败返回 503。重建时 worker 中已有其他线程（gthread 的请求线程、数据监视线程等），
+fork 出的子进程可能继承被这些线程持有的锁（导入锁、日志锁等）而卡死，所以重建改用 spawn：
+新的子进程重新导入登记了回调的模块（app），比 fork 慢几秒、也不与 worker 共享内存，
+但只在子进程意外退出后发生。
+
+子进程中回调记录的 Server-Timing 阶段（filter、aggregate、figure）与请求采样
+（request_profiler 的 sample 模式）的调用栈随结果一起返回，在 worker 中并入当前请求。
+
+环境变量：
+    CALLBACK_POOL_PROCESSES=1    每个 gunicorn worker 的子进程数，0 表示不使用进程池
+    CALLBACK_POOL_QUEUE          默认为子进程数的 4 倍
+    CALLBACK_POOL_TIMEOUT=30
+"""
+
+import contextlib
+import functools
+import importlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from dash import callback_context
+from dash._utils import to_json
+from werkzeug.exceptions import GatewayTimeout, ServiceUnavailable
+
+import request_profiler
+import server_timing
+from app_states import trigger_context
+
+DEFAULT_PROCESSES = 1
+DEFAULT_TIMEOUT = 30.0
+
+# 函数名 -> 原始回调函数；在 fork 之前登记，子进程按名称查找
+_registry = {}
+# [(在 worker 中取值的函数, 在子进程中应用该值的函数)]，如数据版本
+_sync_hooks = []
+_pool = {'executor': None, 'pid': None, 'slots': None, 'timeout': DEFAULT_TIMEOUT, 'processes': DEFAULT_PROCESSES}
+_rebuild_lock = threading.Lock()
+
+
+def sync_state(capture, apply):
+    """
+    登记子进程运行回调前需要与 worker 同步的状态。
+
+    每次提交任务时在 worker 中调用 capture()，子进程先以其返回值调用 apply(value)。
+    """
+    _sync_hooks.append((capture, apply))
+
+
+def _run_in_child(name, args, prop_id, state=(), sample_interval=None):
+    """
+    子进程中执行：同步状态后运行原始回调。
+
+    返回 (输出 JSON, 耗时秒数, [(阶段, 秒数)], 调用栈计数)；sample_interval 为 None 时不采样。
+    """
+    for (_, apply), value in zip(_sync_hooks, state):
+        apply(value)
+    start = time.perf_counter()
+    sampling = (request_profiler.sampling(sample_interval) if sample_interval
+                else contextlib.nullcontext(Counter()))
+    with server_timing.collecting() as phases, sampling as stacks, trigger_context(prop_id):
+        result = _registry[name](*args)
+        payload = to_json(result)
+    return payload, time.perf_counter() - start, phases, stacks
+
+
+def _triggered_prop_id():
+    """当前请求触发回调的输入，如 'reset-simulated-filters.n_clicks'；初次加载时为 None"""
+    return next(iter(callback_context.triggered_prop_ids), None)
+
+
+def _import_modules(modules):
+    """spawn 出的子进程的初始化：导入登记了回调的模块，回调与 sync_state 随之登记"""
+    for module in modules:
+        importlib.import_module(module)
+
+
+def _new_executor(processes, method='fork'):
+    """
+    创建进程池并启动全部子进程。
+
+    fork 的子进程直接继承已登记的回调；spawn 的子进程先导入登记回调的模块。
+    """
+    if method == 'fork':
+        executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('fork'))
+    else:
+        modules = sorted({func.__module__ for func in _registry.values()})
+        executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context(method),
+                                       initializer=_import_modules, initargs=(modules,))
+    # 提交空任务让子进程现在就创建，而不是在第一个请求时
+    for future in [executor.submit(os.getpid) for _ in range(processes)]:
+        future.result()
+    return executor
+
+
+def _rebuild(broken):
+    """
+    子进程意外退出后重建进程池；其他线程已重建时直接返回。
+
+    此时 worker 中已有其他线程，不能再安全地 fork，改用 spawn（见模块说明）。
+    """
+    with _rebuild_lock:
+        if _pool['executor'] is not broken:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        start = time.perf_counter()
+        try:
+            _pool['executor'] = _new_executor(_pool['processes'], 'spawn')
+        except Exception as e:
+            # 保留已损坏的进程池：本次请求返回 503，下一个请求再尝试重建
+            print(f"Callback pool rebuild failed (pid {os.getpid()}): {e}", flush=True)
+            return
+        print(f"Callback pool rebuilt with spawn after a child process died (pid {os.getpid()}, "
+              f"{time.perf_counter() - start:.1f}s)", flush=True)
+
+
+def _run_pooled(executor, task, timeout):
+    """
+    占用一个排队位置在进程池中运行 task。
+
+    位置在子进程完成时才释放：超时返回 504 之后，仍在计算的任务继续占用位置。
+    """
+    slots = _pool['slots']
+    if not slots.acquire(timeout=timeout):
+        raise ServiceUnavailable('Callback pool is full')
+    try:
+        future = executor.submit(_run_in_child, *task)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        raise GatewayTimeout('Callback timed out in the process pool')
+
+
+def offload(func):
+    """标记在进程池中运行的回调"""
+    name = f'{func.__module__}.{func.__qualname__}'
+    _registry[name] = func
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        if _pool['executor'] is None or _pool['pid'] != os.getpid():
+            return func(*args)
+
+        submitted = time.perf_counter()
+        state = [capture() for capture, _ in _sync_hooks]
+        task = (name, args, _triggered_prop_id(), state, request_profiler.sampling_interval())
+        for attempt in range(2):
+            executor = _pool['executor']
+            try:
+                payload, elapsed, phases, stacks = _run_pooled(executor, task, _pool['timeout'])
+                break
+            except BrokenProcessPool:
+                _rebuild(executor)
+                if attempt:
+                    raise ServiceUnavailable('Callback pool child process died')
+        # 子进程中的阶段；compute：子进程中阶段以外的计算与编码；queue：排队、进程间传输与解码
+        for phase, seconds in phases:
+            server_timing.record(phase, seconds)
+        server_timing.record('compute', max(elapsed - sum(seconds for _, seconds in phases), 0.0))
+        server_timing.record('queue', time.perf_counter() - submitted - elapsed)
+        request_profiler.add_samples(stacks)
+        # 多输出回调返回的元组解码后为列表，Dash 同样接受
+        return json.loads(payload)
+
+    return wrapper
+
+
+def start_pool(processes=DEFAULT_PROCESSES, queue=None, timeout=DEFAULT_TIMEOUT):
+    """
+    在当前进程中创建进程池并立即启动全部子进程。
+
+    应在还没有其他线程时调用（gunicorn 的 post_fork），fork 出的子进程才是安全的。
+    """
+    executor = _new_executor(processes)
+    _pool.update(executor=executor, pid=os.getpid(), processes=processes,
+                 slots=threading.BoundedSemaphore(queue or processes * 4), timeout=timeout)
+    return executor
+
+
+def start_from_env(environ=os.environ):
+    """gunicorn.conf.py 的 post_fork 调用；CALLBACK_POOL_PROCESSES=0 时不启动"""
+    processes = int(environ.get('CALLBACK_POOL_PROCESSES', DEFAULT_PROCESSES))
+    if processes <= 0 or not _registry:
+        return None
+    queue = int(environ['CALLBACK_POOL_QUEUE']) if environ.get('CALLBACK_POOL_QUEUE') else None
+    return start_pool(processes, queue, float(environ.get('CALLBACK_POOL_TIMEOUT', DEFAULT_TIMEOUT)))
@@ -0,0 +1,17 @@
+"""
+文件内容摘要：数据仓、流水线、静态导出与统计表缓存共用同一种计算方式，
+同一个文件在各处得到相同的摘要（sha256 十六进制，按块读取，大文件不占内存）。
+"""
+
+import hashlib
+
+BLOCK_SIZE = 1 << 20
+
+
+def file_digest(path, length=None):
+    """文件内容的 sha256；length 给出时只取前 length 位（用于文件名）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()[:length]
@@ -0,0 +1,86 @@
+"""
+由 /_dash-layout 与 /_dash-dependencies 的响应生成 Dash 回调请求的负载。
+
+loadtest.py 用它回放页面会话，warmup.py 用它生成预热请求，traffic_capture.py
+用它给请求命名；只依赖这两个响应，不导入 app.py。
+"""
+
+# 交互中修改筛选条件（其余为点击按钮）的比例
+FILTER_RATIO = 0.4
+
+
+def _layout_props(layout):
+    """遍历 /_dash-layout 的 JSON，返回 {组件id: props}"""
+    props = {}
+    stack = [layout]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict) and 'props' in node:
+            if 'id' in node['props']:
+                props[node['props']['id']] = node['props']
+            stack.append(node['props'].get('children'))
+    return props
+
+
+class SessionPlan:
+    """由布局与回调依赖生成会话中各请求的负载"""
+
+    def __init__(self, layout, dependencies):
+        self.props = _layout_props(layout)
+        self.callbacks = [dep for dep in dependencies if dep.get('clientside_function') is None]
+        self.buttons = sorted({item['id'] for dep in self.callbacks for item in dep['inputs']
+                               if item['property'] == 'n_clicks'})
+        # 带选项的多选下拉框（第六章的筛选器）
+        self.filters = sorted({item['id'] for dep in self.callbacks for item in dep['inputs']
+                               if item['property'] == 'value'
+                               and self.props.get(item['id'], {}).get('multi')
+                               and self.props[item['id']].get('options')})
+
+    def initial_value(self, component_id, prop):
+        if prop == 'id':
+            return component_id
+        return self.props.get(component_id, {}).get(prop)
+
+    @staticmethod
+    def label(dep):
+        """报告中使用的回调名称：第一个输出"""
+        output = dep['output']
+        return output[2:-2].split('...')[0] if output.startswith('..') else output
+
+    def payload(self, dep, values, changed):
+        output = dep['output']
+        if output.startswith('..'):
+            outputs = [dict(zip(('id', 'property'), part.rsplit('.', 1)))
+                       for part in output[2:-2].split('...')]
+        else:
+            outputs = dict(zip(('id', 'property'), output.rsplit('.', 1)))
+        inputs = [{'id': item['id'], 'property': item['property'],
+                   'value': values.get((item['id'], item['property']),
+                                       self.initial_value(item['id'], item['property']))}
+                  for item in dep['inputs']]
+        state = [{'id': item['id'], 'property': item['property'],
+                  'value': self.initial_value(item['id'], item['property'])}
+                 for item in dep.get('state', [])]
+        return {'output': output, 'outputs': outputs, 'inputs': inputs,
+                'changedPropIds': changed, 'state': state}
+
+    def initial_burst(self):
+        return [(self.label(dep), self.payload(dep, {}, []))
+                for dep in self.callbacks if not dep.get('prevent_initial_call')]
+
+    def interaction(self, rng):
+        """随机生成一次交互触发的请求列表"""
+        if self.filters and (not self.buttons or rng.random() < FILTER_RATIO):
+            component_id = rng.choice(self.filters)
+            options = [option['value'] if isinstance(option, dict) else option
+                       for option in self.props[component_id]['options']]
+            key, value = (component_id, 'value'), rng.sample(options, rng.randint(0, len(options)))
+        else:
+            component_id = rng.choice(self.buttons)
+            key, value = (component_id, 'n_clicks'), rng.randint(1, 5)
+        changed = [f'{key[0]}.{key[1]}']
+        return [(self.label(dep), self.payload(dep, {key: value}, changed))
+                for dep in self.callbacks
+                if any((item['id'], item['property']) == key for item in dep['inputs'])]
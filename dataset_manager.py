@@ -0,0 +1,189 @@
+"""
+样本数据的热更新。
+
+DatasetManager 持有当前的数据快照（加载并整理好的 DataFrame + 版本号）。后台线程
+每隔 DATASET_POLL_SECONDS 秒检查数据文件，文件变化后在该线程中构建新快照，
+完成后一次性替换，并通知监听者（app.py 替换 simulated_df、更新缓存版本）。
+版本号为文件内容的摘要，同一份数据在所有 worker 中版本相同。
+构建失败（如文件正在写入）时保留旧快照，文件再次变化时重试。
+
+快照构建后不再修改：回调只读取或复制 DataFrame（pandas 的写时复制保证
+筛选结果不会改动原数据），替换时已在运行的回调继续使用旧快照。
+
+/events/dataset 是 Server-Sent Events 推送：数据版本变化时发出
+
+    id: <版本>
+    event: dataset
+    data: {"version": "<版本>", "outputs": ["simulated-scatter-plot.figure", ...]}
+
+页面中的 assets/dataset_events.js 以 dcc.Store('dataset-version') 的初始值（?version=）
+订阅，收到不同的版本后更新该 Store，只有以它为输入的第六章图表会重新请求。
+每个连接最多保持 DATASET_SSE_HOLD 秒，超出 DATASET_SSE_STREAMS 的连接立即结束并让浏览器
+BUSY_RETRY_MS 后重连；重连时带上 Last-Event-ID，版本已变化时立刻收到事件。
+
+容量代价：保持中的连接在整个 DATASET_SSE_HOLD 期间占用一个 gunicorn 线程。按默认的
+4 个线程，每个 worker 保持 1 个连接时回调只剩 3 个线程（吞吐上限降低约四分之一），
+保持 2 个时只剩一半。所以默认每个 worker 只保持 1 个连接，其余页面按 BUSY_RETRY_MS
+轮询（数据更新后最迟约 30 秒刷新）；调大 DATASET_SSE_STREAMS 前应同时调大 GUNICORN_THREADS。
+
+环境变量：
+    DATASET_WATCH=0            不监视数据文件
+    DATASET_POLL_SECONDS=2
+    DATASET_SSE_HOLD=30
+    DATASET_SSE_STREAMS=1
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from flask import Response, request
+
+DEFAULT_POLL_SECONDS = 2.0
+DEFAULT_SSE_HOLD = 30.0
+# 每个 worker 同时保持的推送连接数，每个占用一个 gunicorn 线程（见模块说明中的容量代价）
+DEFAULT_SSE_STREAMS = 1
+# 连接数已满时让浏览器等待多久再重连（毫秒）
+BUSY_RETRY_MS = 30000
+
+
+class Snapshot:
+    """某个版本的数据，构建后只读"""
+
+    def __init__(self, frame, version):
+        self.frame = frame
+        self.version = version
+        self.loaded_at = time.time()
+
+
+def file_version(paths):
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def _stat(paths):
+    stats = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stats.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stats.append(None)
+    return stats
+
+
+class DatasetManager:
+    """加载、监视并原子替换数据快照"""
+
+    def __init__(self, loader, paths):
+        self.loader = loader
+        self.paths = list(paths)
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.changed = threading.Condition()
+        self.watcher = None
+        self.watcher_pid = None
+        self.stats = _stat(self.paths)
+        self.current = Snapshot(None, None)
+        self.reload()
+
+    @property
+    def version(self):
+        return self.current.version
+
+    def on_swap(self, listener):
+        """登记替换快照后调用的函数 listener(snapshot)"""
+        self.listeners.append(listener)
+
+    def reload(self):
+        """文件内容与当前版本不同时构建新快照并替换，返回是否替换"""
+        with self.lock:
+            self.stats = _stat(self.paths)
+            try:
+                version = file_version(self.paths)
+                if version == self.current.version:
+                    return False
+                snapshot = Snapshot(self.loader(*self.paths), version)
+            except Exception as e:
+                print(f"Error loading {', '.join(self.paths)}: {e}")
+                return False
+            self.current = snapshot
+            for listener in self.listeners:
+                listener(snapshot)
+        with self.changed:
+            self.changed.notify_all()
+        print(f"Dataset version {snapshot.version} loaded (pid {os.getpid()})", flush=True)
+        return True
+
+    def ensure(self, version):
+        """进程池子进程调用：与 worker 的数据版本不一致时重新加载"""
+        if version != self.current.version:
+            self.reload()
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            if _stat(self.paths) != self.stats:
+                self.reload()
+
+    def watch(self, interval=DEFAULT_POLL_SECONDS):
+        """启动监视线程（每个进程一个，fork 后需重新启动）"""
+        if self.watcher_pid == os.getpid() and self.watcher.is_alive():
+            return self.watcher
+        self.watcher = threading.Thread(target=self._watch, args=(interval,), name='dataset-watcher', daemon=True)
+        self.watcher_pid = os.getpid()
+        self.watcher.start()
+        return self.watcher
+
+    def watch_from_env(self, environ=os.environ):
+        """gunicorn 的 post_worker_init 调用；DATASET_WATCH=0 时不监视"""
+        if environ.get('DATASET_WATCH') in ('0', 'false', 'no'):
+            return None
+        return self.watch(float(environ.get('DATASET_POLL_SECONDS', DEFAULT_POLL_SECONDS)))
+
+    def wait_for_change(self, version, timeout):
+        """等待版本不同于 version，返回当前版本（超时时可能仍相同）"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.current.version != version, timeout)
+        return self.current.version
+
+
+def _event(version, outputs):
+    data = json.dumps({'version': version, 'outputs': outputs})
+    return f'id: {version}\nevent: dataset\ndata: {data}\n\n'
+
+
+def install_events(server, manager, outputs, environ=os.environ):
+    """注册 /events/dataset；outputs 为依赖样本数据的回调输出"""
+    hold = float(environ.get('DATASET_SSE_HOLD', DEFAULT_SSE_HOLD))
+    streams = threading.BoundedSemaphore(int(environ.get('DATASET_SSE_STREAMS', DEFAULT_SSE_STREAMS)))
+
+    @server.route('/events/dataset')
+    def dataset_events():
+        seen = request.headers.get('Last-Event-ID') or request.args.get('version')
+
+        def stream():
+            version = manager.version
+            if version != seen:
+                yield _event(version, outputs)
+                return
+            if not streams.acquire(blocking=False):
+                yield f'retry: {BUSY_RETRY_MS}\n\n'
+                return
+            try:
+                version = manager.wait_for_change(seen, hold)
+                if version != seen:
+                    yield _event(version, outputs)
+            finally:
+                streams.release()
+            yield 'retry: 1000\n\n'
+
+        return Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    return server
@@ -8,6 +8,8 @@ from dash import html, dcc
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+from plotly.io.json import to_json_plotly
 import json
 import pandas as pd
 import numpy as np
@@ -16,8 +18,34 @@ import matplotlib.pyplot as plt
 import io
 import base64
 import os
+import glob
+import re
+import html as html_lib
+import shutil
+import urllib.request
+import hashlib
+import inspect
+import ast
+import argparse
+import gzip
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from collections import Counter
 
+import static_cube
+from content_hash import file_digest
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 增量构建缓存目录（图表片段 + 输入指纹清单）
+CACHE_DIR = '.static_cache'
+MANIFEST_PATH = os.path.join(CACHE_DIR, 'manifest.json')
+# assets/ 中只在 Dash 服务端有意义的文件，不复制到静态站点
+# （dataset_events.js 订阅 /events/dataset，静态页面没有这个接口）
+SERVER_ONLY_ASSETS = ('dataset_events.js',)
+
 # 加载数据
 def load_data():
     """加载必要的分析数据"""
@@ -41,81 +69,293 @@ def load_data():
         print(f"Error loading data: {e}")
         return None, None, None
 
-def create_static_charts(viz_data, analysis_data, simulated_df):
-    """创建静态图表"""
-    charts = {}
+def _style_figure(fig):
+    """统一静态图表的学术风格"""
+    fig.update_layout(
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(family='Source Sans Pro', size=12)
+    )
+    return fig
+
+def build_age_distribution(viz_data, analysis_data, simulated_df):
+    """1. 年龄分布图"""
+    if not viz_data or 'age_distribution' not in viz_data:
+        return None
+    age_data = viz_data['age_distribution']
+    fig = px.bar(
+        x=list(age_data.keys()),
+        y=list(age_data.values()),
+        title="年龄分布",
+        labels={'x': '年龄段', 'y': '人数'}
+    )
+    return _style_figure(fig).to_json()
+
+def build_education_distribution(viz_data, analysis_data, simulated_df):
+    """2. 教育水平分布"""
+    if not viz_data or 'education_distribution' not in viz_data:
+        return None
+    edu_data = viz_data['education_distribution']
+    fig = px.pie(
+        values=list(edu_data.values()),
+        names=list(edu_data.keys()),
+        title="教育水平分布"
+    )
+    return _style_figure(fig).to_json()
+
+def build_tech_usage(viz_data, analysis_data, simulated_df):
+    """3. 科技产品使用情况"""
+    if simulated_df is None:
+        return None
+    tech_cols = ['mobile_phone', 'laptop_computer', 'desktop_computer', 'tablet']
+    available_cols = [col for col in tech_cols if col in simulated_df.columns]
+    if not available_cols:
+        return None
+    usage_data = simulated_df[available_cols].mean() * 100
+    fig = px.bar(
+        x=usage_data.index,
+        y=usage_data.values,
+        title="科技产品使用率 (%)",
+        labels={'x': '产品类型', 'y': '使用率 (%)'}
+    )
+    return _style_figure(fig).to_json()
+
+def build_internet_access(viz_data, analysis_data, simulated_df):
+    """4. 互联网接入方式分布"""
+    if simulated_df is None or 'internet_access' not in simulated_df.columns:
+        return None
+    internet_data = simulated_df['internet_access'].value_counts()
+    fig = px.bar(
+        x=internet_data.index,
+        y=internet_data.values,
+        title="互联网接入情况",
+        labels={'x': '接入类型', 'y': '人数'}
+    )
+    return _style_figure(fig).to_json()
+
+def build_wordcloud(viz_data, analysis_data, simulated_df):
+    """关键词云（PNG 字节）"""
+    return render_wordcloud_png()
+
+# 交互版静态页面：按钮点击时加载预先计算好的回调输出并应用到页面
+DASHBOARD_JS = '''(function () {
+    function apply(outputs) {
+        Object.keys(outputs).forEach(function (key) {
+            var dot = key.lastIndexOf('.');
+            var el = document.getElementById(key.slice(0, dot));
+            var prop = key.slice(dot + 1);
+            var value = outputs[key];
+            if (!el) { return; }
+            if (prop === 'figure') {
+                el.dataset.loaded = '1';
+                StaticFigures.plot(el, value);
+            } else if (prop === 'children') {
+                el.innerHTML = value;
+            } else if (prop === 'style') {
+                el.setAttribute('style', value);
+            }
+        });
+    }
+
+    document.addEventListener('click', function (event) {
+        var button = event.target.closest('button[data-state]');
+        if (!button) { return; }
+        fetch(button.dataset.state)
+            .then(function (r) { return r.json(); })
+            .then(apply)
+            .catch(function (err) { console.error('Failed to load state', button.dataset.state, err); });
+    });
+
+    window.StaticDashboard = {apply: apply};
+})();
+'''
+
+# Dash 组件中不需要输出为 HTML 属性的字段
+_SKIPPED_PROPS = {'children', 'style', 'id', 'n_clicks', 'n_clicks_timestamp', 'disable_n_clicks',
+                  'key', 'loading_state', 'setProps'}
+_VOID_TAGS = {'img', 'br', 'hr', 'input'}
+_UNITLESS_CSS = {'flex', 'opacity', 'z-index', 'font-weight', 'line-height', 'order'}
+
+def _css_from_style(style):
+    """把 React 风格的 style 字典转换为 CSS 文本"""
+    declarations = []
+    for key, value in (style or {}).items():
+        prop = re.sub(r'([A-Z])', lambda m: '-' + m.group(1).lower(), key)
+        if isinstance(value, (int, float)) and prop not in _UNITLESS_CSS:
+            value = f'{value}px'
+        declarations.append(f'{prop}: {value}')
+    return '; '.join(declarations)
+
+def render_component(node, overrides=None, figure_urls=None, state_urls=None):
+    """
+    把 Dash 组件树渲染为静态 HTML。
+
+    overrides 为 {'id.prop': 值}（回调输出会覆盖布局中的同名属性），
+    figure_urls / state_urls 分别为图表与按钮状态的 JSON 地址。
+    """
+    overrides = overrides or {}
+    figure_urls = figure_urls or {}
+    state_urls = state_urls or {}
+
+    def render(node):
+        if node is None:
+            return ''
+        if isinstance(node, (list, tuple)):
+            return ''.join(render(child) for child in node)
+        if isinstance(node, (str, int, float)):
+            return html_lib.escape(str(node))
+
+        props = dict(node.to_plotly_json()['props'])
+        component_id = props.get('id')
+        for key, value in overrides.items():
+            target, prop = key.rsplit('.', 1)
+            if target == component_id:
+                props[prop] = value
+
+        attrs = {}
+        if component_id is not None:
+            attrs['id'] = component_id
+        if props.get('style'):
+            attrs['style'] = _css_from_style(props['style'])
+
+        if node._namespace == 'dash_html_components':
+            tag = node._type.lower()
+            for prop, value in props.items():
+                if prop in _SKIPPED_PROPS or value is None:
+                    continue
+                attrs['class' if prop == 'className' else prop] = value
+            if tag == 'button' and component_id in state_urls:
+                attrs['data-state'] = state_urls[component_id]
+            inner = render(props.get('children'))
+        elif node._type == 'Graph':
+            tag = 'div'
+            attrs['class'] = 'chart-figure'
+            if component_id in figure_urls:
+                attrs['data-figure'] = figure_urls[component_id]
+            inner = ''
+        elif node._type == 'Dropdown':
+            tag = 'select'
+            attrs['multiple'] = bool(props.get('multi'))
+            attrs['disabled'] = True
+            attrs['title'] = '静态版本暂不支持筛选'
+            selected = props.get('value') or []
+            options = []
+            for option in props.get('options') or []:
+                if not isinstance(option, dict):
+                    option = {'label': option, 'value': option}
+                mark = ' selected' if option['value'] in selected else ''
+                options.append(f'<option value="{html_lib.escape(str(option["value"]))}"{mark}>'
+                               f'{html_lib.escape(str(option["label"]))}</option>')
+            inner = ''.join(options)
+        else:
+            tag = 'div'
+            attrs['class'] = 'static-unavailable'
+            inner = '该交互组件需要运行完整的 Dash 应用'
+
+        rendered_attrs = ''
+        for name, value in attrs.items():
+            if value is True:
+                rendered_attrs += f' {name}'
+            elif value is not False:
+                rendered_attrs += f' {name}="{html_lib.escape(str(value))}"'
+        if tag in _VOID_TAGS:
+            return f'<{tag}{rendered_attrs}>'
+        return f'<{tag}{rendered_attrs}>{inner}</{tag}>'
 
-    # 1. 创建年龄分布图
-    if viz_data and 'age_distribution' in viz_data:
-        age_data = viz_data['age_distribution']
-        fig = px.bar(
-            x=list(age_data.keys()),
-            y=list(age_data.values()),
-            title="年龄分布",
-            labels={'x': '年龄段', 'y': '人数'}
-        )
-        fig.update_layout(
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            font=dict(family='Source Sans Pro', size=12)
-        )
-        charts['age_distribution'] = fig.to_html(full_html=False, include_plotlyjs=False)
-
-    # 2. 创建教育水平分布
-    if viz_data and 'education_distribution' in viz_data:
-        edu_data = viz_data['education_distribution']
-        fig = px.pie(
-            values=list(edu_data.values()),
-            names=list(edu_data.keys()),
-            title="教育水平分布"
-        )
-        fig.update_layout(
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            font=dict(family='Source Sans Pro', size=12)
-        )
-        charts['education_distribution'] = fig.to_html(full_html=False, include_plotlyjs=False)
-
-    # 3. 创建科技产品使用情况
-    if simulated_df is not None:
-        tech_cols = ['mobile_phone', 'laptop_computer', 'desktop_computer', 'tablet']
-        available_cols = [col for col in tech_cols if col in simulated_df.columns]
-
-        if available_cols:
-            usage_data = simulated_df[available_cols].mean() * 100
-            fig = px.bar(
-                x=usage_data.index,
-                y=usage_data.values,
-                title="科技产品使用率 (%)",
-                labels={'x': '产品类型', 'y': '使用率 (%)'}
-            )
-            fig.update_layout(
-                plot_bgcolor='white',
-                paper_bgcolor='white',
-                font=dict(family='Source Sans Pro', size=12)
-            )
-            charts['tech_usage'] = fig.to_html(full_html=False, include_plotlyjs=False)
-
-    # 4. 创建互联网接入方式分布
-    if simulated_df is not None and 'internet_access' in simulated_df.columns:
-        internet_data = simulated_df['internet_access'].value_counts()
-        fig = px.bar(
-            x=internet_data.index,
-            y=internet_data.values,
-            title="互联网接入情况",
-            labels={'x': '接入类型', 'y': '人数'}
-        )
-        fig.update_layout(
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            font=dict(family='Source Sans Pro', size=12)
-        )
-        charts['internet_access'] = fig.to_html(full_html=False, include_plotlyjs=False)
+    return render(node)
 
+def _serialize_output(prop, value):
+    """把回调输出转换为静态页面可直接使用的 JSON 值"""
+    if prop == 'figure':
+        return json.loads(to_json_plotly(value))
+    if prop == 'children':
+        return render_component(value)
+    if prop == 'style':
+        return _css_from_style(value)
+    return json.loads(to_json_plotly(value))
+
+def build_dashboard(viz_data, analysis_data, simulated_df):
+    """
+    导入 app.py，枚举所有按钮状态并预先计算回调输出。
+
+    返回 JSON：body 为按初始状态渲染的页面主体，states 为每个状态的输出。
+    """
+    import app as dash_module
+    import app_states
+
+    dash_app = dash_module.app
+    states = {}
+    initial = {}
+    for name, outputs in app_states.iter_button_states(dash_app):
+        # 关系网络图依赖 vis.js，静态版本不渲染
+        outputs = {key: value for key, value in outputs.items() if not key.endswith('.data')}
+        if name == 'initial':
+            initial = outputs
+        states[name] = {key: _serialize_output(key.rsplit('.', 1)[1], value)
+                        for key, value in outputs.items()}
+
+    graph_ids = [key.rsplit('.', 1)[0] for key in initial if key.endswith('.figure')]
+    body = render_component(
+        dash_app.layout,
+        overrides={key: value for key, value in initial.items() if not key.endswith('.figure')},
+        figure_urls={graph_id: f'figures/app/{graph_id}.json' for graph_id in graph_ids},
+        state_urls={name: f'states/{name}.json' for name in states
+                    if name != 'initial' and name not in CLIENT_SIDE_BUTTONS},
+    )
+    match = re.search(r'<style>(.*?)</style>', dash_app.index_string, re.S)
+    return json.dumps({
+        'title': dash_app.title,
+        'css': match.group(1) if match else '',
+        'body': body,
+        'states': states,
+    }, ensure_ascii=False)
+
+def build_chapter6_cube(viz_data, analysis_data, simulated_df):
+    """第六章模拟数据的二进制立方体，供浏览器端筛选（见 static_cube.py）"""
+    import app as dash_module
+
+    if dash_module.simulated_df is None or dash_module.simulated_df.empty:
+        return None
+    return static_cube.encode_samples(dash_module.simulated_df, dash_module.USAGE_ACTIVITY_LABELS,
+                                      static_cube.AGE_ORDER)
+
+# 由 assets/chapter6.js 在浏览器端处理的按钮，不预先导出状态
+CLIENT_SIDE_BUTTONS = {'reset-simulated-filters'}
+
+# 图表名称 -> (构建函数, 输入数据文件, 输出扩展名)
+# 构建函数所在模块与输入文件的哈希会写入清单（见 chart_input_hash），修改后对应图表自动重建
+CHART_BUILDERS = {
+    'age_distribution': (build_age_distribution, ['viz_data.json'], 'json'),
+    'education_distribution': (build_education_distribution, ['viz_data.json'], 'json'),
+    'tech_usage': (build_tech_usage, ['simulated_samples_clean.csv'], 'json'),
+    'internet_access': (build_internet_access, ['simulated_samples_clean.csv'], 'json'),
+    'wordcloud': (build_wordcloud, [], 'png'),
+    'dashboard': (build_dashboard, ['app.py', 'app_states.py', 'viz_data.json',
+                                    'detailed_analysis.json', 'simulated_samples_clean.csv']
+                  + sorted(glob.glob('SC_UTI_FR_*_Y.xls')), 'bundle'),
+    'chapter6_cube': (build_chapter6_cube, ['app.py', 'simulated_samples_clean.csv'], 'bin'),
+}
+
+def create_static_charts(viz_data, analysis_data, simulated_df):
+    """创建静态图表（串行，单进程），返回 {图表名: 图表JSON}"""
+    charts = {}
+    for name, (builder, _, ext) in CHART_BUILDERS.items():
+        if ext != 'json':
+            continue
+        output = builder(viz_data, analysis_data, simulated_df)
+        if output is not None:
+            charts[name] = output
     return charts
 
 def create_wordcloud():
-    """创建关键词云"""
+    """创建关键词云（base64 data URI）"""
+    png = render_wordcloud_png()
+    if png is None:
+        return None
+    return f"data:image/png;base64,{base64.b64encode(png).decode()}"
+
+def render_wordcloud_png():
+    """渲染关键词云为 PNG 字节"""
     try:
         # 这里可以根据你的数据创建词云
         # 暂时创建一个示例词云
@@ -132,19 +372,474 @@ def create_wordcloud():
         plt.imshow(wordcloud, interpolation='bilinear')
         plt.axis('off')
 
-        # 转换为base64
         buffer = io.BytesIO()
         plt.savefig(buffer, format='png', bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
         plt.close()
 
-        return f"data:image/png;base64,{image_base64}"
+        return buffer.getvalue()
     except Exception as e:
         print(f"Error creating wordcloud: {e}")
         return None
 
-def export_to_static():
+def local_modules(path, seen=None):
+    """
+    path 及其在模块级导入的本仓库模块（递归），返回排序后的文件列表。
+
+    函数体内的导入不计入（如 build_chapter6_cube 中的 import app），需要时在输入文件中列出。
+    """
+    seen = set() if seen is None else seen
+    if path in seen or not os.path.exists(path):
+        return sorted(seen)
+    seen.add(path)
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        tree = ast.parse(f.read(), path)
+    pending = list(tree.body)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and not node.level:
+            names = [node.module]
+        else:
+            names = []
+            pending.extend(ast.iter_child_nodes(node))
+        for module in names:
+            module_path = os.path.join(os.path.dirname(path), module.split('.')[0] + '.py')
+            local_modules(module_path, seen)
+    return sorted(seen)
+
+def chart_input_hash(name):
+    """
+    图表输入指纹：数据文件内容 + 源码。
+
+    源码取构建函数所在模块（连同 _style_figure 等辅助函数）及其导入的本仓库模块；
+    输入中的 .py 文件同样展开为它导入的本仓库模块，app.py 新增依赖时无需改这里的列表。
+    """
+    builder, inputs, _ = CHART_BUILDERS[name]
+    paths = set(local_modules(os.path.relpath(inspect.getsourcefile(builder))))
+    for path in inputs:
+        paths.update(local_modules(path) if path.endswith('.py') else [path])
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(path.encode('utf-8'))
+        digest.update((file_digest(path) if os.path.exists(path) else 'missing').encode('utf-8'))
+    return digest.hexdigest()
+
+def load_manifest():
+    """读取上次构建的图表清单"""
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_manifest(manifest):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+def _chart_cache_path(name):
+    _, _, ext = CHART_BUILDERS[name]
+    return os.path.join(CACHE_DIR, 'charts', f'{name}.{ext}')
+
+# 工作进程内加载的数据 (viz_data, analysis_data, simulated_df)
+_worker_data = None
+
+def _init_worker():
+    """进程池初始化：每个工作进程只加载一次数据"""
+    global _worker_data
+    _worker_data = load_data()
+
+def _build_chart(name):
+    """在工作进程中构建单个图表"""
+    builder, _, _ = CHART_BUILDERS[name]
+    return name, builder(*_worker_data)
+
+def build_charts(workers=None, force=False):
+    """
+    并行、增量地构建所有图表。
+
+    只有输入指纹与清单不一致（或缓存缺失）的图表才会重新生成，
+    其余直接复用 .static_cache 中的结果。返回 {图表名: 缓存文件路径}，
+    没有数据的图表不出现在结果中。
+    """
+    manifest = {} if force else load_manifest()
+    hashes = {name: chart_input_hash(name) for name in CHART_BUILDERS}
+
+    stale = []
+    for name, digest in hashes.items():
+        entry = manifest.get(name)
+        cached = entry and entry.get('hash') == digest and (
+            entry.get('empty') or os.path.exists(_chart_cache_path(name)))
+        if not cached:
+            stale.append(name)
+
+    print(f"图表总数: {len(hashes)}，需要重建: {len(stale)}")
+
+    if stale:
+        os.makedirs(os.path.join(CACHE_DIR, 'charts'), exist_ok=True)
+        workers = min(workers or os.cpu_count() or 1, len(stale))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(_build_chart, name) for name in stale]
+            for future in as_completed(futures):
+                name, output = future.result()
+                if output is None:
+                    manifest[name] = {'hash': hashes[name], 'empty': True}
+                    continue
+                if isinstance(output, str):
+                    output = output.encode('utf-8')
+                with open(_chart_cache_path(name), 'wb') as f:
+                    f.write(output)
+                manifest[name] = {'hash': hashes[name]}
+                print(f"  已重建: {name}")
+
+    # 清理已删除图表的清单条目
+    manifest = {name: entry for name, entry in manifest.items() if name in hashes}
+    save_manifest(manifest)
+
+    return {name: _chart_cache_path(name) for name in hashes
+            if not manifest[name].get('empty')}
+
+# plotly.js 官方分包及其包含的 trace 类型，按体积从小到大排列
+PLOTLY_PARTIAL_BUNDLES = [
+    ('basic', {'bar', 'pie', 'scatter'}),
+    ('cartesian', {'bar', 'box', 'contour', 'heatmap', 'histogram', 'histogram2d',
+                   'histogram2dcontour', 'image', 'pie', 'scatter', 'scatterternary', 'violin'}),
+    ('finance', {'bar', 'candlestick', 'funnel', 'funnelarea', 'histogram', 'indicator',
+                 'ohlc', 'pie', 'scatter', 'waterfall'}),
+]
+PLOTLY_CDN = 'https://cdn.plot.ly'
+
+# 图表懒加载脚本：进入视口时才拉取对应的图表JSON并渲染
+FIGURE_LOADER_JS = '''(function () {
+    var template = null;
+
+    function loadTemplate() {
+        if (!template) {
+            template = fetch('figures/template.json').then(function (r) { return r.json(); });
+        }
+        return template;
+    }
+
+    function plot(el, fig) {
+        return loadTemplate().then(function (shared) {
+            var layout = fig.layout || {};
+            if (!layout.template) { layout.template = shared; }
+            return Plotly.react(el, fig.data, layout, {responsive: true, displaylogo: false});
+        });
+    }
+
+    function render(el) {
+        if (el.dataset.loaded) { return; }
+        el.dataset.loaded = '1';
+        fetch(el.dataset.figure)
+            .then(function (r) { return r.json(); })
+            .then(function (fig) { return plot(el, fig); })
+            .catch(function (err) { console.error('Failed to load figure', el.dataset.figure, err); });
+    }
+
+    function observe(root) {
+        var els = (root || document).querySelectorAll('[data-figure]');
+        if (!('IntersectionObserver' in window)) {
+            els.forEach(render);
+            return;
+        }
+        var io = new IntersectionObserver(function (entries) {
+            entries.forEach(function (entry) {
+                if (entry.isIntersecting) {
+                    io.unobserve(entry.target);
+                    render(entry.target);
+                }
+            });
+        }, {rootMargin: '200px'});
+        els.forEach(function (el) { io.observe(el); });
+    }
+
+    window.StaticFigures = {plot: plot, render: render, observe: observe};
+    document.addEventListener('DOMContentLoaded', function () { observe(document); });
+})();
+'''
+
+def _iter_figures(obj):
+    """遍历 JSON 中的所有图表（含 data 列表的字典）"""
+    if isinstance(obj, dict):
+        if isinstance(obj.get('data'), list) and 'layout' in obj:
+            yield obj
+            return
+        for value in obj.values():
+            yield from _iter_figures(value)
+
+def collect_trace_types(json_paths):
+    """收集图表/状态JSON中用到的所有 trace 类型"""
+    trace_types = set()
+    for path in json_paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for fig in _iter_figures(json.load(f)):
+                for trace in fig['data']:
+                    trace_types.add(trace.get('type', 'scatter'))
+    return trace_types
+
+def select_plotly_bundle(trace_types):
+    """选择能覆盖全部 trace 类型的最小官方分包，没有则返回 None（完整包）"""
+    for name, supported in PLOTLY_PARTIAL_BUNDLES:
+        if trace_types <= supported:
+            return name
+    return None
+
+def _load_partial_bundle(bundle, version):
+    """读取缓存的分包；缓存缺失时从CDN下载一次，下载失败时终止导出（不悄悄换成完整包）"""
+    cache_path = os.path.join(CACHE_DIR, 'plotly', f'plotly-{bundle}-{version}.min.js')
+    if not os.path.exists(cache_path):
+        url = f'{PLOTLY_CDN}/plotly-{bundle}-{version}.min.js'
+        try:
+            with urllib.request.urlopen(url, timeout=15) as response:
+                content = response.read()
+        except Exception as e:
+            raise SystemExit(f"无法下载 plotly.js {bundle} 分包 {url}（{e}）。\n"
+                             f"可手动下载到 {cache_path} 后重新导出，"
+                             f"或加 --full-plotly 让所有页面使用完整包（约 {len(get_plotlyjs()) // 1024} KB）")
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            f.write(content)
+    with open(cache_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def write_plotly_bundles(static_dir, page_trace_types, full=False):
+    """
+    为每个页面自托管 plotly.js，返回 {页面: 脚本地址}。
+
+    各页面按自己用到的 trace 类型选择最小的官方分包（版本与 Python plotly 内置的
+    plotly.js 一致）：首页只有 bar/pie/scatter 时用 basic 分包，不因交互版页面的
+    sankey、treemap 而加载完整包；选到同一分包的页面共用一个文件。
+    没有分包能覆盖时用 plotly 包自带的完整版本；full 为 True 时所有页面都用完整版本。
+    """
+    version = get_plotlyjs_version()
+    scripts = {}
+    for page, trace_types in page_trace_types.items():
+        bundle = None if full else select_plotly_bundle(trace_types)
+        filename = f'plotly-{bundle or "full"}.min.js'
+        path = os.path.join(static_dir, 'assets', filename)
+        if not os.path.exists(path):
+            js = _load_partial_bundle(bundle, version) if bundle else get_plotlyjs()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(js)
+        print(f"plotly.js {version} ({bundle or 'full'}) -> {path} ({os.path.getsize(path) // 1024} KB)，"
+              f"{page} 的 trace类型: {sorted(trace_types)}")
+        scripts[page] = f'assets/{filename}'
+    return scripts
+
+def _detach_template(fig, shared):
+    """去掉与共享模板相同的 layout.template，返回（可能刚确定的）共享模板"""
+    template = fig.get('layout', {}).get('template')
+    if template is not None and template == (shared or template):
+        del fig['layout']['template']
+        return template
+    return shared
+
+def _write_json(path, obj):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(',', ':'))
+
+def publish_charts(static_dir, charts, shared_template=None):
+    """
+    把缓存的图表JSON与词云图片复制到静态目录。
+
+    各图表共用的 layout.template 只保留一份（见 write_shared_template），
+    由懒加载脚本在渲染前合并回去，避免每个图表重复携带。
+    返回 (页面引用的相对路径, 共享模板)。
+    """
+    urls = {}
+    for name, path in charts.items():
+        if not path.endswith('.json'):
+            filename = os.path.basename(path)
+            shutil.copyfile(path, os.path.join(static_dir, 'assets', filename))
+            urls[name] = f'assets/{filename}'
+            continue
+
+        with open(path, 'r', encoding='utf-8') as f:
+            fig = json.load(f)
+        shared_template = _detach_template(fig, shared_template)
+        _write_json(os.path.join(static_dir, 'figures', f'{name}.json'), fig)
+        urls[name] = f'figures/{name}.json'
+    return urls, shared_template
+
+def publish_dashboard(static_dir, bundle_path, shared_template=None, cube_url=None,
+                      plotly_src='assets/plotly-full.min.js'):
+    """
+    写出交互版页面 dashboard.html、初始图表与各按钮状态，返回共享模板。
+
+    cube_url 为第六章二进制立方体的地址，提供时第六章的筛选在浏览器端完成；
+    plotly_src 为该页面使用的 plotly.js（见 write_plotly_bundles）。
+    """
+    with open(bundle_path, 'r', encoding='utf-8') as f:
+        bundle = json.load(f)
+
+    for name, outputs in bundle['states'].items():
+        for fig in _iter_figures(outputs):
+            shared_template = _detach_template(fig, shared_template)
+        if name != 'initial':
+            _write_json(os.path.join(static_dir, 'states', f'{name}.json'), outputs)
+
+    for key, fig in bundle['states']['initial'].items():
+        graph_id, prop = key.rsplit('.', 1)
+        if prop == 'figure':
+            _write_json(os.path.join(static_dir, 'figures', 'app', f'{graph_id}.json'), fig)
+
+    with open(os.path.join(static_dir, 'assets', 'dashboard.js'), 'w', encoding='utf-8') as f:
+        f.write(DASHBOARD_JS)
+
+    chapter6_script = ''
+    if cube_url:
+        with open(os.path.join(static_dir, 'assets', 'chapter6.js'), 'w', encoding='utf-8') as f:
+            f.write(static_cube.CHAPTER6_JS)
+        chapter6_script = f'\n    <script src="assets/chapter6.js" data-cube="{cube_url}" defer></script>'
+
+    page = f'''<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{html_lib.escape(bundle['title'])}</title>
+    <script src="{plotly_src}" defer></script>
+    <script src="assets/figure-loader.js" defer></script>
+    <script src="assets/dashboard.js" defer></script>{chapter6_script}
+    <style>{bundle['css']}
+        .static-unavailable {{
+            padding: 40px;
+            text-align: center;
+            color: #7F8C8D;
+            font-style: italic;
+        }}
+    </style>
+</head>
+<body>
+{bundle['body']}
+</body>
+</html>
+'''
+    with open(os.path.join(static_dir, 'dashboard.html'), 'w', encoding='utf-8') as f:
+        f.write(page)
+    print(f"交互版页面: {len(bundle['states']) - 1} 个按钮状态 -> {static_dir}/dashboard.html")
+    return shared_template
+
+def write_shared_template(static_dir, shared_template):
+    _write_json(os.path.join(static_dir, 'figures', 'template.json'), shared_template or {})
+
+def _chart_placeholder(url):
+    """懒加载图表的占位元素"""
+    return f'<div class="chart-figure" data-figure="{url}"></div>'
+
+# 不做内容哈希的文件：页面入口需要固定地址，其余为托管平台的配置文件
+_UNHASHED = {'.nojekyll', '_headers', 'asset-manifest.json'}
+_COMPRESSIBLE = ('.html', '.json', '.js')
+# 引用顺序：图片/二进制 -> JSON -> JS，被引用的文件先改名，引用方再改写并计算哈希
+_HASH_ORDER = {'.json': 1, '.js': 2}
+
+def _is_generated_sibling(filename):
+    return filename.endswith(('.gz', '.br'))
+
+def fingerprint_assets(static_dir):
+    """
+    把除 HTML 以外的静态文件改名为 名称.<内容哈希>.扩展名，并改写各文件中的引用。
+
+    清单写入 asset-manifest.json（原路径 -> 哈希路径），返回该清单。
+    哈希后的文件内容不会再变，可以配合 _headers 设置长期缓存。
+    """
+    paths = []
+    for root, _, filenames in os.walk(static_dir):
+        for filename in filenames:
+            if filename in _UNHASHED or filename.endswith('.html') or _is_generated_sibling(filename):
+                continue
+            paths.append(os.path.relpath(os.path.join(root, filename), static_dir).replace(os.sep, '/'))
+    paths.sort(key=lambda path: (_HASH_ORDER.get(os.path.splitext(path)[1], 0), path))
+
+    manifest = {}
+
+    def rewrite(text):
+        if not manifest:
+            return text
+        pattern = re.compile(r'(?<=["\'])(' + '|'.join(map(re.escape, manifest)) + r')(?=["\'\\)])')
+        return pattern.sub(lambda m: manifest[m.group(1)], text)
+
+    for path in paths:
+        full_path = os.path.join(static_dir, path)
+        with open(full_path, 'rb') as f:
+            content = f.read()
+        if path.endswith(('.json', '.js')):
+            content = rewrite(content.decode('utf-8')).encode('utf-8')
+        stem, ext = os.path.splitext(path)
+        hashed = f'{stem}.{hashlib.sha256(content).hexdigest()[:10]}{ext}'
+        with open(os.path.join(static_dir, hashed), 'wb') as f:
+            f.write(content)
+        os.remove(full_path)
+        manifest[path] = hashed
+
+    for filename in os.listdir(static_dir):
+        if filename.endswith('.html'):
+            page_path = os.path.join(static_dir, filename)
+            with open(page_path, 'r', encoding='utf-8') as f:
+                page = f.read()
+            with open(page_path, 'w', encoding='utf-8') as f:
+                f.write(rewrite(page))
+
+    _write_json(os.path.join(static_dir, 'asset-manifest.json'), manifest)
+    print(f"内容哈希: {len(manifest)} 个静态文件 -> {static_dir}/asset-manifest.json")
+    return manifest
+
+def write_cache_headers(static_dir):
+    """写出 Netlify / Cloudflare Pages 格式的 _headers：哈希文件长期缓存，页面每次校验"""
+    immutable = '  Cache-Control: public, max-age=31536000, immutable'
+    revalidate = '  Cache-Control: no-cache'
+    rules = []
+    for directory in ('assets', 'figures', 'states'):
+        rules += [f'/{directory}/*', immutable]
+    rules += ['/', revalidate, '/*.html', revalidate, '/asset-manifest.json', revalidate]
+    with open(os.path.join(static_dir, '_headers'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(rules) + '\n')
+
+def _compressed(content, suffix):
+    """按内容哈希缓存压缩结果，plotly.js 等未变化的大文件不必每次重新压缩"""
+    cache_path = os.path.join(CACHE_DIR, 'compressed', hashlib.sha256(content).hexdigest() + suffix)
+    if os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            return f.read()
+    if suffix == '.br':
+        data = brotli.compress(content, quality=11)
+    else:
+        data = gzip.compress(content, compresslevel=9, mtime=0)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'wb') as f:
+        f.write(data)
+    return data
+
+def precompress(static_dir):
+    """为 HTML/JSON/JS 生成 .gz 与 .br 预压缩文件（未安装 brotli 时只生成 .gz）"""
+    if brotli is None:
+        print("未安装 brotli，跳过 .br 预压缩")
+    original_size = compressed_size = 0
+    for root, _, filenames in os.walk(static_dir):
+        for filename in filenames:
+            if not filename.endswith(_COMPRESSIBLE):
+                continue
+            path = os.path.join(root, filename)
+            with open(path, 'rb') as f:
+                content = f.read()
+            variants = {'.gz': _compressed(content, '.gz')}
+            if brotli is not None:
+                variants['.br'] = _compressed(content, '.br')
+            for suffix, data in variants.items():
+                # 压缩后没有变小的文件不生成副本，服务器直接返回原文件
+                if len(data) < len(content):
+                    with open(path + suffix, 'wb') as f:
+                        f.write(data)
+            original_size += len(content)
+            compressed_size += min(len(data) for data in variants.values())
+    print(f"预压缩: {original_size // 1024} KB -> {compressed_size // 1024} KB")
+
+def export_to_static(workers=None, force=False, full_plotly=False):
     """导出静态版本"""
 
     # 创建输出目录
@@ -152,14 +847,39 @@ def export_to_static():
     if not os.path.exists(static_dir):
         os.makedirs(static_dir)
 
-    # 加载数据
-    viz_data, analysis_data, simulated_df = load_data()
+    # 复制assets文件夹（不含只用于服务端的文件）
+    assets_dest = os.path.join(static_dir, 'assets')
+    if os.path.exists(assets_dest):
+        shutil.rmtree(assets_dest)
+    if os.path.exists('assets'):
+        shutil.copytree('assets', assets_dest, ignore=shutil.ignore_patterns(*SERVER_ONLY_ASSETS))
+    else:
+        os.makedirs(assets_dest)
+
+    for generated in ('figures', 'states'):
+        if os.path.exists(os.path.join(static_dir, generated)):
+            shutil.rmtree(os.path.join(static_dir, generated))
+
+    # 并行、增量构建图表、词云与交互版页面，图表JSON单独成文件按需加载
+    charts = build_charts(workers=workers, force=force)
+    dashboard_bundle = charts.pop('dashboard', None)
 
-    # 创建静态图表
-    charts = create_static_charts(viz_data, analysis_data, simulated_df)
+    # 每个页面自托管覆盖其图表的最小 plotly.js 分包，页面不依赖任何外部资源
+    page_trace_types = {'index': collect_trace_types([path for path in charts.values() if path.endswith('.json')])}
+    if dashboard_bundle:
+        page_trace_types['dashboard'] = collect_trace_types([dashboard_bundle])
+    plotly_scripts = write_plotly_bundles(static_dir, page_trace_types, full=full_plotly)
 
-    # 创建词云
-    wordcloud_img = create_wordcloud()
+    chart_urls, shared_template = publish_charts(static_dir, charts)
+    wordcloud_img = chart_urls.pop('wordcloud', None)
+    cube_url = chart_urls.pop('chapter6_cube', None)
+    if dashboard_bundle:
+        shared_template = publish_dashboard(static_dir, dashboard_bundle, shared_template, cube_url,
+                                            plotly_scripts['dashboard'])
+    write_shared_template(static_dir, shared_template)
+
+    with open(os.path.join(assets_dest, 'figure-loader.js'), 'w', encoding='utf-8') as f:
+        f.write(FIGURE_LOADER_JS)
 
     # 创建HTML内容
     html_content = f'''
@@ -169,8 +889,8 @@ def export_to_static():
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>澳门住户资讯科技使用状况分析</title>
-        <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-        <link href="https://fonts.googleapis.com/css2?family=Source+Sans+Pro:wght@300;400;600&display=swap" rel="stylesheet">
+        <script src="{plotly_scripts['index']}" defer></script>
+        <script src="assets/figure-loader.js" defer></script>
         <style>
             body {{
                 font-family: 'Source Sans Pro', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
@@ -214,6 +934,9 @@ def export_to_static():
                 border-radius: 8px;
                 background: #f8f9fa;
             }}
+            .chart-figure {{
+                min-height: 450px;
+            }}
             .chart-title {{
                 font-size: 1.5em;
                 font-weight: 600;
@@ -288,6 +1011,7 @@ def export_to_static():
             <div class="content">
                 <div class="notice">
                     <strong>📊 静态版本说明：</strong> 这是为了GitHub Pages部署而生成的静态版本。
+                    全部五个章节的交互版本请打开 <a href="dashboard.html">交互式仪表板</a>（按钮状态均已预先计算，无需服务器）。
                     完整的交互功能请查看 <a href="https://github.com/[你的用户名]/[仓库名]" target="_blank">GitHub仓库</a> 并本地运行。
                 </div>
 
@@ -317,42 +1041,42 @@ def export_to_static():
     '''
 
     # 添加图表
-    if 'age_distribution' in charts:
+    if 'age_distribution' in chart_urls:
         html_content += f'''
                     <div class="chart-container">
                         <div class="chart-title">年龄分布</div>
                         <div class="chart">
-                            {charts['age_distribution']}
+                            {_chart_placeholder(chart_urls['age_distribution'])}
                         </div>
                     </div>
         '''
 
-    if 'education_distribution' in charts:
+    if 'education_distribution' in chart_urls:
         html_content += f'''
                     <div class="chart-container">
                         <div class="chart-title">教育水平分布</div>
                         <div class="chart">
-                            {charts['education_distribution']}
+                            {_chart_placeholder(chart_urls['education_distribution'])}
                         </div>
                     </div>
         '''
 
-    if 'tech_usage' in charts:
+    if 'tech_usage' in chart_urls:
         html_content += f'''
                     <div class="chart-container full-width">
                         <div class="chart-title">科技产品使用率</div>
                         <div class="chart">
-                            {charts['tech_usage']}
+                            {_chart_placeholder(chart_urls['tech_usage'])}
                         </div>
                     </div>
         '''
 
-    if 'internet_access' in charts:
+    if 'internet_access' in chart_urls:
         html_content += f'''
                     <div class="chart-container">
                         <div class="chart-title">互联网接入情况</div>
                         <div class="chart">
-                            {charts['internet_access']}
+                            {_chart_placeholder(chart_urls['internet_access'])}
                         </div>
                     </div>
         '''
@@ -363,7 +1087,7 @@ def export_to_static():
                     <div class="chart-container full-width">
                         <div class="chart-title">关键词分析</div>
                         <div class="wordcloud-container">
-                            <img src="{wordcloud_img}" alt="关键词云分析">
+                            <img src="{wordcloud_img}" alt="关键词云分析" loading="lazy">
                         </div>
                     </div>
         '''
@@ -410,16 +1134,22 @@ def export_to_static():
     with open(os.path.join(static_dir, 'index.html'), 'w', encoding='utf-8') as f:
         f.write(html_content)
 
-    # 复制assets文件夹
-    import shutil
-    if os.path.exists('assets'):
-        assets_dest = os.path.join(static_dir, 'assets')
-        if os.path.exists(assets_dest):
-            shutil.rmtree(assets_dest)
-        shutil.copytree('assets', assets_dest)
+    # 内容哈希命名 + 预压缩，静态托管可直接返回 .br/.gz 并对哈希文件设置长期缓存
+    for filename in os.listdir(static_dir):
+        if _is_generated_sibling(filename):
+            os.remove(os.path.join(static_dir, filename))
+    fingerprint_assets(static_dir)
+    write_cache_headers(static_dir)
+    precompress(static_dir)
 
     print(f"静态网站已生成到 {static_dir} 目录")
     print("推送代码后，GitHub Actions将自动部署到GitHub Pages")
 
 if __name__ == '__main__':
-    export_to_static()
+    parser = argparse.ArgumentParser(description='导出静态网站到 docs 目录')
+    parser.add_argument('--workers', type=int, default=None, help='并行进程数（默认为CPU核数）')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，重建全部图表')
+    parser.add_argument('--full-plotly', action='store_true',
+                        help='所有页面使用 plotly 包自带的完整 plotly.js（无法下载分包时离线导出）')
+    args = parser.parse_args()
+    export_to_static(workers=args.workers, force=args.force, full_plotly=args.full_plotly)
@@ -1,15 +1,11 @@
 import pandas as pd
 import json
 
-# 读取模拟数据
-df = pd.read_excel('simulated_samples.xlsx')
-
-print("原始列名:")
-for i, col in enumerate(df.columns):
-    print(f"{i}: {col}")
+SOURCE_PATH = 'simulated_samples.xlsx'
+OUTPUT_PATH = 'simulated_samples_clean.csv'
 
 # 创建正确的列名映射
-column_mapping = {
+COLUMN_MAPPING = {
     'age_group': 'age_group',
     'gender': 'gender',
     'internet_access': 'internet_access',
@@ -33,16 +29,56 @@ column_mapping = {
     'occupation': 'occupation'
 }
 
-# 重命名列
-df = df.rename(columns=column_mapping)
+# 分类字段的取值映射（中文 -> 应用中显示的英文），app.py 加载数据时使用，
+# stream_convert.py 转换时也可以直接应用
+CATEGORY_MAPPINGS = {
+    'internet_access': {
+        '有接入互联网': 'Has Internet Access',
+        '没有接入互联网': 'No Internet Access'
+    },
+    'internet_type': {
+        '手机流动数据': 'Mobile Data',
+        '家居宽带': 'Home Broadband',
+        '公共Wi-Fi': 'Public Wi-Fi'
+    },
+    'education_level': {
+        '小学或以下': 'Primary or Below',
+        '初中': 'Lower Secondary',
+        '高中': 'Upper Secondary',
+        '专上教育': 'Tertiary',
+        '研究生及以上': 'Postgraduate+'
+    },
+    'economic_status': {
+        '就业人口': 'Employed',
+        '退休人口': 'Retired',
+        '待业人口': 'Unemployed',
+        '其他非劳动力人口': 'Non-labour Force'
+    }
+}
+
+
+def clean(df, output_path=OUTPUT_PATH):
+    """把模拟数据的中文列名映射为英文并保存为CSV"""
+    print("原始列名:")
+    for i, col in enumerate(df.columns):
+        print(f"{i}: {col}")
+
+    # 重命名列
+    df = df.rename(columns=COLUMN_MAPPING)
+
+    print("\n映射后的列名:")
+    for col in df.columns:
+        print(col)
+
+    # 保存处理后的数据
+    df.to_csv(output_path, index=False, encoding='utf-8')
 
-print("\n映射后的列名:")
-for col in df.columns:
-    print(col)
+    print(f"\n数据已保存到 {output_path}")
+    print(f"数据形状: {df.shape}")
+    print(f"数据类型:\n{df.dtypes}")
+    return df
 
-# 保存处理后的数据
-df.to_csv('simulated_samples_clean.csv', index=False, encoding='utf-8')
 
-print("\n数据已保存到 simulated_samples_clean.csv")
-print(f"数据形状: {df.shape}")
-print(f"数据类型:\n{df.dtypes}")
\ No newline at end of file
+if __name__ == '__main__':
+    # 读取模拟数据
+    clean(pd.read_excel(SOURCE_PATH))
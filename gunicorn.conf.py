@@ -0,0 +1,135 @@
+"""
+生产环境的 gunicorn 配置（gunicorn 启动时自动读取当前目录下的 gunicorn.conf.py）：
+
+    gunicorn app:app
+
+- preload_app：主进程导入 app.py 并加载数据，worker 由 fork 得到，共享这些内存页；
+- 主进程在 fork 前预热回调缓存（见 warmup.py；同时填充 Plotly 校验器、模板、
+  matplotlib 字体等惰性加载的状态），再 gc.collect() + gc.freeze()，把已有对象移出
+  垃圾回收的扫描范围，避免 worker 里的 GC 写对象头、把共享页复制成私有页；
+- worker 数按可用核心数与内存决定：回调以 CPU 计算为主，受 GIL 限制，每个核心
+  一个 worker 即可占满，吞吐随核心数线性增长；每个 worker 再开几个线程，
+  让静态资源和轻量回调不必排在慢回调后面；
+- post_fork：worker 重新设置随机种子（否则各 worker 继承同一个随机数状态），
+  再启动计算散点图等 CPU 密集回调的子进程（见 callback_pool.py）；
+- post_worker_init：开始监视样本数据文件，并在后台再预热一次本 worker 的回调缓存，
+  完成前 /ready 返回 503。
+
+环境变量（命令行参数优先于这里的设置）：
+    PORT                   监听端口，默认 8050
+    WEB_CONCURRENCY        worker 数，不设置时自动计算
+    GUNICORN_THREADS       每个 worker 的线程数，默认 4
+    WORKER_MEMORY_MB       估算的单个 worker 内存（共享页之外），默认 200
+    GUNICORN_MAX_REQUESTS  worker 处理多少请求后重启，默认 0（不重启）
+    GUNICORN_TIMEOUT       默认 120 秒
+"""
+
+import gc
+import os
+import random
+
+DEFAULT_THREADS = 4
+DEFAULT_WORKER_MEMORY_MB = 200
+# 留给操作系统与主进程的内存比例
+MEMORY_HEADROOM = 0.2
+
+
+def _read_first_line(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def available_cpus():
+    """可用核心数：CPU 亲和性与 cgroup 配额中较小者"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # cgroup v2: "配额 周期"；v1: 两个文件
+    quota = _read_first_line('/sys/fs/cgroup/cpu.max')
+    if quota and not quota.startswith('max'):
+        limit, period = map(int, quota.split()[:2])
+    else:
+        limit = int(_read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') or -1)
+        period = int(_read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_period_us') or 100000)
+    if limit > 0 and period > 0:
+        cpus = min(cpus, max(1, limit // period))
+    return cpus
+
+
+def available_memory_mb():
+    """可用内存（MB）：cgroup 限额与 /proc/meminfo 的 MemAvailable 中较小者，未知时返回 None"""
+    values = []
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        limit = _read_first_line(path)
+        # v1 没有限额时是一个接近 2^63 的数
+        if limit and limit.isdigit() and int(limit) < 1 << 60:
+            values.append(int(limit) / 1024 / 1024)
+    try:
+        with open('/proc/meminfo', 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    values.append(int(line.split()[1]) / 1024)
+    except OSError:
+        pass
+    return min(values) if values else None
+
+
+def default_workers():
+    """每个核心一个 worker，内存不足时减少"""
+    workers = available_cpus()
+    memory = available_memory_mb()
+    if memory is not None:
+        per_worker = int(os.environ.get('WORKER_MEMORY_MB', DEFAULT_WORKER_MEMORY_MB))
+        workers = min(workers, int(memory * (1 - MEMORY_HEADROOM) // per_worker))
+    return max(1, workers)
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8050')}"
+preload_app = True
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY') or default_workers())
+threads = int(os.environ.get('GUNICORN_THREADS', DEFAULT_THREADS))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+
+def when_ready(server):
+    # preload_app 时应用已在主进程加载完毕，此时还没有 fork 任何 worker
+    import app
+    import warmup
+
+    warmup.warm_from_env(app.app.server, background=False)
+    gc.collect()
+    gc.freeze()
+    server.log.info("Froze %d objects before fork", gc.get_freeze_count())
+    server.log.info("Sizing: %d workers x %d threads (%d CPUs, %s MB available)",
+                    server.num_workers, server.cfg.threads, available_cpus(),
+                    f'{available_memory_mb():.0f}' if available_memory_mb() is not None else '?')
+
+
+def post_fork(server, worker):
+    import numpy as np
+
+    seed = int.from_bytes(os.urandom(4), 'little')
+    random.seed(seed)
+    np.random.seed(seed)
+
+    import callback_pool
+
+    # 此时 worker 还没有启动任何线程，fork 子进程是安全的
+    callback_pool.start_from_env()
+
+
+def post_worker_init(worker):
+    import app
+    import warmup
+
+    # 监视样本数据文件，更新后热替换（见 dataset_manager.py）
+    app.simulated_samples.watch_from_env()
+    warmup.warm_from_env(app.app.server)
@@ -0,0 +1,84 @@
+"""
+多关键词分类器：按 {类别: [关键词]} 分类体系给文本打标签。
+
+所有关键词编译为一个 Aho-Corasick 自动机，每段文本只扫描一遍即可得到
+全部命中的类别，耗时与关键词数量无关，适合批量处理大量统计表标题。
+"""
+
+import json
+from collections import Counter, deque
+
+
+def load_taxonomy(path):
+    """从 JSON 文件读取分类体系 {类别: [关键词, ...]}，保持文件中的类别顺序"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class KeywordClassifier:
+    """
+    基于 Aho-Corasick 自动机的多关键词分类器。
+
+    一个类别可以有多个关键词，同一关键词也可以属于多个类别；
+    一段文本命中某类别的任意关键词即计为该类别一次。
+    """
+
+    def __init__(self, taxonomy):
+        self.labels = list(taxonomy)
+        # 状态转移表、失败指针、每个状态结束的类别编号
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [set()]
+
+        for index, keywords in enumerate(taxonomy.values()):
+            for keyword in keywords:
+                self._add(keyword, index)
+        self._build_failure_links()
+
+    def _add(self, keyword, index):
+        state = 0
+        for char in keyword:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].add(index)
+
+    def _build_failure_links(self):
+        """广度优先计算失败指针，并把后缀状态的输出合并进来"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] |= self._output[self._fail[child]]
+
+    def classify(self, text):
+        """返回文本命中的类别，按分类体系中的顺序排列，每个类别至多一次"""
+        matched = set()
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                matched |= output[state]
+        return [self.labels[index] for index in sorted(matched)]
+
+    def classify_batch(self, texts):
+        """批量分类，返回与 texts 一一对应的类别列表"""
+        return [self.classify(text) for text in texts]
+
+    def count(self, texts):
+        """统计各类别命中的文本数（Counter 按首次出现的顺序排列）"""
+        counts = Counter()
+        for labels in self.classify_batch(texts):
+            counts.update(labels)
+        return counts
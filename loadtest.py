@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+本地 HTTP 压测：用 gunicorn 启动应用，按真实页面会话回放 Dash 请求。
+
+每个虚拟用户循环执行会话：
+1. GET /_dash-layout、GET /_dash-dependencies；
+2. 初次加载的回调（每个未设置 prevent_initial_call 的回调一次 POST）；
+3. --interactions 次交互：随机点击按钮，或修改第六章的筛选下拉框，
+   每次交互 POST 以该组件为输入的全部回调。
+
+请求负载完全由 /_dash-layout 与 /_dash-dependencies 的响应生成，
+客户端进程不导入 app.py。报告每类请求的吞吐与延迟分位数；
+--configs 依次以不同的 workers x threads 启动 gunicorn，便于按核数选择配置。
+
+    python loadtest.py                                 # 按本机核数扫描默认配置
+    python loadtest.py --configs 1x8 2x4 --concurrency 16 --duration 30
+    python loadtest.py --url http://127.0.0.1:8050     # 压测已运行的服务，不启动 gunicorn
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from dash_session import SessionPlan
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_DURATION = 20
+DEFAULT_INTERACTIONS = 6
+STARTUP_TIMEOUT = 120
+
+
+def default_configs(cpu_count=None):
+    """按核数生成待比较的 (workers, threads) 配置"""
+    cpus = cpu_count or os.cpu_count() or 1
+    configs = [(1, 8), (cpus, 1), (cpus, 4), (2 * cpus + 1, 2)]
+    return list(dict.fromkeys(configs))
+
+
+def parse_config(text):
+    workers, _, threads = text.lower().partition('x')
+    return int(workers), int(threads or 1)
+
+
+class Client:
+    """单个虚拟用户的 keep-alive 连接，记录每个请求的耗时"""
+
+    def __init__(self, base_url, timeout=60):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.connection = None
+
+    def request(self, method, path, body=None):
+        """返回 (状态码, 响应体)；连接断开时重连一次"""
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError):
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+class Recorder:
+    """线程安全地汇总各类请求的耗时与错误"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.sessions = 0
+
+    def add(self, label, elapsed, ok):
+        with self.lock:
+            self.timings[label].append(elapsed)
+            if not ok:
+                self.errors[label] += 1
+
+    def summary(self, duration):
+        rows = {}
+        for label, values in sorted(self.timings.items()):
+            p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+            rows[label] = {'requests': len(values), 'errors': self.errors[label],
+                           'throughput': round(len(values) / duration, 2),
+                           'p50_ms': round(float(p50), 1), 'p95_ms': round(float(p95), 1),
+                           'p99_ms': round(float(p99), 1)}
+        everything = np.concatenate([values for values in self.timings.values()]) * 1000 \
+            if self.timings else np.zeros(1)
+        p50, p95, p99 = np.percentile(everything, [50, 95, 99])
+        total = sum(len(values) for values in self.timings.values())
+        return {
+            'duration': round(duration, 2),
+            'sessions': self.sessions,
+            'requests': total,
+            'errors': sum(self.errors.values()),
+            'throughput': round(total / duration, 2),
+            'p50_ms': round(float(p50), 1),
+            'p95_ms': round(float(p95), 1),
+            'p99_ms': round(float(p99), 1),
+            'by_request': rows,
+        }
+
+
+def _timed(client, recorder, label, method, path, body=None):
+    start = time.perf_counter()
+    try:
+        status, content = client.request(method, path, body)
+    except (http.client.HTTPException, OSError):
+        status, content = None, b''
+    recorder.add(label, time.perf_counter() - start, status == 200)
+    return content if status == 200 else None
+
+
+def virtual_user(base_url, deadline, recorder, interactions, seed):
+    """在 deadline 之前循环执行完整会话"""
+    rng = random.Random(seed)
+    client = Client(base_url)
+    try:
+        while time.perf_counter() < deadline:
+            layout = _timed(client, recorder, '_dash-layout', 'GET', '/_dash-layout')
+            dependencies = _timed(client, recorder, '_dash-dependencies', 'GET', '/_dash-dependencies')
+            if layout is None or dependencies is None:
+                continue
+            plan = SessionPlan(json.loads(layout), json.loads(dependencies))
+            requests = plan.initial_burst()
+            for _ in range(interactions):
+                requests.extend(plan.interaction(rng))
+            for label, body in requests:
+                if time.perf_counter() >= deadline:
+                    return
+                _timed(client, recorder, label, 'POST', '/_dash-update-component', body)
+            with recorder.lock:
+                recorder.sessions += 1
+    finally:
+        client.close()
+
+
+def run_load(base_url, concurrency=DEFAULT_CONCURRENCY, duration=DEFAULT_DURATION,
+             interactions=DEFAULT_INTERACTIONS, seed=0):
+    """以 concurrency 个虚拟用户压测 duration 秒，返回汇总结果"""
+    recorder = Recorder()
+    start = time.perf_counter()
+    deadline = start + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index in range(concurrency):
+            pool.submit(virtual_user, base_url, deadline, recorder, interactions, seed + index)
+    return recorder.summary(time.perf_counter() - start)
+
+
+def _wait_until_ready(base_url, process, timeout=STARTUP_TIMEOUT):
+    client = Client(base_url, timeout=5)
+    deadline = time.perf_counter() + timeout
+    try:
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"gunicorn 启动失败（退出码 {process.returncode}）")
+            try:
+                if client.request('GET', '/_dash-layout')[0] == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.5)
+    finally:
+        client.close()
+    raise RuntimeError(f"gunicorn 在 {timeout}s 内没有就绪")
+
+
+def start_server(workers, threads, port, app_module='app:app'):
+    """启动 gunicorn 并等待就绪，返回进程"""
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--threads', str(threads),
+               '--timeout', '120', '--log-level', 'warning', app_module]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_until_ready(f'http://127.0.0.1:{port}', process)
+    except Exception:
+        stop_server(process)
+        raise
+    return process
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def print_summary(title, summary):
+    print(f"\n=== {title} ===")
+    print(f"会话 {summary['sessions']}，请求 {summary['requests']}（错误 {summary['errors']}），"
+          f"吞吐 {summary['throughput']:.1f} req/s，"
+          f"p50 {summary['p50_ms']:.0f}ms  p95 {summary['p95_ms']:.0f}ms  p99 {summary['p99_ms']:.0f}ms")
+    print(f"  {'请求':<42}{'次数':>6}{'错误':>6}{'req/s':>8}{'p50':>8}{'p95':>8}{'p99':>8}")
+    for label, row in summary['by_request'].items():
+        print(f"  {label:<42}{row['requests']:>6}{row['errors']:>6}{row['throughput']:>8.1f}"
+              f"{row['p50_ms']:>8.0f}{row['p95_ms']:>8.0f}{row['p99_ms']:>8.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Dash 接口压测与 gunicorn 配置比较')
+    parser.add_argument('--configs', nargs='*', default=None,
+                        help='gunicorn 配置，格式 workersxthreads（如 1x8 4x2），默认按核数生成')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='虚拟用户数')
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help='每个配置的压测秒数')
+    parser.add_argument('--interactions', type=int, default=DEFAULT_INTERACTIONS, help='每个会话的交互次数')
+    parser.add_argument('--port', type=int, default=8061, help='本地 gunicorn 端口')
+    parser.add_argument('--app', default='app:app', help='gunicorn 应用（模块:对象）')
+    parser.add_argument('--url', default=None, help='压测已运行的服务，不启动 gunicorn')
+    parser.add_argument('--seed', type=int, default=0, help='交互序列的随机种子')
+    parser.add_argument('--output', default=None, help='把结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    results = {}
+    if args.url:
+        results[args.url] = run_load(args.url, args.concurrency, args.duration, args.interactions, args.seed)
+        print_summary(args.url, results[args.url])
+    else:
+        configs = [parse_config(text) for text in args.configs] if args.configs else default_configs()
+        print(f"CPU 核数 {os.cpu_count()}，比较配置: {', '.join(f'{w}x{t}' for w, t in configs)}")
+        for workers, threads in configs:
+            name = f'{workers}x{threads}'
+            print(f"\n启动 gunicorn --workers {workers} --threads {threads} ...")
+            process = start_server(workers, threads, args.port, args.app)
+            try:
+                base_url = f'http://127.0.0.1:{args.port}'
+                # 预热：每个 worker 首次执行回调时有额外开销
+                run_load(base_url, concurrency=workers, duration=min(5, args.duration), seed=args.seed)
+                results[name] = run_load(base_url, args.concurrency, args.duration, args.interactions, args.seed)
+            finally:
+                stop_server(process)
+            print_summary(f'{name}（并发 {args.concurrency}）', results[name])
+
+        if len(results) > 1:
+            print("\n=== 配置比较 ===")
+            for name, summary in sorted(results.items(), key=lambda item: -item[1]['throughput']):
+                print(f"  {name:>6}: 吞吐 {summary['throughput']:7.1f} req/s  p95 {summary['p95_ms']:6.0f}ms  "
+                      f"错误 {summary['errors']}")
+            best = max((item for item in results.items() if not item[1]['errors']),
+                       key=lambda item: item[1]['throughput'], default=None)
+            if best:
+                print(f"吞吐最高且无错误的配置: {best[0]}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'cpu_count': os.cpu_count(), 'concurrency': args.concurrency,
+                       'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.output}")
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+单个 worker 的内存构成。
+
+报告包括：
+- 进程：RSS，以及 Linux 下与其他进程共享/私有的部分（/proc/self/smaps_rollup），
+  用于确认 preload + gc.freeze 之后有多少页仍与主进程共享；
+- 模块：导入完成时 tracemalloc 按包（plotly、dash、pandas、matplotlib……）或本项目模块汇总的
+  仍存活的分配，只有从启动开始跟踪时才有（命令行运行，或以 PYTHONTRACEMALLOC=32 启动服务）；
+- DataFrame：app.py 中各 DataFrame 的 memory_usage(deep=True)；
+- 缓存：callback_cache 两级缓存的字节数；
+- 布局：组件数与序列化后的大小。
+
+    python memory_report.py                  # 在新进程中从导入 app.py 开始跟踪
+    python memory_report.py --warm --top 20  # 先预热回调缓存再统计
+    python memory_report.py --json memory.json
+    python memory_report.py --warm --no-modules  # 不跟踪分配：RSS 不含 tracemalloc 自身的开销
+
+服务运行时 /admin/memory 以 JSON 返回处理该请求的 worker 的报告。与 /metrics 一样是内部页面，
+只在设置 METRICS_TOKEN（或 METRICS_ENDPOINTS=1）时注册；生成报告要序列化整个布局，
+跟踪分配时还要取快照，所以每个 worker 的报告缓存 REPORT_TTL 秒，同时只生成一份。
+benchmark_callbacks.py 把各组件的大小记入基线，增长超过阈值时报告回归。
+"""
+
+import argparse
+import json
+import os
+import sysconfig
+import threading
+import time
+import tracemalloc
+
+from flask import abort, jsonify, request
+
+DEFAULT_TOP = 15
+# 记录的调用栈深度：导入模块时的分配发生在 importlib 内部，需要向上找到发起导入的文件
+TRACE_FRAMES = 16
+# components() 中小于这个大小（KB）的模块合并为 module.(small)
+SMALL_MODULE_KB = 512
+# /admin/memory 的报告缓存时间（秒）
+REPORT_TTL = 30
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+SITE_DIRS = tuple(sorted({sysconfig.get_paths()[key] for key in ('purelib', 'platlib')}, key=len, reverse=True))
+STDLIB_DIR = sysconfig.get_paths()['stdlib']
+
+
+def process_memory():
+    """当前进程的内存（KB）；非 Linux 系统只有 rss"""
+    memory = {}
+    try:
+        with open('/proc/self/status', 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    memory['rss' if line.startswith('VmRSS') else 'peak_rss'] = int(line.split()[1])
+        with open('/proc/self/smaps_rollup', 'r', encoding='utf-8') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in ('Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty'):
+                    memory[name.lower()] = int(value.split()[0])
+    except OSError:
+        import resource
+        memory['peak_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return memory
+
+
+def module_group(filename):
+    """分配所在文件归属的组件：第三方包名、stdlib、本项目模块名或 other"""
+    for site in SITE_DIRS:
+        if filename.startswith(site + os.sep):
+            return filename[len(site) + 1:].split(os.sep)[0].split('.')[0]
+    if filename.startswith(PROJECT_DIR + os.sep):
+        return os.path.splitext(os.path.relpath(filename, PROJECT_DIR))[0].split(os.sep)[0]
+    if filename.startswith(STDLIB_DIR + os.sep):
+        return 'stdlib'
+    return 'other'
+
+
+def _owner(traceback):
+    """最内层不属于 importlib 等冻结模块的文件"""
+    for frame in reversed(traceback):
+        if not frame.filename.startswith('<'):
+            return frame.filename
+    return traceback[-1].filename
+
+
+def traced_modules(snapshot):
+    """{组件: (KB, 分配次数)}，按大小降序"""
+    groups = {}
+    for stat in snapshot.statistics('traceback'):
+        group = module_group(_owner(stat.traceback))
+        size, count = groups.get(group, (0, 0))
+        groups[group] = (size + stat.size, count + stat.count)
+    return {group: (round(size / 1024, 1), count)
+            for group, (size, count) in sorted(groups.items(), key=lambda item: -item[1][0])}
+
+
+def dataframe_memory(module):
+    import pandas as pd
+
+    return {name: round(value.memory_usage(deep=True).sum() / 1024, 1)
+            for name, value in vars(module).items() if isinstance(value, pd.DataFrame)}
+
+
+def cache_memory():
+    import callback_cache
+
+    caches = {'l1': round(callback_cache.cache.stats()['bytes'] / 1024, 1)}
+    if callback_cache.disk_cache is not None:
+        caches['l2_disk'] = round(callback_cache.disk_cache.stats()['bytes'] / 1024, 1)
+    return caches
+
+
+def layout_memory(dash_app):
+    from dash._utils import to_json
+
+    layout = dash_app._layout_value()
+    count, stack = 0, [layout]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(node)
+        elif hasattr(node, 'to_plotly_json'):
+            count += 1
+            stack.append(getattr(node, 'children', None))
+    return {'components': count, 'serialized_kb': round(len(to_json(layout)) / 1024, 1)}
+
+
+def build_report(module, snapshot=None):
+    """module 为已导入的 app 模块；snapshot 为 tracemalloc 快照，默认在跟踪时当场获取"""
+    report = {
+        'pid': os.getpid(),
+        'process': process_memory(),
+        'dataframes': dataframe_memory(module),
+        'caches': cache_memory(),
+        'layout': layout_memory(module.app),
+    }
+    if snapshot is None and tracemalloc.is_tracing():
+        snapshot = tracemalloc.take_snapshot()
+    if snapshot is not None:
+        report['modules'] = traced_modules(snapshot)
+    return report
+
+
+def components(report, keep=None):
+    """把报告展开为 {组件: KB}，供基准测试比较；keep(模块分组) 为假的模块不计入"""
+    flat = {'process.rss': report['process'].get('rss', report['process'].get('peak_rss', 0))}
+    small = 0
+    for name, (size, _) in report.get('modules', {}).items():
+        if keep is not None and not keep(name):
+            continue
+        if size < SMALL_MODULE_KB:
+            small += size
+        else:
+            flat[f'module.{name}'] = size
+    if 'modules' in report:
+        flat['module.(small)'] = round(small, 1)
+    flat.update({f'dataframe.{name}': size for name, size in report['dataframes'].items()})
+    flat.update({f'cache.{name}': size for name, size in report['caches'].items()})
+    flat['layout.serialized'] = report['layout']['serialized_kb']
+    return flat
+
+
+def print_report(report, top=DEFAULT_TOP):
+    process = report['process']
+    print(f"=== 内存构成（pid {report['pid']}）===")
+    print(f"RSS {process.get('rss', 0) / 1024:.1f}MB（峰值 {process.get('peak_rss', 0) / 1024:.1f}MB）", end='')
+    if 'pss' in process:
+        shared = process['shared_clean'] + process['shared_dirty']
+        private = process['private_clean'] + process['private_dirty']
+        print(f"，共享 {shared / 1024:.1f}MB，私有 {private / 1024:.1f}MB，PSS {process['pss'] / 1024:.1f}MB")
+    else:
+        print()
+
+    if 'modules' in report:
+        total = sum(size for size, _ in report['modules'].values())
+        print(f"\n按模块（tracemalloc，合计 {total / 1024:.1f}MB）:")
+        for name, (size, count) in list(report['modules'].items())[:top]:
+            print(f"  {name:<24}{size / 1024:>9.2f}MB  {count:>9} 个分配")
+    else:
+        print("\n（未从启动开始跟踪分配，没有按模块统计；以 PYTHONTRACEMALLOC=32 启动可以获得）")
+
+    print("\nDataFrame (deep):")
+    for name, size in report['dataframes'].items():
+        print(f"  {name:<24}{size / 1024:>9.2f}MB")
+    print("缓存:")
+    for name, size in report['caches'].items():
+        print(f"  {name:<24}{size / 1024:>9.2f}MB")
+    layout = report['layout']
+    print(f"布局: {layout['components']} 个组件，序列化 {layout['serialized_kb']:.0f}KB")
+
+
+def install_memory_endpoint(server, module, token=None, ttl=REPORT_TTL):
+    """注册 /admin/memory；module 为 app 模块"""
+    lock = threading.Lock()
+    cached = {'report': None, 'time': 0.0}
+
+    @server.route('/admin/memory')
+    def memory_endpoint():
+        if token and request.args.get('token') != token:
+            abort(403)
+        with lock:
+            if cached['report'] is None or time.monotonic() - cached['time'] > ttl:
+                cached.update(report=build_report(module), time=time.monotonic())
+            return jsonify(cached['report'])
+
+    return server
+
+
+def install_from_env(server, module, environ=os.environ):
+    """与 /metrics 相同：设置 METRICS_TOKEN 或 METRICS_ENDPOINTS=1 时才注册"""
+    from callback_metrics import admin_enabled
+
+    if not admin_enabled(environ):
+        return False
+    install_memory_endpoint(server, module, environ.get('METRICS_TOKEN'))
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='统计应用各组件的内存')
+    parser.add_argument('--warm', action='store_true', help='先预热回调缓存（见 warmup.py）')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help='列出的模块数')
+    parser.add_argument('--json', default=None, help='把报告写入 JSON 文件')
+    parser.add_argument('--no-modules', action='store_true', help='不跟踪分配，不按模块统计')
+    args = parser.parse_args()
+
+    # 在导入应用之前开始跟踪，才能统计到导入期间的分配；按模块的统计取导入完成时的快照，
+    # 预热期间不再跟踪（跟踪会让预热慢很多倍），预热留下的内存体现在 RSS 与缓存中
+    if not args.no_modules:
+        tracemalloc.start(TRACE_FRAMES)
+    import app
+
+    snapshot = None
+    if not args.no_modules:
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+    if args.warm:
+        import warmup
+        warmup.run_warmup(app.app.server)
+
+    report = build_report(app, snapshot)
+    print()
+    print_report(report, args.top)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({**report, 'components': components(report)}, f, ensure_ascii=False, indent=2)
+        print(f"\n报告已保存到 {args.json}")
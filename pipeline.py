@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+数据处理流水线：统一运行各分析脚本，生成应用所需的派生文件。
+
+每个 Excel 数据源只解析一次并转换为列式缓存（安装了 pyarrow 时为 parquet，
+否则为 pickle），各分析阶段读取缓存；相互独立的阶段并行执行，
+输入内容与代码均未变化的阶段直接跳过。
+
+    python pipeline.py                     # 运行全部阶段
+    python pipeline.py detailed_analysis   # 只运行指定阶段及其依赖
+    python pipeline.py --list              # 查看阶段依赖关系
+"""
+
+import argparse
+import contextlib
+import glob
+import hashlib
+import inspect
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+import analyze_data
+import analyze_simulated_data
+from content_hash import file_digest
+import detailed_analysis
+import fix_encoding
+import survey_store
+import survey_tables
+
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    CACHE_FORMAT = 'pkl'
+
+CACHE_DIR = '.pipeline_cache'
+MANIFEST_PATH = os.path.join(CACHE_DIR, 'manifest.json')
+
+# 数据源名称 -> Excel 文件（与各脚本一样只读取第一个工作表）
+SOURCES = {
+    'survey': analyze_data.SOURCE_PATH,
+    'simulated': fix_encoding.SOURCE_PATH,
+}
+
+
+def cache_path(source, fmt=CACHE_FORMAT):
+    return os.path.join(CACHE_DIR, f'{source}.{fmt}')
+
+
+def read_source(source):
+    """读取数据源的列式缓存"""
+    if os.path.exists(cache_path(source, 'parquet')):
+        return pd.read_parquet(cache_path(source, 'parquet'))
+    return pd.read_pickle(cache_path(source, 'pkl'))
+
+
+def convert_source(source):
+    """解析 Excel 并写入列式缓存；parquet 不支持的混合类型列退回 pickle"""
+    df = pd.read_excel(SOURCES[source])
+    for fmt in ('parquet', 'pkl'):
+        if os.path.exists(cache_path(source, fmt)):
+            os.remove(cache_path(source, fmt))
+
+    path = cache_path(source)
+    if CACHE_FORMAT == 'parquet':
+        try:
+            df.to_parquet(path, index=False)
+        except (TypeError, ValueError) as e:
+            print(f"{SOURCES[source]} 无法写入 parquet（{e}），改用 pickle")
+            if os.path.exists(path):
+                os.remove(path)
+            path = cache_path(source, 'pkl')
+    if not os.path.exists(path):
+        df.to_pickle(path)
+    print(f"{SOURCES[source]} -> {path} {df.shape}")
+
+
+def run_survey_cache():
+    convert_source('survey')
+
+
+def run_simulated_cache():
+    convert_source('simulated')
+
+
+def run_survey_tables():
+    survey_tables.load_tables(refresh=True)
+    survey_tables.prune_cache()
+
+
+def run_survey_store():
+    survey_store.ingest_all()
+
+
+def run_data_summary():
+    analyze_data.analyze(read_source('survey'))
+
+
+def run_detailed_analysis():
+    detailed_analysis.analyze(read_source('survey'))
+
+
+def run_simulated_analysis():
+    analyze_simulated_data.analyze(read_source('simulated'))
+
+
+def run_simulated_clean():
+    fix_encoding.clean(read_source('simulated'))
+
+
+# 阶段名称 -> (执行函数, 依赖阶段, 输入文件, 输出文件)
+# 阶段指纹 = 执行函数源码 + 输入文件内容（含分析脚本本身）+ 依赖阶段指纹，
+# 修改数据或脚本后只有受影响的阶段会重跑；输出文件支持通配符
+STAGES = {
+    'survey_cache': (run_survey_cache, [], [SOURCES['survey']], [cache_path('survey', '*')]),
+    'simulated_cache': (run_simulated_cache, [], [SOURCES['simulated']], [cache_path('simulated', '*')]),
+    'survey_tables': (run_survey_tables, [], [SOURCES['survey'], 'survey_tables.py'],
+                      [os.path.join(survey_tables.CACHE_DIR, 'survey_tables-*')]),
+    # 数据仓本身是增量的：新增年度工作簿时只导入这一本
+    'survey_store': (run_survey_store, [], sorted(glob.glob(survey_store.ARCHIVE_PATTERN))
+                     + ['survey_store.py', 'survey_tables.py'],
+                     [os.path.join(survey_store.STORE_DIR, 'manifest.json')]),
+    'data_summary': (run_data_summary, ['survey_cache'], ['analyze_data.py'], [analyze_data.OUTPUT_PATH]),
+    'detailed_analysis': (run_detailed_analysis, ['survey_cache'], ['detailed_analysis.py', 'keyword_classifier.py'],
+                          [detailed_analysis.ANALYSIS_PATH, detailed_analysis.VIZ_PATH]),
+    'simulated_analysis': (run_simulated_analysis, ['simulated_cache'], ['analyze_simulated_data.py'],
+                           [analyze_simulated_data.OUTPUT_PATH]),
+    'simulated_clean': (run_simulated_clean, ['simulated_cache'], ['fix_encoding.py'],
+                        [fix_encoding.OUTPUT_PATH]),
+}
+
+
+def stage_hashes():
+    """按依赖顺序计算所有阶段的指纹"""
+    hashes = {}
+    for name in topological_order(STAGES):
+        func, deps, inputs, _ = STAGES[name]
+        hasher = hashlib.sha256(CACHE_FORMAT.encode())
+        hasher.update(inspect.getsource(func).encode('utf-8'))
+        for path in inputs:
+            hasher.update(path.encode('utf-8'))
+            hasher.update(file_digest(path).encode() if os.path.exists(path) else b'missing')
+        for dep in deps:
+            hasher.update(hashes[dep].encode())
+        hashes[name] = hasher.hexdigest()
+    return hashes
+
+
+def topological_order(stages, targets=None):
+    """返回目标阶段及其全部依赖，依赖在前"""
+    order = []
+    visiting = set()
+
+    def visit(name):
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"阶段依赖存在环: {name}")
+        visiting.add(name)
+        for dep in stages[name][1]:
+            visit(dep)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in targets or stages:
+        visit(name)
+    return order
+
+
+def load_manifest():
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(manifest):
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+
+def _run_stage(name, verbose=False):
+    """在工作进程中执行单个阶段，返回 (阶段名, 耗时, 输出日志)"""
+    start = time.perf_counter()
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        STAGES[name][0]()
+    return name, time.perf_counter() - start, log.getvalue() if verbose else ''
+
+
+def run_pipeline(targets=None, workers=None, force=False, verbose=False):
+    """
+    运行目标阶段（默认全部）。
+
+    指纹与清单一致且输出文件都存在的阶段跳过；其余阶段在依赖完成后
+    提交到进程池，相互独立的阶段同时执行。返回实际执行的阶段列表。
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    order = topological_order(STAGES, targets)
+    hashes = stage_hashes()
+    manifest = {} if force else load_manifest()
+
+    pending = [name for name in order
+               if manifest.get(name) != hashes[name]
+               or not all(glob.glob(path) for path in STAGES[name][3])]
+    for name in order:
+        if name not in pending:
+            print(f"  跳过: {name}（输入未变化）")
+    if not pending:
+        print("所有阶段均为最新")
+        return []
+
+    done = set(order) - set(pending)
+    executed = []
+    workers = min(workers or os.cpu_count() or 1, len(pending))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while pending or running:
+            for name in [n for n in pending if all(dep in done for dep in STAGES[n][1])]:
+                pending.remove(name)
+                running[pool.submit(_run_stage, name, verbose)] = name
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                _, elapsed, log = future.result()
+                if log:
+                    print(log, end='')
+                done.add(name)
+                executed.append(name)
+                manifest[name] = hashes[name]
+                save_manifest(manifest)
+                print(f"  完成: {name} ({elapsed:.2f}s)")
+    return executed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='运行数据处理流水线')
+    parser.add_argument('stages', nargs='*', metavar='stage',
+                        help=f"要运行的阶段（默认全部）：{', '.join(STAGES)}")
+    parser.add_argument('--workers', type=int, default=None, help='并行进程数（默认为CPU核数）')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，重跑所有阶段')
+    parser.add_argument('--verbose', '-v', action='store_true', help='输出各阶段的分析日志')
+    parser.add_argument('--list', action='store_true', help='列出阶段及其依赖')
+    args = parser.parse_args()
+    unknown = [name for name in args.stages if name not in STAGES]
+    if unknown:
+        parser.error(f"未知阶段: {', '.join(unknown)}")
+
+    if args.list:
+        for name in topological_order(STAGES):
+            deps = STAGES[name][1]
+            print(f"{name}: {', '.join(STAGES[name][3])}" + (f"  <- {', '.join(deps)}" if deps else ''))
+    else:
+        start = time.perf_counter()
+        run_pipeline(args.stages or None, workers=args.workers, force=args.force, verbose=args.verbose)
+        print(f"流水线完成，用时 {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+生产环境的回调请求采样分析。
+
+通过环境变量开启（app.py 启动时调用 install_from_env）：
+
+    PROFILE_DIR=profiles        开启，分析结果按回调分目录写到这里
+    PROFILE_EVERY=100           每 N 个回调请求分析一个（0 表示不按比例抽取）
+    PROFILE_SLOW_MS=500         耗时超过阈值的请求也保存（仅 sample 模式）
+    PROFILE_MODE=sample         sample：后台线程每 PROFILE_INTERVAL_MS 毫秒采集一次调用栈，
+                                开销很低，可以覆盖所有请求再按耗时决定是否保存，输出 .folded；
+                                cprofile：对抽中的请求运行 cProfile，输出 .prof
+    PROFILE_INTERVAL_MS=5
+
+.folded 为 collapsed stacks 格式（每行 "帧;帧;帧 次数"），可直接交给
+flamegraph.pl 或 speedscope。合并同一回调的全部文件并输出热点：
+
+    python request_profiler.py profiles --top 15
+    python request_profiler.py profiles --callback simulated-scatter-plot.figure --output merged
+"""
+
+import argparse
+import contextlib
+import cProfile
+import glob
+import itertools
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+
+from callback_metrics import callback_label
+from warmup import is_warmup_request
+
+PROFILE_DIR = 'profiles'
+DEFAULT_EVERY = 100
+DEFAULT_INTERVAL_MS = 5
+UPDATE_PATH = '_dash-update-component'
+
+
+def _frame_name(frame):
+    return f'{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}'
+
+
+class StackSampler:
+    """后台线程定期采集已登记线程的调用栈，按 collapsed stack 计数"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.active = {}
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.pid = None
+
+    def _ensure_thread(self):
+        # fork 之后后台线程不会被继承，按进程号重新启动
+        if self.pid != os.getpid() or not self.thread.is_alive():
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+            self.thread.start()
+
+    def start(self, thread_id):
+        with self.lock:
+            self.active[thread_id] = Counter()
+            self._ensure_thread()
+        self.wakeup.set()
+
+    def stop(self, thread_id):
+        with self.lock:
+            return self.active.pop(thread_id, Counter())
+
+    def add(self, thread_id, stacks):
+        """并入在别处（如进程池子进程）采集的调用栈"""
+        with self.lock:
+            if thread_id in self.active:
+                self.active[thread_id].update(stacks)
+
+    def _run(self):
+        while True:
+            with self.lock:
+                threads = list(self.active)
+                if not threads:
+                    self.wakeup.clear()
+            if not threads:
+                self.wakeup.wait()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for thread_id in threads:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                with self.lock:
+                    if thread_id in self.active:
+                        self.active[thread_id][';'.join(reversed(stack))] += 1
+
+
+# 进程池子进程中使用的采样器，每个进程一个（见 sampling）
+_local_sampler = {'sampler': None, 'pid': None}
+
+
+def sampling_interval():
+    """当前请求正在采样时返回采样间隔（秒），否则返回 None；供 callback_pool 在子进程中继续采样"""
+    if not has_request_context():
+        return None
+    profile, sampler = g.get('request_profile'), g.get('request_sampler')
+    if profile is None or profile[0] != 'sample' or sampler is None:
+        return None
+    return sampler.interval
+
+
+def add_samples(stacks):
+    """把子进程中采集的调用栈并入当前请求的采样结果"""
+    sampler = g.get('request_sampler') if has_request_context() else None
+    if sampler is not None and stacks:
+        sampler.add(threading.get_ident(), stacks)
+
+
+@contextlib.contextmanager
+def sampling(interval):
+    """在当前线程采样调用栈，结束后得到 Counter（用于进程池子进程）"""
+    if _local_sampler['pid'] != os.getpid():
+        _local_sampler.update(sampler=StackSampler(interval), pid=os.getpid())
+    sampler = _local_sampler['sampler']
+    stacks = Counter()
+    sampler.start(threading.get_ident())
+    try:
+        yield stacks
+    finally:
+        stacks.update(sampler.stop(threading.get_ident()))
+
+
+def _safe_name(label):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', label)
+
+
+def _output_path(directory, label, elapsed, suffix):
+    folder = os.path.join(directory, _safe_name(label))
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{elapsed * 1000:.0f}ms{suffix}')
+
+
+def write_folded(path, stacks):
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            f.write(f'{stack} {count}\n')
+
+
+def install_profiler(server, directory=PROFILE_DIR, every=DEFAULT_EVERY, slow_ms=0, mode='sample',
+                     interval_ms=DEFAULT_INTERVAL_MS):
+    """在 Flask 服务器上注册分析钩子"""
+    sampler = StackSampler(interval_ms / 1000)
+    counter = itertools.count(1)
+
+    @server.before_request
+    def _start_profile():
+        if not request.path.endswith(UPDATE_PATH) or is_warmup_request(request):
+            return
+        chosen = bool(every) and next(counter) % every == 0
+        if mode == 'cprofile':
+            if chosen:
+                profiler = cProfile.Profile()
+                g.request_profile = ('cprofile', profiler, chosen, time.perf_counter())
+                profiler.enable()
+        elif chosen or slow_ms:
+            sampler.start(threading.get_ident())
+            g.request_profile = ('sample', threading.get_ident(), chosen, time.perf_counter())
+            g.request_sampler = sampler
+
+    @server.teardown_request
+    def _finish_profile(exc):
+        profile = g.pop('request_profile', None)
+        if profile is None:
+            return
+        kind, collector, chosen, start = profile
+        elapsed = time.perf_counter() - start
+        if kind == 'cprofile':
+            collector.disable()
+        else:
+            stacks = sampler.stop(collector)
+        if not (chosen or (slow_ms and elapsed * 1000 >= slow_ms)):
+            return
+        label = callback_label((request.get_json(silent=True) or {}).get('output', 'unknown'))
+        if kind == 'cprofile':
+            collector.dump_stats(_output_path(directory, label, elapsed, '.prof'))
+        elif stacks:
+            write_folded(_output_path(directory, label, elapsed, '.folded'), stacks)
+
+    return server
+
+
+def install_from_env(server, environ=os.environ):
+    """PROFILE_DIR 设置时开启，返回是否已开启"""
+    directory = environ.get('PROFILE_DIR')
+    if not directory:
+        return False
+    mode = environ.get('PROFILE_MODE', 'sample')
+    install_profiler(server, directory,
+                     every=int(environ.get('PROFILE_EVERY', DEFAULT_EVERY)),
+                     slow_ms=float(environ.get('PROFILE_SLOW_MS', 0)),
+                     mode=mode,
+                     interval_ms=float(environ.get('PROFILE_INTERVAL_MS', DEFAULT_INTERVAL_MS)))
+    print(f"Request profiling enabled ({mode}): {directory}")
+    return True
+
+
+def read_folded(paths):
+    stacks = Counter()
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack:
+                    stacks[stack] += int(count)
+    return stacks
+
+
+def summarize_folded(stacks, top=10):
+    """
+    返回 (总样本数, 自身耗时最多的帧, 包含耗时最多的帧)。
+
+    出现在每个样本中的帧（gunicorn、Flask、Dash 的分发路径）不计入包含耗时。
+    """
+    total = sum(stacks.values())
+    self_time, inclusive = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        self_time[frames[-1]] += count
+        for frame in set(frames):
+            inclusive[frame] += count
+    inclusive = Counter({frame: count for frame, count in inclusive.items() if count < total})
+    return total, self_time.most_common(top), inclusive.most_common(top)
+
+
+def merge_profiles(directory, callbacks=None, output=None, top=10):
+    """按回调合并目录中的 .folded 与 .prof 文件，打印热点，可选写出合并后的文件"""
+    for folder in sorted(glob.glob(os.path.join(directory, '*', ''))):
+        name = os.path.basename(os.path.dirname(folder))
+        if callbacks and name not in {_safe_name(label) for label in callbacks}:
+            continue
+        folded = sorted(glob.glob(os.path.join(folder, '*.folded')))
+        profiles = sorted(glob.glob(os.path.join(folder, '*.prof')))
+        print(f"\n=== {name}（{len(folded)} 个采样文件，{len(profiles)} 个 cProfile 文件）===")
+
+        if folded:
+            stacks = read_folded(folded)
+            total, self_time, inclusive = summarize_folded(stacks, top)
+            print(f"  采样数 {total}；自身耗时最多的帧:")
+            for frame, count in self_time:
+                print(f"    {count / total:6.1%}  {frame}")
+            print("  包含耗时最多的帧:")
+            for frame, count in inclusive:
+                print(f"    {count / total:6.1%}  {frame}")
+            if output:
+                os.makedirs(output, exist_ok=True)
+                write_folded(os.path.join(output, f'{name}.folded'), stacks)
+
+        if profiles:
+            stats = pstats.Stats(*profiles, stream=sys.stdout)
+            stats.sort_stats('cumulative').print_stats(top)
+            if output:
+                os.makedirs(output, exist_ok=True)
+                stats.dump_stats(os.path.join(output, f'{name}.prof'))
+
+    if output:
+        print(f"\n合并结果已写入 {output}/（.folded 可用 flamegraph.pl 或 speedscope 打开）")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='按回调合并请求分析结果并输出热点')
+    parser.add_argument('directory', nargs='?', default=PROFILE_DIR, help='PROFILE_DIR 目录')
+    parser.add_argument('--callback', action='append', default=None, help='只看指定回调（可重复）')
+    parser.add_argument('--top', type=int, default=10, help='每个回调列出的热点数')
+    parser.add_argument('--output', default=None, help='把每个回调合并后的 .folded/.prof 写到该目录')
+    args = parser.parse_args()
+    merge_profiles(args.directory, args.callback, args.output, args.top)
@@ -0,0 +1,140 @@
+"""
+回调响应的 Server-Timing 分段计时。
+
+回调内部用 PhaseTimer 标记各阶段（筛选、聚合、构建图表），
+包装层另外记录整个回调的耗时，并把回调耗时中没有被阶段覆盖的部分
+记为 serialize（Dash 校验输出并编码 JSON）。请求结束时写入标准的
+Server-Timing 响应头，浏览器开发者工具的 Timing 面板会显示各阶段：
+
+    Server-Timing: filter;dur=2.1, aggregate;dur=0.8, figure;dur=41.5, serialize;dur=12.0, callback;dur=56.4, total;dur=58.9
+
+环境变量：
+    SERVER_TIMING=0        不输出 Server-Timing 头
+    SERVER_TIMING_LOG=1    同时把每个请求的分段耗时打印到日志
+"""
+
+import contextlib
+import contextvars
+import functools
+import os
+import time
+
+from flask import g, has_request_context, request
+
+from callback_metrics import callback_label
+
+UPDATE_PATH = '_dash-update-component'
+
+# 不在请求中时接收阶段耗时的列表（见 collecting）
+_collector = contextvars.ContextVar('server_timing_collector', default=None)
+
+
+def record(name, seconds):
+    """
+    记录当前请求的一个阶段耗时。
+
+    不在请求中时记入 collecting() 的列表（进程池子进程），都没有时（如静态导出、基准测试）忽略。
+    """
+    if has_request_context() and 'server_timing' in g:
+        g.server_timing.append((name, seconds))
+        return
+    phases = _collector.get()
+    if phases is not None:
+        phases.append((name, seconds))
+
+
+@contextlib.contextmanager
+def collecting():
+    """在没有请求上下文的地方收集阶段耗时，得到 [(名称, 秒数)]，之后可在请求中重新 record"""
+    phases = []
+    token = _collector.set(phases)
+    try:
+        yield phases
+    finally:
+        _collector.reset(token)
+
+
+class PhaseTimer:
+    """
+    依次标记回调中的各个阶段。
+
+        timer = PhaseTimer()
+        ...筛选...
+        timer.mark('filter')
+        ...构建图表...
+        timer.mark('figure')
+
+    每次 mark 记录从上一次标记（或创建计时器）到现在的耗时。
+    """
+
+    def __init__(self):
+        self.last = time.perf_counter()
+
+    def mark(self, name):
+        now = time.perf_counter()
+        record(name, now - self.last)
+        self.last = now
+
+
+def header_value(phases):
+    """同名阶段的耗时相加，按首次出现的顺序输出（毫秒）"""
+    totals = {}
+    for name, seconds in phases:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ', '.join(f'{name};dur={seconds * 1000:.1f}' for name, seconds in totals.items())
+
+
+def _instrument(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        phases = g.get('server_timing') if has_request_context() else None
+        before = len(phases) if phases is not None else 0
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            if phases is not None:
+                inner = sum(seconds for _, seconds in phases[before:])
+                if len(phases) > before:
+                    record('serialize', max(elapsed - inner, 0.0))
+                record('callback', elapsed)
+    return wrapper
+
+
+def install_server_timing(dash_app, log=False):
+    """包装已注册的全部回调，并在回调响应上添加 Server-Timing 头"""
+    for entry in dash_app.callback_map.values():
+        entry['callback'] = _instrument(entry['callback'])
+
+    server = dash_app.server
+
+    @server.before_request
+    def _start_timing():
+        if request.path.endswith(UPDATE_PATH):
+            g.server_timing = []
+            g.server_timing_start = time.perf_counter()
+
+    @server.after_request
+    def _add_timing_header(response):
+        phases = g.pop('server_timing', None)
+        if phases is None:
+            return response
+        phases.append(('total', time.perf_counter() - g.pop('server_timing_start')))
+        value = header_value(phases)
+        existing = response.headers.get('Server-Timing')
+        response.headers['Server-Timing'] = f'{existing}, {value}' if existing else value
+        if log:
+            output = (request.get_json(silent=True) or {}).get('output', '?')
+            print(f"[server-timing] {callback_label(output)} {value}", flush=True)
+        return response
+
+    return dash_app
+
+
+def install_from_env(dash_app, environ=os.environ):
+    """默认开启；SERVER_TIMING=0 时跳过"""
+    if environ.get('SERVER_TIMING') in ('0', 'false', 'no'):
+        return False
+    install_server_timing(dash_app, log=environ.get('SERVER_TIMING_LOG') in ('1', 'true', 'yes'))
+    return True
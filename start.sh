@@ -3,6 +3,10 @@
 # 设置默认端口
 PORT=${PORT:-8050}
 
-# 启动gunicorn服务器
+# 清空上一次运行留下的回调指标快照（见 callback_metrics.py）
+rm -rf "${METRICS_DIR:-.metrics}"
+
+# 启动gunicorn服务器（worker 数、线程数、预加载等见 gunicorn.conf.py）
 echo "Starting server on port $PORT..."
-gunicorn --bind 0.0.0.0:$PORT --workers 1 --threads 8 macau_tech_analysis:app
+export PORT
+gunicorn app:app
@@ -0,0 +1,303 @@
+"""
+第六章（模拟数据）在静态站点中的浏览器端筛选。
+
+把 app.simulated_df 编码为紧凑的二进制列（类别编码 + 位压缩的使用指标 +
+float32 抖动坐标）以及按 年龄组 x 性别 聚合的计数/求和立方体，
+配合 CHAPTER6_JS 在浏览器中完成筛选并重绘散点图、分布图与排名图。
+"""
+
+import json
+import struct
+
+import numpy as np
+
+# 文件头：魔数 + 元数据长度（小端 uint32），随后是元数据 JSON 与按4字节对齐的数组
+CUBE_MAGIC = b'MCB1'
+
+AGE_ORDER = ['3-14', '15-24', '25-34', '35-44', '45-54', '55-64', '65-74', '>=75']
+
+
+def _codes(series, order):
+    """按给定顺序把类别列编码为 uint8，顺序中没有的取值追加在末尾"""
+    labels = list(order) + sorted(set(series.dropna().unique()) - set(order))
+    lookup = {label: i for i, label in enumerate(labels)}
+    return np.array([lookup.get(value, 255) for value in series], dtype=np.uint8), labels
+
+
+def encode_samples(df, usage_labels, age_order, gender_order=('male', 'female')):
+    """
+    把样本编码为二进制立方体文件内容（bytes）。
+
+    usage_labels 为 {使用指标列: 显示名称}，这些列必须是 0/1 取值，
+    逐行压缩为一个 uint16 位掩码；不满足时返回 None。
+    """
+    usage_columns = [col for col in usage_labels if col in df.columns]
+    if len(usage_columns) > 16 or not df[usage_columns].isin([0, 1]).all().all():
+        print("模拟数据的使用指标不是0/1取值，跳过第六章数据立方体")
+        return None
+
+    age, age_labels = _codes(df['age_group'], age_order)
+    gender, gender_labels = _codes(df['gender'], gender_order)
+    internet, internet_labels = _codes(df['internet_access'], [])
+    economic, economic_labels = _codes(df['economic_status'], [])
+
+    weights = (1 << np.arange(len(usage_columns))).astype(np.uint16)
+    usage = (df[usage_columns].to_numpy(dtype=np.uint16) * weights).sum(axis=1).astype(np.uint16)
+
+    mobile_x = df.get('mobile_phone_jitter', df['mobile_phone']).to_numpy(dtype=np.float32)
+    laptop_y = df.get('laptop_computer_jitter', df['laptop_computer']).to_numpy(dtype=np.float32)
+
+    # 年龄组 x 性别 的样本数与各使用指标求和，排名图只需要这个立方体
+    counts = np.zeros((len(age_labels), len(gender_labels)), dtype=np.uint32)
+    np.add.at(counts, (age, gender), 1)
+    sums = np.zeros((len(age_labels), len(gender_labels), len(usage_columns)), dtype=np.uint32)
+    np.add.at(sums, (age, gender), df[usage_columns].to_numpy(dtype=np.uint32))
+
+    arrays = {
+        'age': age, 'gender': gender, 'internet': internet, 'economic': economic,
+        'usage': usage, 'mobile': mobile_x, 'laptop': laptop_y,
+        'counts': counts.ravel(), 'sums': sums.ravel(),
+    }
+
+    meta = {
+        'rows': len(df),
+        'labels': {
+            'age': age_labels, 'gender': gender_labels,
+            'internet': internet_labels, 'economic': economic_labels,
+        },
+        'usage': [{'column': col, 'label': usage_labels[col]} for col in usage_columns],
+        'arrays': {},
+    }
+
+    body = b''
+    for name, array in arrays.items():
+        body += b'\0' * (-len(body) % 4)
+        meta['arrays'][name] = {'dtype': array.dtype.name, 'offset': len(body), 'length': int(array.size)}
+        body += array.astype(array.dtype.newbyteorder('<')).tobytes()
+
+    header = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    header += b' ' * (-(len(header) + 8) % 4)
+    return CUBE_MAGIC + struct.pack('<I', len(header)) + header + body
+
+
+# 浏览器端筛选模块：读取立方体，按 app.py 中相同的规则重绘第六章的三个图表。
+# 图表的标题、坐标轴等 layout 取自导出的初始图表，这里只重新生成 trace。
+CHAPTER6_JS = '''(function () {
+    var TYPES = {uint8: Uint8Array, uint16: Uint16Array, uint32: Uint32Array, float32: Float32Array};
+    var GRAPHS = ['simulated-scatter-plot', 'simulated-box-dot-plot', 'usage-pattern-ranking-chart'];
+    var COLORS = {
+        '3-14': '#f44336', '15-24': '#ff9800', '25-34': '#ffc107', '35-44': '#4caf50',
+        '45-54': '#2196f3', '55-64': '#3f51b5', '65-74': '#9c27b0', '>=75': '#673ab7'
+    };
+    var AGE_ORDER = Object.keys(COLORS);
+    var SYMBOLS = {male: 'circle', female: 'diamond'};
+    var HOVER = '<b>Age Group:</b> %{customdata[0]}<br><b>Gender:</b> %{customdata[1]}<br>' +
+        '<b>Internet Access:</b> %{customdata[2]}<br><b>Mobile Usage:</b> %{customdata[3]:.2f}<br>' +
+        '<b>Laptop Usage:</b> %{customdata[4]:.2f}<br><b>Economic Status:</b> %{customdata[5]}<extra></extra>';
+
+    function parse(buffer) {
+        var view = new DataView(buffer);
+        var headerLength = view.getUint32(4, true);
+        var meta = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+        var base = 8 + headerLength;
+        var cube = {meta: meta};
+        Object.keys(meta.arrays).forEach(function (name) {
+            var spec = meta.arrays[name];
+            cube[name] = new TYPES[spec.dtype](buffer, base + spec.offset, spec.length);
+        });
+        cube.bit = function (column) {
+            var k = meta.usage.map(function (u) { return u.column; }).indexOf(column);
+            return function (i) { return (cube.usage[i] >> k) & 1; };
+        };
+        return cube;
+    }
+
+    function selected(select) {
+        return Array.prototype.filter.call(select.options, function (o) { return o.selected; })
+            .map(function (o) { return o.value; });
+    }
+
+    function title(text) { return text.charAt(0).toUpperCase() + text.slice(1); }
+
+    function filterRows(cube, ages, genders) {
+        var labels = cube.meta.labels;
+        var rows = [];
+        for (var i = 0; i < cube.meta.rows; i++) {
+            if (ages.length && ages.indexOf(labels.age[cube.age[i]]) < 0) { continue; }
+            if (genders.length && genders.indexOf(labels.gender[cube.gender[i]]) < 0) { continue; }
+            rows.push(i);
+        }
+        return rows;
+    }
+
+    // 与 px.scatter(color='age_group', symbol='gender') 相同：每个 年龄组 x 性别 一条 trace
+    function scatterTraces(cube, rows) {
+        var labels = cube.meta.labels;
+        var mobile = cube.bit('mobile_phone');
+        var laptop = cube.bit('laptop_computer');
+        var groups = {};
+        var order = [];
+        rows.forEach(function (i) {
+            var key = cube.age[i] + ',' + cube.gender[i];
+            if (!groups[key]) { groups[key] = []; order.push(key); }
+            groups[key].push(i);
+        });
+        // 年龄组按 AGE_ORDER 排列（编码时已保证），同一年龄组内保持性别出现顺序
+        order.sort(function (a, b) { return cube.age[groups[a][0]] - cube.age[groups[b][0]]; });
+        return order.map(function (key) {
+            var members = groups[key];
+            var age = labels.age[cube.age[members[0]]];
+            var gender = labels.gender[cube.gender[members[0]]];
+            var name = age + ', ' + gender;
+            return {
+                type: 'scatter', mode: 'markers', name: name, legendgroup: name, showlegend: true,
+                x: members.map(function (i) { return cube.mobile[i]; }),
+                y: members.map(function (i) { return cube.laptop[i]; }),
+                customdata: members.map(function (i) {
+                    return [age, title(gender), labels.internet[cube.internet[i]],
+                            mobile(i), laptop(i), labels.economic[cube.economic[i]]];
+                }),
+                marker: {color: COLORS[age], symbol: SYMBOLS[gender], size: 9, opacity: 0.7,
+                         line: {width: 2, color: 'rgba(30,30,30,0.25)'}},
+                hovertemplate: HOVER
+            };
+        });
+    }
+
+    function boxTraces(cube, rows) {
+        var labels = cube.meta.labels;
+        var mobile = cube.bit('mobile_phone');
+        var byAge = rows.filter(function (i) { return AGE_ORDER.indexOf(labels.age[cube.age[i]]) >= 0; });
+        var common = {type: 'box', boxmean: true, boxpoints: 'all', jitter: 0.35, pointpos: 0};
+        return [
+            Object.assign({
+                name: 'Age Distribution', xaxis: 'x', yaxis: 'y',
+                x: byAge.map(function (i) { return labels.age[cube.age[i]]; }),
+                y: byAge.map(mobile),
+                line: {color: '#0d47a1', width: 1.5},
+                marker: {opacity: 0.55, size: 5, color: 'rgba(244, 67, 54, 0.45)'}
+            }, common),
+            Object.assign({
+                name: 'Gender Distribution', xaxis: 'x2', yaxis: 'y2',
+                x: rows.map(function (i) { return labels.gender[cube.gender[i]]; }),
+                y: rows.map(mobile),
+                line: {color: '#1b5e20', width: 1.5},
+                marker: {opacity: 0.55, size: 5, color: 'rgba(156, 39, 176, 0.45)'}
+            }, common)
+        ];
+    }
+
+    // 排名图只需要 年龄组 x 性别 立方体中的计数与求和，不必遍历样本
+    function rankingTrace(cube, ages, genders) {
+        var labels = cube.meta.labels;
+        var usage = cube.meta.usage;
+        var nGender = labels.gender.length;
+        var total = 0;
+        var sums = usage.map(function () { return 0; });
+        labels.age.forEach(function (age, a) {
+            if (ages.length && ages.indexOf(age) < 0) { return; }
+            labels.gender.forEach(function (gender, g) {
+                if (genders.length && genders.indexOf(gender) < 0) { return; }
+                var cell = a * nGender + g;
+                total += cube.counts[cell];
+                for (var k = 0; k < usage.length; k++) { sums[k] += cube.sums[cell * usage.length + k]; }
+            });
+        });
+        var items = usage.map(function (u, k) { return {label: u.label, value: sums[k] / total * 100}; })
+            .sort(function (p, q) { return p.value - q.value; });
+        return {
+            total: total,
+            trace: {
+                type: 'bar', orientation: 'h',
+                x: items.map(function (d) { return d.value; }),
+                y: items.map(function (d) { return d.label; }),
+                text: items.map(function (d) { return d.value.toFixed(1) + '%'; }),
+                textposition: 'auto',
+                marker: {color: '#5A7D9A', line: {color: '#2C3E50', width: 0.5}},
+                hovertemplate: '<b>%{y}</b><br>Average intensity: %{x:.1f}%<extra></extra>'
+            }
+        };
+    }
+
+    function draw(layouts, id, data, extra) {
+        var el = document.getElementById(id);
+        if (!el) { return; }
+        el.dataset.loaded = '1';
+        if (!data) {
+            StaticFigures.plot(el, {data: [], layout: {}});
+            return;
+        }
+        StaticFigures.plot(el, {data: data, layout: Object.assign({}, layouts[id], extra || {})});
+    }
+
+    function update(cube, layouts, ageSelect, genderSelect) {
+        var ages = selected(ageSelect);
+        var genders = selected(genderSelect);
+        var rows = filterRows(cube, ages, genders);
+        var status = document.getElementById('filter-status');
+
+        if (!rows.length) {
+            status.textContent = 'No data matches current filters (0 records)';
+            GRAPHS.forEach(function (id) { draw(layouts, id, null); });
+            return;
+        }
+        var parts = [];
+        if (ages.length) { parts.push('Age: ' + ages.join(', ')); }
+        if (genders.length) { parts.push('Gender: ' + genders.map(title).join(', ')); }
+        status.textContent = (parts.length ? 'Filtered by: ' + parts.join(', ') : 'Showing all data') +
+            ' (' + rows.length + ' records)';
+
+        draw(layouts, GRAPHS[0], scatterTraces(cube, rows));
+        draw(layouts, GRAPHS[1], boxTraces(cube, rows));
+        if (rows.length < 5) {
+            draw(layouts, GRAPHS[2], null);
+            return;
+        }
+        var ranking = rankingTrace(cube, ages, genders);
+        var note = Object.assign({}, (layouts[GRAPHS[2]].annotations || [])[0], {
+            text: 'Filtered sample size: ' + ranking.total.toLocaleString('en-US') + ' respondents'
+        });
+        draw(layouts, GRAPHS[2], [ranking.trace], {annotations: [note]});
+    }
+
+    function fetchJson(url) { return fetch(url).then(function (r) { return r.json(); }); }
+
+    function init(url) {
+        var ageSelect = document.getElementById('simulated-age-filter');
+        var genderSelect = document.getElementById('simulated-gender-filter');
+        if (!ageSelect || !genderSelect) { return; }
+        var layouts = {};
+        var pending = GRAPHS.map(function (id) {
+            var el = document.getElementById(id);
+            return el ? fetchJson(el.dataset.figure).then(function (fig) { layouts[id] = fig.layout || {}; }) : null;
+        });
+        pending.unshift(fetch(url).then(function (r) { return r.arrayBuffer(); }));
+        Promise.all(pending)
+            .then(function (results) {
+                var cube = parse(results[0]);
+                var refresh = function () { update(cube, layouts, ageSelect, genderSelect); };
+                [ageSelect, genderSelect].forEach(function (select) {
+                    select.disabled = false;
+                    select.removeAttribute('title');
+                    select.addEventListener('change', refresh);
+                });
+                var reset = document.getElementById('reset-simulated-filters');
+                if (reset) {
+                    reset.addEventListener('click', function () {
+                        [ageSelect, genderSelect].forEach(function (select) {
+                            Array.prototype.forEach.call(select.options, function (o) { o.selected = false; });
+                        });
+                        refresh();
+                    });
+                }
+            })
+            .catch(function (err) { console.error('Failed to load chapter 6 data', url, err); });
+    }
+
+    window.Chapter6 = {init: init, parse: parse};
+    document.addEventListener('DOMContentLoaded', function () {
+        var script = document.querySelector('script[data-cube]');
+        if (script) { init(script.dataset.cube); }
+    });
+})();
+'''
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+流式转换大型样本工作簿（.xlsx）为 CSV 或 Parquet。
+
+用 openpyxl 只读模式逐行读取，每 --chunk-size 行组成一个数据块，
+对数据块应用 fix_encoding.COLUMN_MAPPING 列名映射（可选再应用
+CATEGORY_MAPPINGS 取值映射），然后追加写入 CSV 或作为一个 Parquet
+row group 写出。内存占用只与数据块大小有关，与工作簿大小无关。
+
+各数据块的列类型由 pandas 分别推断，彼此可能不同（前几块全为空、整数列在某块含空值
+或小数）；_ColumnTypes 以第一个有值的数据块为准、遇到不兼容的取值时放宽，
+CSV 与 Parquet 的各块因此写出一致的类型。
+
+    python stream_convert.py simulated_samples.xlsx simulated_samples_clean.csv
+    python stream_convert.py big.xlsx big.parquet --chunk-size 100000 --map-categories
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from itertools import islice
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from fix_encoding import COLUMN_MAPPING, CATEGORY_MAPPINGS
+
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def iter_chunks(path, sheet=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """逐块读取工作表，产出 DataFrame；第一行为表头"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        rows = worksheet.iter_rows(values_only=True)
+        header = [str(name) for name in next(rows)]
+        while True:
+            block = list(islice(rows, chunk_size))
+            if not block:
+                break
+            yield pd.DataFrame(block, columns=header)
+    finally:
+        workbook.close()
+
+
+def transform_chunk(df, map_categories=False):
+    """对单个数据块应用列名映射与（可选的）分类取值映射"""
+    df = df.rename(columns=COLUMN_MAPPING)
+    if map_categories:
+        for col, mapping in CATEGORY_MAPPINGS.items():
+            if col in df.columns:
+                df[col] = df[col].replace(mapping)
+    return df
+
+
+def column_kind(series):
+    """
+    数据块中一列的类型：None（全为空）、'int'、'float'、'bool'、'datetime' 或 'string'。
+
+    各数据块由 pandas 分别推断类型，含空值的整数列会变成 float，这里按取值判断：
+    非空值都是整数时为 'int'；数字与文字混在一起时为 'string'。
+    """
+    values = series.dropna()
+    if values.empty:
+        return None
+    inferred = pd.api.types.infer_dtype(values, skipna=True)
+    if inferred == 'boolean':
+        return 'bool'
+    if inferred in ('datetime64', 'datetime', 'date'):
+        return 'datetime'
+    if inferred == 'integer':
+        return 'int'
+    if inferred in ('floating', 'mixed-integer-float', 'decimal'):
+        numbers = pd.to_numeric(values)
+        return 'int' if numbers.mod(1).eq(0).all() else 'float'
+    return 'string'
+
+
+def promote_kind(old, new):
+    """两个数据块类型的合并：整数与小数为 float，其余不一致时为 string"""
+    if old is None or new is None or old == new:
+        return old or new
+    if {old, new} == {'int', 'float'}:
+        return 'float'
+    return 'string'
+
+
+def coerce_column(series, kind):
+    """把一列转换为 kind（空值保留为缺失值）"""
+    if kind == 'int':
+        return pd.to_numeric(series).astype('Int64')
+    if kind == 'float':
+        return pd.to_numeric(series).astype('float64')
+    if kind == 'bool':
+        return series.astype('boolean')
+    if kind == 'datetime':
+        return pd.to_datetime(series)
+    if kind == 'string':
+        return series.map(lambda value: value if isinstance(value, str) or pd.isna(value) else str(value),
+                          na_action='ignore').astype(object)
+    # 还没有出现过非空值的列
+    return pd.Series(None, index=series.index, dtype=object)
+
+
+class _ColumnTypes:
+    """
+    跨数据块固定列类型。
+
+    每列的类型取第一个有非空值的数据块，之后的数据块出现不兼容的取值时按 promote_kind 放宽；
+    update() 返回按当前类型转换后的数据块。
+    """
+
+    def __init__(self):
+        self.kinds = {}
+
+    def update(self, df):
+        for col in df.columns:
+            self.kinds[col] = promote_kind(self.kinds.get(col), column_kind(df[col]))
+        return df.assign(**{col: coerce_column(df[col], self.kinds[col]) for col in df.columns})
+
+
+class _CsvWriter:
+    """追加写入 CSV，只在第一块写表头；整数列在含空值的数据块中仍写为整数"""
+
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.header = True
+        self.types = _ColumnTypes()
+
+    def write(self, df):
+        df = self.types.update(df)
+        df.to_csv(self.file, index=False, header=self.header)
+        self.header = False
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    """
+    每个数据块写为一个 row group。
+
+    列类型由 _ColumnTypes 跨数据块确定，各 row group 类型一致：还没有非空值的列暂记为 null，
+    后续数据块放宽了类型（null -> 整数、整数 -> 小数、数字 -> 字符串）时，把已写出的
+    row group 逐个按新 schema 转换、写入新的临时文件，再继续追加。
+    写入同目录下的临时文件，close() 时替换为 path。
+    """
+
+    ARROW_TYPES = {'int': 'int64', 'float': 'float64', 'bool': 'bool_', 'string': 'string'}
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("写出 Parquet 需要安装 pyarrow（pip install pyarrow），或改用 .csv 输出")
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.types = _ColumnTypes()
+        self.schema = None
+        self.writer = None
+        self.tmp_path = None
+
+    def _arrow_type(self, kind):
+        if kind is None:
+            return self.pa.null()
+        if kind == 'datetime':
+            return self.pa.timestamp('us')
+        return getattr(self.pa, self.ARROW_TYPES[kind])()
+
+    def _open(self, schema):
+        fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                             prefix='.', suffix='.parquet.tmp')
+        os.close(fd)
+        self.schema = schema
+        self.writer = self.pq.ParquetWriter(self.tmp_path, schema, compression='zstd')
+
+    def _rewrite(self, schema):
+        """按放宽后的 schema 重写已写出的 row group"""
+        self.writer.close()
+        old_path = self.tmp_path
+        self._open(schema)
+        written = self.pq.ParquetFile(old_path)
+        for index in range(written.num_row_groups):
+            self.writer.write_table(written.read_row_group(index).cast(schema))
+        os.remove(old_path)
+
+    def write(self, df):
+        df = self.types.update(df)
+        schema = self.pa.schema([(col, self._arrow_type(self.types.kinds[col])) for col in df.columns])
+        if self.writer is None:
+            self._open(schema)
+        elif not schema.equals(self.schema):
+            self._rewrite(schema)
+        table = self.pa.Table.from_pandas(df, preserve_index=False).select(schema.names)
+        self.writer.write_table(table.cast(schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            os.replace(self.tmp_path, self.path)
+
+
+def convert(source, output, sheet=None, chunk_size=DEFAULT_CHUNK_SIZE, map_categories=False):
+    """流式转换 source 到 output（按扩展名选择 CSV 或 Parquet），返回写出的行数"""
+    writer = _ParquetWriter(output) if output.endswith('.parquet') else _CsvWriter(output)
+    total = 0
+    start = time.perf_counter()
+    try:
+        for index, chunk in enumerate(iter_chunks(source, sheet, chunk_size)):
+            writer.write(transform_chunk(chunk, map_categories))
+            total += len(chunk)
+            print(f"  数据块 {index + 1}: 累计 {total} 行")
+    finally:
+        writer.close()
+    print(f"{source} -> {output}: {total} 行，用时 {time.perf_counter() - start:.2f}s，"
+          f"文件大小 {os.path.getsize(output) / 1024:.1f} KB")
+    return total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='流式转换 .xlsx 样本工作簿为 CSV / Parquet')
+    parser.add_argument('source', help='输入的 .xlsx 文件')
+    parser.add_argument('output', help='输出文件（.csv 或 .parquet）')
+    parser.add_argument('--sheet', default=None, help='工作表名称（默认第一个）')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每个数据块的行数')
+    parser.add_argument('--map-categories', action='store_true',
+                        help='同时把分类字段映射为应用使用的英文取值')
+    args = parser.parse_args()
+    convert(args.source, args.output, args.sheet, args.chunk_size, args.map_categories)
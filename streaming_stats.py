@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+分块流式的描述性统计，可跨数据块、跨进程合并。
+
+每列维护一个可合并的累加器：
+- 数值列：计数、Welford 均值/方差（按 Chan 公式合并）、最小/最大值，
+  以及 KLL 分位数草图（内存与行数无关，秩误差约 1.7/k）；
+- 分类列：取值计数（Counter）。
+
+列类型由第一个含非缺失值的数据块决定；之后某个数据块出现非数值时该列改为分类列，
+已统计的数值按取值转为计数（数值列最多记录 DISTINCT_LIMIT 个不同取值，超出后
+转换时这部分只计入 other）。跨进程合并时类型不一致的列按同样的方式处理。
+
+数据按块读取（CSV 用 pandas chunksize，Parquet 按 row group，.xlsx 用
+stream_convert 的只读模式），各块在进程池中统计后合并，内存只与块大小有关。
+
+    python streaming_stats.py simulated_samples_clean.csv
+    python streaming_stats.py big.parquet --workers 8 --output profile.json
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 100000
+DEFAULT_SKETCH_SIZE = 200
+QUANTILES = (0.25, 0.5, 0.75)
+# 数值列记录的不同取值个数上限，用于改为分类列时保留取值计数
+DISTINCT_LIMIT = 10000
+
+
+class KLLSketch:
+    """
+    KLL 分位数草图。
+
+    第 h 层的每个元素代表 2^h 个原始值；某层超出容量时排序后随机保留
+    奇数位或偶数位元素提升到上一层。两个草图逐层拼接后再压缩即完成合并。
+    """
+
+    def __init__(self, k=DEFAULT_SKETCH_SIZE, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        while True:
+            level = next((h for h, items in enumerate(self.levels) if len(items) > self._capacity(h)), None)
+            if level is None:
+                return
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # 奇数个元素时留下一个，其余两两取一提升到上一层
+            leftover, items = items[:len(items) % 2], items[len(items) % 2:]
+            promoted = items[self._rng.integers(2)::2]
+            self.levels[level] = leftover
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs=QUANTILES):
+        items = np.concatenate(self.levels)
+        if not len(items):
+            return [None for _ in qs]
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side='left')
+        return [float(items[min(p, len(items) - 1)]) for p in positions]
+
+
+class NumericAccumulator:
+    """数值列：计数、均值、方差（Welford / Chan 合并）、极值与分位数"""
+
+    def __init__(self, k=DEFAULT_SKETCH_SIZE):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.missing = 0
+        self.sketch = KLLSketch(k)
+        # 取值 -> 计数（与分类列一样以字符串为键），超过 DISTINCT_LIMIT 个后为 None
+        self.values = Counter()
+
+    def _count_values(self, counts):
+        if self.values is not None:
+            self.values.update(counts)
+            if len(self.values) > DISTINCT_LIMIT:
+                self.values = None
+
+    def update(self, series):
+        values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=float)
+        valid = values[~np.isnan(values)]
+        self.missing += len(values) - len(valid)
+        if not len(valid):
+            return
+        if self.values is not None:
+            self._count_values({str(value): count for value, count in series.dropna().value_counts().items()})
+        chunk = NumericAccumulator(self.sketch.k)
+        chunk.count = len(valid)
+        chunk.mean = float(valid.mean())
+        chunk.m2 = float(((valid - chunk.mean) ** 2).sum())
+        chunk.min, chunk.max = float(valid.min()), float(valid.max())
+        chunk.sketch.update(valid)
+        self.merge(chunk)
+
+    def merge(self, other):
+        total = self.count + other.count
+        if other.count:
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / total
+            self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+            self.count = total
+            self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+            self.sketch.merge(other.sketch)
+        if other.values is None:
+            self.values = None
+        else:
+            self._count_values(other.values)
+        self.missing += other.missing
+        return self
+
+    def to_categorical(self):
+        """改为分类列：已统计的数值按取值计数，取值过多未记录时计入 other"""
+        categorical = CategoricalAccumulator()
+        categorical.missing = self.missing
+        if self.values is None:
+            categorical.other = self.count
+        else:
+            categorical.counts.update(self.values)
+        return categorical
+
+    def result(self):
+        if not self.count:
+            return {'count': 0, 'missing': self.missing}
+        q25, q50, q75 = self.sketch.quantiles(QUANTILES)
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'std': (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else None,
+            'min': self.min,
+            '25%': q25,
+            '50%': q50,
+            '75%': q75,
+            'max': self.max,
+            'missing': self.missing,
+        }
+
+
+class CategoricalAccumulator:
+    """分类列：各取值的计数"""
+
+    def __init__(self, k=None):
+        self.counts = Counter()
+        self.missing = 0
+        # 由数值列转换而来、没有逐个记录取值的个数
+        self.other = 0
+
+    def update(self, series):
+        self.missing += int(series.isna().sum())
+        self.counts.update(series.dropna().astype(str).value_counts().to_dict())
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.missing += other.missing
+        self.other += other.other
+        return self
+
+    def result(self):
+        result = {
+            'count': sum(self.counts.values()) + self.other,
+            'unique': len(self.counts),
+            'missing': self.missing,
+            'values': dict(self.counts.most_common()),
+        }
+        if self.other:
+            result['other'] = self.other
+        return result
+
+
+class MissingAccumulator:
+    """到目前为止只有缺失值的列，类型待定"""
+
+    def __init__(self, k=None):
+        self.missing = 0
+
+    def update(self, series):
+        self.missing += len(series)
+
+    def merge(self, other):
+        self.missing += other.missing
+        return self
+
+    def result(self):
+        return {'count': 0, 'missing': self.missing}
+
+
+def _is_numeric(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def _merge_accumulators(left, right):
+    """合并同一列的两个累加器；类型不同时数值列先转为分类列"""
+    if isinstance(right, MissingAccumulator):
+        left.missing += right.missing
+        return left
+    if isinstance(left, MissingAccumulator):
+        right.missing += left.missing
+        return right
+    if isinstance(left, NumericAccumulator) and isinstance(right, CategoricalAccumulator):
+        left = left.to_categorical()
+    elif isinstance(left, CategoricalAccumulator) and isinstance(right, NumericAccumulator):
+        right = right.to_categorical()
+    return left.merge(right)
+
+
+class SampleProfile:
+    """整份样本的统计：列名 -> 累加器；列类型由第一个含非缺失值的数据块决定"""
+
+    def __init__(self, k=DEFAULT_SKETCH_SIZE):
+        self.k = k
+        self.rows = 0
+        self.columns = {}
+
+    def update(self, df):
+        for col in df.columns:
+            series = df[col]
+            current = self.columns.get(col)
+            if not series.notna().any():
+                # 全为缺失值的数据块不决定列类型
+                if current is None:
+                    current = self.columns[col] = MissingAccumulator()
+                current.missing += len(series)
+                continue
+            numeric = _is_numeric(series)
+            if current is None or isinstance(current, MissingAccumulator):
+                accumulator = (NumericAccumulator if numeric else CategoricalAccumulator)(self.k)
+                accumulator.missing = current.missing if current is not None else 0
+                current = self.columns[col] = accumulator
+            elif isinstance(current, NumericAccumulator) and not numeric:
+                current = self.columns[col] = current.to_categorical()
+            current.update(series)
+        self.rows += len(df)
+        return self
+
+    def merge(self, other):
+        for col, accumulator in other.columns.items():
+            if col in self.columns:
+                self.columns[col] = _merge_accumulators(self.columns[col], accumulator)
+            else:
+                self.columns[col] = accumulator
+        self.rows += other.rows
+        return self
+
+    def result(self):
+        return {
+            'rows': self.rows,
+            # 全为缺失值的列与数值列一样报告为 count 0
+            'numeric': {col: acc.result() for col, acc in self.columns.items()
+                        if isinstance(acc, (NumericAccumulator, MissingAccumulator))},
+            'categorical': {col: acc.result() for col, acc in self.columns.items()
+                            if isinstance(acc, CategoricalAccumulator)},
+        }
+
+
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """按文件类型分块读取样本"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif path.endswith('.xlsx'):
+        import stream_convert
+        yield from stream_convert.iter_chunks(path, chunk_size=chunk_size)
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def _profile_chunk(chunk, k):
+    return SampleProfile(k).update(chunk)
+
+
+def _profile_row_groups(path, row_groups, k):
+    """在工作进程中统计 Parquet 文件的若干 row group"""
+    import pyarrow.parquet as pq
+    profile = SampleProfile(k)
+    parquet = pq.ParquetFile(path)
+    for group in row_groups:
+        profile.update(parquet.read_row_group(group).to_pandas())
+    return profile
+
+
+def profile_sample(path, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, k=DEFAULT_SKETCH_SIZE):
+    """
+    统计样本文件，返回合并后的 SampleProfile。
+
+    Parquet 按 row group 分给各进程独立读取；CSV/xlsx 由主进程顺序读取，
+    数据块交给进程池统计，同时最多 2 x workers 个数据块在途，内存有上限。
+    """
+    workers = workers or os.cpu_count() or 1
+    profile = SampleProfile(k)
+
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        groups = list(range(pq.ParquetFile(path).num_row_groups))
+        shares = [groups[i::workers] for i in range(workers) if groups[i::workers]]
+        with ProcessPoolExecutor(max_workers=len(shares) or 1) as pool:
+            for partial in pool.map(_profile_row_groups, [path] * len(shares), shares, [k] * len(shares)):
+                profile.merge(partial)
+        return profile
+
+    if workers == 1:
+        for chunk in iter_chunks(path, chunk_size):
+            profile.update(chunk)
+        return profile
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for chunk in iter_chunks(path, chunk_size):
+            pending.append(pool.submit(_profile_chunk, chunk, k))
+            if len(pending) >= 2 * workers:
+                profile.merge(pending.pop(0).result())
+        for future in pending:
+            profile.merge(future.result())
+    return profile
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='分块流式统计样本文件（CSV / Parquet / xlsx）')
+    parser.add_argument('path', help='样本文件')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每个数据块的行数')
+    parser.add_argument('--workers', type=int, default=None, help='并行进程数（默认为CPU核数）')
+    parser.add_argument('--sketch-size', type=int, default=DEFAULT_SKETCH_SIZE, help='KLL 草图参数 k')
+    parser.add_argument('--output', '-o', default=None, help='把统计结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = profile_sample(args.path, args.chunk_size, args.workers, args.sketch_size).result()
+    print(f"=== {args.path}: {result['rows']} 行，用时 {time.perf_counter() - start:.2f}s ===")
+
+    print("\n=== 数值列统计 ===")
+    for col, stats in result['numeric'].items():
+        if not stats['count']:
+            print(f"\n{col}: 无有效数值")
+            continue
+        std = f"{stats['std']:.2f}" if stats['std'] is not None else '-'
+        print(f"\n{col}:")
+        print(f"  均值: {stats['mean']:.2f}  标准差: {std}")
+        print(f"  最小值: {stats['min']}  中位数: {stats['50%']}  最大值: {stats['max']}")
+
+    print("\n=== 分类变量分布 ===")
+    for col, stats in result['categorical'].items():
+        print(f"\n{col} 分布（{stats['unique']} 个取值）:")
+        for value, count in list(stats['values'].items())[:10]:
+            print(f"  {value}: {count} ({count / max(stats['count'], 1) * 100:.1f}%)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n统计结果已保存到 {args.output}")
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+按年份分区的统计表数据仓，供趋势章节查询多年序列。
+
+每年的 DSEC 资讯科技使用情况调查工作簿（SC_UTI_FR_<年份>_Y.xls）用 survey_tables.py
+解析为长格式后，按标题中的年份写入一个分区：
+
+    .survey_store/
+        manifest.json                 已导入的工作簿（路径、内容哈希、行数）
+        year=2023/tables.parquet
+        year=2024/tables.parquet
+
+导入是增量的：内容哈希已在清单中的工作簿直接跳过；新的一年只解析这一本工作簿、
+写入新分区，较早年份的分区不重新处理。同一年份的工作簿更新（如修订版）时替换该分区。
+
+每个分区同时保存相对上一个已有年份的变化，按细分项（INDEX：表、维度、类别、组别、
+指标、性别）对齐：previous_year、previous_value、delta、growth（比率，上一年为 0 时为空）。
+补入较早的年份时，只需重算紧随其后的那一个分区的变化列。
+
+导入由 pipeline.py 的 survey_store 阶段或本脚本完成，应用启动时只读取。
+load_store() 读入全部分区并按 INDEX + year 排序建立索引；trend_series() 与
+latest_changes() 在此基础上做索引查找，不在请求时计算。
+
+    python survey_store.py                       # 导入 SC_UTI_FR_*_Y.xls 中尚未导入的工作簿
+    python survey_store.py SC_UTI_FR_2025_Y.xls  # 导入指定工作簿
+    python survey_store.py --rebuild             # 清空后全部重新导入
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from content_hash import file_digest
+from survey_tables import CACHE_FORMAT, COLUMNS, INDEX, parse_workbook
+
+STORE_DIR = '.survey_store'
+ARCHIVE_PATTERN = 'SC_UTI_FR_*_Y.xls'
+CHANGE_COLUMNS = ['previous_year', 'previous_value', 'delta', 'growth']
+
+
+def _manifest_path(store_dir):
+    return os.path.join(store_dir, 'manifest.json')
+
+
+def _partition_path(store_dir, year):
+    return os.path.join(store_dir, f'year={year}', f'tables.{CACHE_FORMAT}')
+
+
+def load_manifest(store_dir=STORE_DIR):
+    if os.path.exists(_manifest_path(store_dir)):
+        with open(_manifest_path(store_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'partitions': {}}
+
+
+def _write_atomic(path, write):
+    """
+    write(临时路径) 写入同目录下的唯一临时文件后再替换 path。
+
+    读取方不会看到写了一半的文件；多个进程同时导入时也不会共用同一个临时文件。
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.', suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        # mkstemp 建立的文件只有属主可读，应用可能以其他用户运行
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _save_manifest(manifest, store_dir):
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    _write_atomic(_manifest_path(store_dir), write)
+
+
+def _read_partition(store_dir, year):
+    path = _partition_path(store_dir, year)
+    return pd.read_parquet(path) if CACHE_FORMAT == 'parquet' else pd.read_pickle(path)
+
+
+def _write_partition(frame, store_dir, year):
+    path = _partition_path(store_dir, year)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if CACHE_FORMAT == 'parquet':
+        _write_atomic(path, lambda tmp_path: frame.to_parquet(tmp_path, index=False))
+    else:
+        _write_atomic(path, frame.to_pickle)
+
+
+def with_changes(current, previous):
+    """
+    为 current（某一年的长格式表）加上相对 previous 的变化列。
+
+    previous 为 None（没有更早的年份）时变化列为空；只在一年中出现的细分项同样为空。
+    """
+    current = current[COLUMNS]
+    if previous is None:
+        changes = pd.DataFrame(index=current.index, columns=CHANGE_COLUMNS, dtype=float)
+        return pd.concat([current, changes], axis=1)
+    previous = previous[INDEX + ['year', 'value']].rename(
+        columns={'year': 'previous_year', 'value': 'previous_value'})
+    merged = current.merge(previous, on=INDEX, how='left')
+    merged['previous_year'] = merged['previous_year'].astype(float)
+    merged['delta'] = merged['value'] - merged['previous_value']
+    merged['growth'] = merged['delta'] / merged['previous_value'].where(merged['previous_value'] != 0)
+    return merged
+
+
+def ingest_tables(tables, source, digest, store_dir=STORE_DIR):
+    """
+    把一本工作簿解析出的长格式表按年份写入分区，返回写入的年份列表。
+
+    写入年份之后紧邻的已有分区（其"上一年"可能因此改变）重算变化列，其余分区不动。
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = load_manifest(store_dir)
+    partitions = manifest['partitions']
+    written = []
+    for year, frame in tables.groupby('year'):
+        year = int(year)
+        earlier = [int(y) for y in partitions if int(y) < year]
+        later = [int(y) for y in partitions if int(y) > year]
+        previous = _read_partition(store_dir, max(earlier)) if earlier else None
+        _write_partition(with_changes(frame, previous), store_dir, year)
+        partitions[str(year)] = {'source': source, 'sha256': digest, 'rows': len(frame),
+                                 'ingested': time.strftime('%Y-%m-%d %H:%M:%S')}
+        if later:
+            following = _read_partition(store_dir, min(later))
+            _write_partition(with_changes(following, frame), store_dir, min(later))
+        written.append(year)
+    _save_manifest(manifest, store_dir)
+    return written
+
+
+def ingest(path, store_dir=STORE_DIR):
+    """导入一本工作簿；内容已导入过时跳过，返回写入的年份列表"""
+    digest = file_digest(path)
+    if any(entry['sha256'] == digest for entry in load_manifest(store_dir)['partitions'].values()):
+        return []
+    years = ingest_tables(parse_workbook(path), os.path.basename(path), digest, store_dir)
+    print(f"已导入 {path}: {', '.join(map(str, years))} 年")
+    return years
+
+
+def ingest_all(pattern=ARCHIVE_PATTERN, store_dir=STORE_DIR):
+    """按文件名顺序导入匹配的全部工作簿，返回新写入的年份列表"""
+    years = []
+    for path in sorted(glob.glob(pattern)):
+        years.extend(ingest(path, store_dir))
+    return years
+
+
+def load_store(store_dir=STORE_DIR):
+    """读取全部分区，按 INDEX + year 建立排序索引；仓库为空时返回 None"""
+    years = sorted(int(year) for year in load_manifest(store_dir)['partitions'])
+    if not years:
+        return None
+    store = pd.concat([_read_partition(store_dir, year) for year in years], ignore_index=True)
+    return store.set_index(INDEX + ['year']).sort_index()
+
+
+def store_years(store):
+    return [] if store is None else sorted(store.index.get_level_values('year').unique().tolist())
+
+
+def trend_series(store, table, indicator, dimension, categories, sex='男女', group=''):
+    """
+    某指标按年份的序列：行为年份，列为 categories，另返回同形状的 delta 与 growth。
+
+    store 为 None 或任一类别缺失时返回 None。
+    """
+    if store is None:
+        return None
+    try:
+        rows = {category: store.loc[(table, dimension, category, group, indicator, sex)]
+                for category in categories}
+    except KeyError:
+        return None
+    return {column: pd.DataFrame({category: rows[category][column] for category in categories})
+            for column in ('value', 'delta', 'growth')}
+
+
+def latest_changes(store, table, indicator, dimension, sex='男女', group=''):
+    """
+    最近一年各类别的数值与相对上一年的变化，按 growth 降序。
+
+    返回 (年份, 上一年, DataFrame[value, delta, growth])；没有可比较的年份时返回 None。
+    """
+    years = store_years(store)
+    if len(years) < 2:
+        return None
+    try:
+        rows = store.xs((table, dimension, group, indicator, sex, years[-1]),
+                        level=['table', 'dimension', 'group', 'indicator', 'sex', 'year'])
+    except KeyError:
+        return None
+    rows = rows.dropna(subset=['growth'])
+    if rows.empty:
+        return None
+    return years[-1], int(rows['previous_year'].iloc[0]), rows[['value', 'delta', 'growth']].sort_values(
+        'growth', ascending=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='把各年份的统计表工作簿增量导入数据仓')
+    parser.add_argument('paths', nargs='*', help=f'工作簿，默认为 {ARCHIVE_PATTERN}')
+    parser.add_argument('--store', default=STORE_DIR, help='数据仓目录')
+    parser.add_argument('--rebuild', action='store_true', help='清空数据仓后重新导入')
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(args.store):
+        shutil.rmtree(args.store)
+    if args.paths:
+        for path in args.paths:
+            ingest(path, args.store)
+    else:
+        ingest_all(store_dir=args.store)
+    for year, entry in sorted(load_manifest(args.store)['partitions'].items()):
+        print(f"  {year}: {entry['rows']} 个数值（{entry['source']}，{entry['ingested']}）")
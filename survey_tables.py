@@ -0,0 +1,246 @@
+"""
+解析 SC_UTI_FR_2024_Y.xls 的全部统计表，整理为长格式数据。
+
+每个工作表是一张交叉表：标题行 "N.  标题 (年份)"，单位在第3行最右列，
+随后是若干表头行，再往下是数据行，最后一行为附注。数据表有两种布局：
+
+- 表3-10（以及表1）：行为指标（第1列为组别，第2列为项目，第3列为性别），
+  列为人口特征类别（总数、各岁组、学历等）；
+- 表2、表11：行为人口特征（岁组、学历、经济活动状况分组），
+  列为指标，最后一行表头为性别。
+
+两种布局都转换为同一个长格式表，每行一个数值：
+(table, year, title, unit, dimension, category, group, indicator, sex, value)。
+"~"（没有数字）不输出。解析结果按工作簿内容哈希缓存为列式文件，
+load_tables() 返回按 INDEX 排好序的表，图表通过 lookup_values() 做索引查找。
+"""
+
+import os
+import re
+import tempfile
+
+import pandas as pd
+
+from content_hash import file_digest
+
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    CACHE_FORMAT = 'pkl'
+
+SOURCE_PATH = 'SC_UTI_FR_2024_Y.xls'
+CACHE_DIR = '.pipeline_cache'
+
+COLUMNS = ['table', 'year', 'title', 'unit', 'dimension', 'category', 'group', 'indicator', 'sex', 'value']
+INDEX = ['table', 'dimension', 'category', 'group', 'indicator', 'sex']
+
+SEXES = ('男女', '男', '女')
+# 标题中没有 "按…统计" 的表，其列维度在这里给出
+_COLUMN_DIMENSIONS = {1: '住户类型'}
+_TITLE_PATTERN = re.compile(r'^\s*(\d+)\.\s*(.+?)\s*\((\d{4})\)\s*$')
+
+
+def _clean(value):
+    """单元格文本：去掉换行与多余空白、结尾的冒号；空单元格返回 None"""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    text = re.sub(r'\s+', '', str(value)) if isinstance(value, str) else str(value)
+    text = text.rstrip('：:')
+    return text or None
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not pd.isna(value):
+        return float(value)
+    return None
+
+
+def _header_labels(header):
+    """
+    把多行表头展开为每列的标签路径。
+
+    合并单元格只在左上角有值，因此每一行向右填充；上一层出现新的标签时，
+    下层的填充重新开始，避免把前一组的子标题带到后一组。
+    """
+    labels = {}
+    current = [None] * len(header)
+    for col in header.columns:
+        cells = [_clean(header.at[row, col]) for row in header.index]
+        for level, cell in enumerate(cells):
+            if cell is not None:
+                current[level] = cell
+                for lower in range(level + 1, len(current)):
+                    current[lower] = cells[lower]
+                break
+        labels[col] = [label for label in current if label is not None]
+    return labels
+
+
+def parse_sheet(raw):
+    """
+    解析单个工作表，返回长格式记录列表。
+
+    raw 为 header=None 读取的原始工作表。
+    """
+    match = _TITLE_PATTERN.match(str(raw.iat[0, 0]) + ' ' + str(raw.iat[0, 1]))
+    if not match:
+        return []
+    table, title, year = int(match.group(1)), match.group(2), int(match.group(3))
+    unit = _clean(raw.iat[2, raw.shape[1] - 1])
+    dims = re.search(r'按(.+?)统计', title)
+    dimension = _COLUMN_DIMENSIONS.get(table) or (re.split(r'[、及]', dims.group(1))[0] if dims else title)
+
+    # 数据从第一行含数值的行开始，其上方（单位行以下）为表头
+    first_data = next(row for row in range(3, len(raw))
+                      if any(_number(value) is not None for value in raw.iloc[row, 2:]))
+    header = raw.iloc[3:first_data]
+    value_columns = [col for col in raw.columns[2:] if header[col].notna().any()]
+    labels = _header_labels(header[value_columns])
+
+    # 最后一行表头全为性别时为"行是人口特征"的布局（表2、表11）
+    sex_in_columns = all(labels[col] and labels[col][-1] in SEXES for col in value_columns)
+    sex_in_rows = not sex_in_columns and raw.iloc[first_data:, 2].map(_clean).isin(SEXES).any()
+
+    records = []
+    group = None
+    current = ('', None)
+    for row in range(first_data, len(raw)):
+        first, second = _clean(raw.iat[row, 0]), _clean(raw.iat[row, 1])
+        if first and first.startswith('注'):
+            break
+        numbers = {col: _number(raw.at[row, col]) for col in value_columns}
+        has_data = any(_number(raw.iat[row, col]) is not None or _clean(raw.iat[row, col]) == '~'
+                       for col in value_columns)
+
+        if sex_in_columns:
+            # 行标签是人口特征：无数值的行是分组标题（岁组、学历…）
+            if first and not has_data:
+                group = first
+                continue
+            if not first:
+                continue
+            row_dimension, category = (group, first) if first != '总数' else ('总数', '总数')
+            for col, value in numbers.items():
+                if value is None:
+                    continue
+                records.append((table, year, title, unit, row_dimension, category, '',
+                                '/'.join(labels[col][:-1]), labels[col][-1], value))
+            continue
+
+        # 行标签是指标：第1列有值时为独立指标或组别标题（无数值），
+        # 第2列为组内项目；两列都为空的行是上一指标的男/女分行
+        if first:
+            if not has_data:
+                group = first
+                continue
+            current = ('', first)
+            # 紧随其后的项目属于该指标，如"有接驳互联网"下的"流动网络"
+            group = first
+        elif second:
+            current = (group or '', second)
+        if not has_data or current[1] is None:
+            continue
+        sex = _clean(raw.iat[row, 2]) if sex_in_rows else ''
+        for col, value in numbers.items():
+            if value is None:
+                continue
+            category = labels[col][-1]
+            records.append((table, year, title, unit, '总数' if category == '总数' else dimension,
+                            category, current[0], current[1], sex, value))
+    return records
+
+
+def parse_workbook(path=SOURCE_PATH):
+    """解析工作簿中的所有统计表，返回长格式 DataFrame（未设索引）"""
+    sheets = pd.read_excel(path, sheet_name=None, header=None)
+    records = []
+    for raw in sheets.values():
+        if raw.shape[0] > 3 and raw.shape[1] > 2:
+            records.extend(parse_sheet(raw))
+    return pd.DataFrame(records, columns=COLUMNS)
+
+
+def _cache_path(path):
+    return os.path.join(CACHE_DIR, f'survey_tables-{file_digest(path, 12)}.{CACHE_FORMAT}')
+
+
+def _write_cache(tables, cache_path):
+    """
+    写入同目录下的唯一临时文件后再替换缓存文件。
+
+    多个进程同时解析时各写各的临时文件，读取方只会看到完整的缓存。
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, prefix='.survey_tables-', suffix='.tmp')
+    os.close(fd)
+    try:
+        if CACHE_FORMAT == 'parquet':
+            tables.to_parquet(tmp_path, index=False)
+        else:
+            tables.to_pickle(tmp_path)
+        # mkstemp 建立的文件只有属主可读，应用可能以其他用户运行
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_tables(path=SOURCE_PATH, refresh=False):
+    """
+    读取长格式表（按 INDEX 建立排序索引）。
+
+    缓存文件名包含工作簿内容哈希，工作簿更新后自动重新解析。
+    这里不删除旧的缓存文件（其他进程可能正在读取），由 prune_cache() 清理。
+    """
+    cache_path = _cache_path(path)
+    tables = None
+    if not refresh:
+        try:
+            tables = pd.read_parquet(cache_path) if CACHE_FORMAT == 'parquet' else pd.read_pickle(cache_path)
+        except FileNotFoundError:
+            pass
+    if tables is None:
+        tables = parse_workbook(path)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _write_cache(tables, cache_path)
+        print(f"已解析 {path}: {len(tables)} 个数值 -> {cache_path}")
+    return tables.set_index(INDEX).sort_index()
+
+
+def prune_cache(path=SOURCE_PATH):
+    """删除与当前工作簿不对应的缓存文件，返回删除的文件名；只在流水线或命令行中调用"""
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    keep = os.path.basename(_cache_path(path))
+    removed = []
+    for filename in os.listdir(CACHE_DIR):
+        if filename.startswith('survey_tables-') and filename != keep:
+            try:
+                os.remove(os.path.join(CACHE_DIR, filename))
+            except FileNotFoundError:
+                continue
+            removed.append(filename)
+    return removed
+
+
+def lookup_values(tables, table, group, indicators, dimension='总数', category='总数', sex='男女'):
+    """
+    按 (表号, 组别, 指标) 查找一组数值，单位与原表一致。
+
+    tables 为 None 或任一指标缺失时返回 None，调用方使用内置数值。
+    """
+    if tables is None:
+        return None
+    try:
+        return [float(tables.at[(table, dimension, category, group, indicator, sex), 'value'])
+                for indicator in indicators]
+    except KeyError:
+        return None
+
+
+if __name__ == '__main__':
+    tables = load_tables(refresh=True)
+    prune_cache()
+    print(tables.reset_index().groupby(['table', 'dimension'])['value'].count())
@@ -0,0 +1,236 @@
+"""callback_cache 的 single-flight、缓存键与 L2 的过期/淘汰"""
+
+import threading
+
+import pytest
+
+import callback_cache
+
+LABEL = 'chart.figure'
+
+
+class Context:
+    """只提供 wrapper 读取的 triggered_inputs"""
+
+    def __init__(self, *prop_ids):
+        self.triggered_inputs = [{'prop_id': prop_id} for prop_id in prop_ids]
+
+
+class Clock:
+    """替换 callback_cache.time，测试中手动推进时间"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+class CountingEvent(threading.Event):
+    """记录有多少个线程在等待"""
+
+    waiting = 0
+    lock = threading.Lock()
+
+    def wait(self, timeout=None):
+        with CountingEvent.lock:
+            CountingEvent.waiting += 1
+        return super().wait(timeout)
+
+
+class CountingFlight(callback_cache._Flight):
+    def __init__(self):
+        super().__init__()
+        self.done = CountingEvent()
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(callback_cache, 'cache', callback_cache.CallbackCache())
+    monkeypatch.setattr(callback_cache, 'disk_cache', None)
+    monkeypatch.setattr(callback_cache, 'data_version', 'v1')
+    monkeypatch.setattr(callback_cache, '_inflight', {})
+    monkeypatch.setattr(callback_cache, '_Flight', CountingFlight)
+    CountingEvent.waiting = 0
+
+
+def run_concurrently(outcome, followers=8):
+    """
+    第一个请求开始计算后再发出 followers 个相同的请求，等它们都在等待时放行计算；
+    计算返回 outcome，outcome 为异常时抛出。
+
+    返回 ({线程序号: 结果或异常}, 每次计算的输入)。
+    """
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def figure(value):
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    wrapper = callback_cache._instrument(figure, LABEL, set())
+    results = {}
+
+    def request(index):
+        try:
+            results[index] = wrapper('same-input')
+        except Exception as e:
+            results[index] = e
+
+    leader = threading.Thread(target=request, args=(0,))
+    leader.start()
+    assert started.wait(5)
+    threads = [threading.Thread(target=request, args=(index,)) for index in range(1, followers + 1)]
+    for thread in threads:
+        thread.start()
+    for _ in range(500):
+        if CountingEvent.waiting == followers:
+            break
+        threading.Event().wait(0.01)
+    assert CountingEvent.waiting == followers
+    release.set()
+    for thread in [leader] + threads:
+        thread.join(5)
+    return results, calls
+
+
+def test_concurrent_identical_requests_compute_once():
+    results, calls = run_concurrently('{"figure": 1}')
+    assert calls == ['same-input']
+    assert set(results.values()) == {'{"figure": 1}'}
+    assert len(results) == 9
+    assert callback_cache._inflight == {}
+
+
+def test_waiters_get_the_leaders_exception():
+    error = ValueError('boom')
+    results, calls = run_concurrently(error)
+    assert calls == ['same-input']
+    assert all(result is error for result in results.values())
+    # 出错的结果不缓存，下一次请求重新计算
+    assert callback_cache.cache.stats()['entries'] == 0
+    assert callback_cache._inflight == {}
+
+
+def test_requests_after_completion_hit_the_cache():
+    calls = []
+
+    def figure(value):
+        calls.append(value)
+        return f'"{value}"'
+
+    wrapper = callback_cache._instrument(figure, LABEL, set())
+    assert wrapper('a') == wrapper('a') == '"a"'
+    assert wrapper('b') == '"b"'
+    assert calls == ['a', 'b']
+
+
+def test_key_keeps_only_whether_a_button_was_clicked():
+    key = callback_cache.cache_key
+    assert key(LABEL, [1, 'x'], {0}, []) == key(LABEL, [5, 'x'], {0}, [])
+    assert key(LABEL, [None, 'x'], {0}, []) == key(LABEL, [0, 'x'], {0}, [])
+    assert key(LABEL, [0, 'x'], {0}, []) != key(LABEL, [1, 'x'], {0}, [])
+    # 不是 n_clicks 的位置按原值区分
+    assert key(LABEL, [1, 'x'], set(), []) != key(LABEL, [5, 'x'], set(), [])
+    assert key(LABEL, [1, 'x'], {0}, []) != key(LABEL, [1, 'y'], {0}, [])
+
+
+def test_key_depends_on_triggered_inputs_but_not_their_order():
+    key = callback_cache.cache_key
+    both = key(LABEL, [1, 1], {0, 1}, ['a.n_clicks', 'b.n_clicks'])
+    assert both == key(LABEL, [1, 1], {0, 1}, ['b.n_clicks', 'a.n_clicks'])
+    assert key(LABEL, [1, 1], {0, 1}, ['a.n_clicks']) != key(LABEL, [1, 1], {0, 1}, ['b.n_clicks'])
+    assert key(LABEL, [1, 1], {0, 1}, []) != both
+
+
+def test_key_depends_on_data_version(monkeypatch):
+    before = callback_cache.cache_key(LABEL, ['x'], set(), [])
+    monkeypatch.setattr(callback_cache, 'data_version', 'v2')
+    assert callback_cache.cache_key(LABEL, ['x'], set(), []) != before
+
+
+def test_wrapper_reuses_result_for_repeated_clicks_of_the_same_button():
+    calls = []
+
+    def figure(n_clicks, callback_context=None):
+        calls.append(n_clicks)
+        return f'"{len(calls)}"'
+
+    wrapper = callback_cache._instrument(figure, LABEL, {0})
+    first = wrapper(1, callback_context=Context('reset.n_clicks'))
+    assert wrapper(5, callback_context=Context('reset.n_clicks')) == first
+    assert wrapper(5, callback_context=Context('other.n_clicks')) != first
+    assert calls == [1, 5]
+
+
+def test_refresh_version_misses_old_entries(monkeypatch):
+    monkeypatch.setattr(callback_cache, 'fingerprint', lambda: 'v2')
+    calls = []
+    wrapper = callback_cache._instrument(lambda value: calls.append(value) or f'"{value}"', LABEL, set())
+    wrapper('a')
+    callback_cache.refresh_version()
+    wrapper('a')
+    assert calls == ['a', 'a']
+    assert callback_cache.data_version == 'v2'
+
+
+def test_memory_cache_evicts_least_recently_used():
+    lru = callback_cache.CallbackCache(max_bytes=10)
+    lru.set('a', 'xxxx')
+    lru.set('b', 'xxxx')
+    assert lru.get('a') == 'xxxx'
+    lru.set('c', 'xxxx')
+    assert (lru.get('a'), lru.get('b'), lru.get('c')) == ('xxxx', None, 'xxxx')
+    assert lru.stats()['bytes'] == 8
+    # 超过上限的单个响应不缓存
+    lru.set('d', 'x' * 11)
+    assert lru.get('d') is None
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(callback_cache, 'time', clock)
+    return clock
+
+
+def test_disk_entries_expire_after_ttl(tmp_path, clock):
+    disk = callback_cache.DiskCache(str(tmp_path / 'callbacks.sqlite3'), ttl=100)
+    disk.set('old', 'value')
+    clock.now += 50
+    disk.set('new', 'value')
+    clock.now += 60
+    assert disk.get('old') is None
+    assert disk.get('new') == 'value'
+    # 过期项在读取时删除
+    assert disk.stats()['entries'] == 1
+
+    clock.now += 100
+    disk.evict()
+    assert disk.stats()['entries'] == 0
+
+
+def test_disk_evicts_least_recently_accessed_down_to_90_percent(tmp_path, clock):
+    disk = callback_cache.DiskCache(str(tmp_path / 'callbacks.sqlite3'), max_bytes=1000)
+    for key in 'abcde':
+        disk.set(key, 'x' * 300)
+        clock.now += callback_cache.TOUCH_INTERVAL + 1
+    # 读取 a 更新访问时间，之后最久未访问的是 b、c
+    assert disk.get('a') is not None
+    disk.evict()
+    assert disk.stats()['bytes'] == 900
+    assert [key for key in 'abcde' if disk.get(key) is not None] == ['a', 'd', 'e']
+
+
+def test_disk_evicts_automatically_every_few_writes(tmp_path, clock):
+    disk = callback_cache.DiskCache(str(tmp_path / 'callbacks.sqlite3'), max_bytes=1000)
+    for index in range(callback_cache.EVICT_EVERY):
+        disk.set(str(index), 'x' * 100)
+        clock.now += 1
+    assert disk.stats()['bytes'] <= 900
+    assert disk.get(str(callback_cache.EVICT_EVERY - 1)) is not None
+    assert disk.get('0') is None
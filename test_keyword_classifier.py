@@ -0,0 +1,67 @@
+"""KeywordClassifier 与逐个关键词查找子串的结果一致"""
+
+import json
+import random
+
+import pandas as pd
+import pytest
+
+import detailed_analysis
+from keyword_classifier import KeywordClassifier
+
+
+def naive_count(taxonomy, texts):
+    """改写前 detailed_analysis 的做法：逐段文本、逐个关键词查找"""
+    return {label: sum(any(text.count(keyword) for keyword in keywords) for text in texts)
+            for label, keywords in taxonomy.items()}
+
+
+def naive_classify(taxonomy, text):
+    return [label for label, keywords in taxonomy.items() if any(keyword in text for keyword in keywords)]
+
+
+@pytest.fixture(scope='module')
+def titles():
+    return pd.read_excel(detailed_analysis.SOURCE_PATH)['住户使用资讯科技情况'].tolist()
+
+
+@pytest.mark.parametrize('taxonomy', [detailed_analysis.CATEGORY_TAXONOMY, detailed_analysis.PATTERN_TAXONOMY])
+def test_count_matches_naive_loop(taxonomy, titles):
+    counts = KeywordClassifier(taxonomy).count(titles)
+    assert {label: counts[label] for label in taxonomy} == naive_count(taxonomy, titles)
+
+
+def test_count_matches_saved_analysis(titles):
+    with open('detailed_analysis.json', 'r', encoding='utf-8') as f:
+        saved = json.load(f)['content_analysis']
+    assert dict(KeywordClassifier(detailed_analysis.CATEGORY_TAXONOMY).count(titles)) == saved['categories']
+    patterns = KeywordClassifier(detailed_analysis.PATTERN_TAXONOMY).count(titles)
+    assert {label: count for label, count in patterns.items() if count} == saved['patterns']
+
+
+def test_overlapping_keywords(titles):
+    # 互为前缀、后缀或包含的关键词，以及同一关键词属于多个类别
+    taxonomy = {
+        '活动': ['活动'],
+        '活动状态': ['活动状态', '状态'],
+        '网络': ['互联网', '联网', '网'],
+        '电话': ['手提电话', '电话', '话'],
+        '英文': ['he', 'she', 'his', 'hers'],
+        '重复': ['网', 'she'],
+    }
+    classifier = KeywordClassifier(taxonomy)
+    texts = titles + ['ushers', 'hishe', 'sh', '按经济活动状况统计的互联网使用者', '']
+    for text in texts:
+        assert classifier.classify(text) == naive_classify(taxonomy, text)
+    counts = classifier.count(texts)
+    assert {label: counts[label] for label in taxonomy} == naive_count(taxonomy, texts)
+
+
+def test_random_texts():
+    rng = random.Random(0)
+    alphabet = 'abc互联网'
+    taxonomy = {f'k{i}': [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+                          for _ in range(rng.randint(1, 3))] for i in range(20)}
+    texts = [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30))) for _ in range(300)]
+    classifier = KeywordClassifier(taxonomy)
+    assert classifier.classify_batch(texts) == [naive_classify(taxonomy, text) for text in texts]
@@ -0,0 +1,93 @@
+"""stream_convert 在各数据块类型不一致时写出一致的 CSV / Parquet"""
+
+import datetime
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+import stream_convert
+
+ROWS = 12
+CHUNK_SIZE = 4
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """
+    每 4 行一个数据块：
+    late 第一块全为空、之后为整数；frac 第三块出现小数；nan_int 第二块有空值；
+    mixed 第三块出现文字；when 为日期。
+    """
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['late', 'frac', 'nan_int', 'mixed', 'when'])
+    for i in range(ROWS):
+        ws.append([None if i < CHUNK_SIZE else i, 3.5 if i == 9 else i, None if i == 6 else i,
+                   'x' if i == 10 else i, datetime.datetime(2024, 1, 1 + i)])
+    path = tmp_path / 'samples.xlsx'
+    wb.save(path)
+    return str(path)
+
+
+def expected():
+    return pd.DataFrame({
+        'late': [None] * CHUNK_SIZE + list(range(CHUNK_SIZE, ROWS)),
+        'frac': [3.5 if i == 9 else float(i) for i in range(ROWS)],
+        'nan_int': [None if i == 6 else i for i in range(ROWS)],
+        'mixed': ['x' if i == 10 else str(i) for i in range(ROWS)],
+    })
+
+
+def test_chunks_have_different_types(workbook):
+    kinds = [{col: stream_convert.column_kind(chunk[col]) for col in chunk}
+             for chunk in stream_convert.iter_chunks(workbook, chunk_size=CHUNK_SIZE)]
+    assert [kind['late'] for kind in kinds] == [None, 'int', 'int']
+    assert [kind['frac'] for kind in kinds] == ['int', 'int', 'float']
+    assert [kind['mixed'] for kind in kinds] == ['int', 'int', 'string']
+
+
+def test_parquet_schema_is_widened(workbook, tmp_path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    output = str(tmp_path / 'samples.parquet')
+    assert stream_convert.convert(workbook, output, chunk_size=CHUNK_SIZE) == ROWS
+    parquet = pq.ParquetFile(output)
+    assert parquet.num_row_groups == ROWS // CHUNK_SIZE
+    schema = parquet.schema_arrow
+    assert (schema.field('late').type, schema.field('frac').type) == (pa.int64(), pa.float64())
+    assert (schema.field('nan_int').type, schema.field('mixed').type) == (pa.int64(), pa.string())
+    assert pa.types.is_timestamp(schema.field('when').type)
+
+    df = parquet.read().to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+    want = expected()
+    for col in ('late', 'nan_int'):
+        assert df[col].tolist() == pd.array(want[col], dtype='Int64').tolist()
+    assert df['frac'].tolist() == want['frac'].tolist()
+    assert df['mixed'].tolist() == want['mixed'].tolist()
+    assert df['when'].tolist() == [pd.Timestamp(2024, 1, 1 + i) for i in range(ROWS)]
+    # 临时文件已替换为输出文件
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['samples.parquet', 'samples.xlsx']
+
+
+def test_csv_keeps_integers_in_chunks_with_missing_values(workbook, tmp_path):
+    output = tmp_path / 'samples.csv'
+    stream_convert.convert(workbook, str(output), chunk_size=CHUNK_SIZE)
+    lines = output.read_text(encoding='utf-8').splitlines()
+    assert lines[0] == 'late,frac,nan_int,mixed,when'
+    assert lines[1 + 6].split(',')[:4] == ['6', '6', '', '6']
+    assert lines[1 + 5].split(',')[:4] == ['5', '5', '5', '5']
+    df = pd.read_csv(output, dtype={'mixed': str})
+    want = expected()
+    assert df['late'].isna().sum() == CHUNK_SIZE
+    assert df['frac'].tolist() == want['frac'].tolist()
+    assert df['mixed'].tolist() == want['mixed'].tolist()
+
+
+@pytest.mark.parametrize('old, new, kind', [
+    (None, 'int', 'int'), ('int', None, 'int'), ('int', 'float', 'float'),
+    ('float', 'int', 'float'), ('int', 'string', 'string'), ('datetime', 'int', 'string'),
+])
+def test_promote_kind(old, new, kind):
+    assert stream_convert.promote_kind(old, new) == kind
@@ -0,0 +1,103 @@
+"""streaming_stats 的分块/并行统计与 pandas 整表统计一致"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import streaming_stats
+
+
+@pytest.fixture
+def mixed_csv(tmp_path):
+    """数值列、分类列、先数值后文字的列、前几个块全为缺失值的列"""
+    rng = np.random.default_rng(0)
+    rows = 500
+    df = pd.DataFrame({
+        'age': rng.normal(40, 12, rows).round(1),
+        'city': rng.choice(['Macau', 'Taipa', 'Coloane'], rows),
+        'code': list(range(rows - 50)) + ['unknown'] * 50,
+        'late': [None] * 120 + list(rng.choice(['a', 'b'], rows - 120)),
+    })
+    df.loc[::37, 'age'] = np.nan
+    path = tmp_path / 'mixed.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_profile_matches_pandas(mixed_csv, workers):
+    whole = pd.read_csv(mixed_csv)
+    result = streaming_stats.profile_sample(mixed_csv, chunk_size=50, workers=workers).result()
+    assert result['rows'] == len(whole)
+
+    stats, expected = result['numeric']['age'], whole['age'].describe()
+    assert stats['count'] == expected['count']
+    assert stats['missing'] == whole['age'].isna().sum()
+    assert stats['mean'] == pytest.approx(expected['mean'], rel=1e-12)
+    assert stats['std'] == pytest.approx(expected['std'], rel=1e-12)
+    assert (stats['min'], stats['max']) == (expected['min'], expected['max'])
+    # KLL 分位数有秩误差：结果应落在真实分位数附近
+    for key, q in (('25%', 0.25), ('50%', 0.5), ('75%', 0.75)):
+        low, high = whole['age'].quantile([q - 0.05, q + 0.05])
+        assert low <= stats[key] <= high
+
+    for col in ('city', 'code', 'late'):
+        stats = result['categorical'][col]
+        counts = whole[col].dropna().astype(str).value_counts()
+        assert stats['values'] == counts.to_dict()
+        assert stats['count'] == counts.sum()
+        assert stats['missing'] == whole[col].isna().sum()
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_type_decided_by_first_non_null_chunk(tmp_path, workers):
+    path = tmp_path / 'late.csv'
+    pd.DataFrame({'late': [None] * 10 + ['a', 'b'] * 5}).to_csv(path, index=False)
+    result = streaming_stats.profile_sample(str(path), chunk_size=10, workers=workers).result()
+    assert 'late' not in result['numeric']
+    assert result['categorical']['late'] == {'count': 10, 'unique': 2, 'missing': 10, 'values': {'a': 5, 'b': 5}}
+
+
+def test_numeric_column_switches_to_categorical():
+    profile = streaming_stats.SampleProfile()
+    profile.update(pd.DataFrame({'code': [1, 2, 2, None]}))
+    profile.update(pd.DataFrame({'code': ['x', 'x', 'y']}))
+    assert profile.result()['categorical']['code'] == {
+        'count': 6, 'unique': 4, 'missing': 1, 'values': {'2.0': 2, 'x': 2, '1.0': 1, 'y': 1}}
+
+
+def test_merge_mismatched_types():
+    def part(values):
+        return streaming_stats.SampleProfile().update(pd.DataFrame({'code': values}))
+
+    for first, second in (([1, 1, 3], ['x', None]), (['x', None], [1, 1, 3])):
+        merged = streaming_stats.SampleProfile()
+        merged.merge(part(first)).merge(part([None, None])).merge(part(second))
+        assert merged.result()['categorical']['code'] == {
+            'count': 4, 'unique': 3, 'missing': 3, 'values': {'1': 2, '3': 1, 'x': 1}}
+
+
+def test_too_many_values_counted_as_other(monkeypatch):
+    monkeypatch.setattr(streaming_stats, 'DISTINCT_LIMIT', 5)
+    profile = streaming_stats.SampleProfile()
+    profile.update(pd.DataFrame({'code': range(10)}))
+    profile.update(pd.DataFrame({'code': ['x']}))
+    stats = profile.result()['categorical']['code']
+    assert (stats['count'], stats['other'], stats['values']) == (11, 10, {'x': 1})
+
+
+def test_chan_merge_accuracy():
+    """大偏移、差异很大的数据块合并后，均值与方差仍与一次性计算一致"""
+    rng = np.random.default_rng(1)
+    parts = [rng.normal(1e9, 1, 1000), rng.normal(1e9 + 5, 0.01, 7), rng.normal(1e9 - 3, 100, 3000)]
+    merged = streaming_stats.NumericAccumulator()
+    for part in parts:
+        chunk = streaming_stats.NumericAccumulator()
+        chunk.update(pd.Series(part))
+        merged.merge(chunk)
+    values = np.concatenate(parts)
+    stats = merged.result()
+    assert stats['count'] == len(values)
+    assert stats['mean'] == pytest.approx(values.mean(), rel=1e-15, abs=1e-6)
+    assert stats['std'] == pytest.approx(values.std(ddof=1), rel=1e-9)
+    assert (stats['min'], stats['max']) == (values.min(), values.max())
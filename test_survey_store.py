@@ -0,0 +1,74 @@
+"""survey_store 按任意顺序导入年份后，变化列都相对实际的上一年"""
+
+import pandas as pd
+import pytest
+
+import survey_store
+from content_hash import file_digest
+from survey_tables import COLUMNS
+
+# 年份 -> (男, 女) 的上网人数
+VALUES = {2022: (100.0, 80.0), 2023: (110.0, 100.0), 2024: (121.0, 90.0)}
+
+
+def yearly_table(year):
+    male, female = VALUES[year]
+    rows = [(3, year, '上网情况', '千人', '性别', category, '', '上网人数', '男女', value)
+            for category, value in (('男', male), ('女', female))]
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    # 先导入最新一年，再补入更早的年份
+    path = str(tmp_path / 'store')
+    for year in (2024, 2022, 2023):
+        assert survey_store.ingest_tables(yearly_table(year), f'SC_UTI_FR_{year}_Y.xls', str(year), path) == [year]
+    return path
+
+
+def test_each_year_compares_with_the_year_before(store_dir):
+    store = survey_store.load_store(store_dir)
+    assert survey_store.store_years(store) == [2022, 2023, 2024]
+    rows = store.xs((3, '性别', '', '上网人数', '男女'), level=['table', 'dimension', 'group', 'indicator', 'sex'])
+    male = rows.xs('男', level='category')
+    assert male['previous_year'].tolist()[1:] == [2022, 2023]
+    assert pd.isna(male['previous_year'].iloc[0])
+    assert male['delta'].tolist()[1:] == [10.0, 11.0]
+    assert male['growth'].tolist()[1:] == pytest.approx([0.1, 0.1])
+
+    female = rows.xs('女', level='category')
+    assert female['delta'].tolist()[1:] == [20.0, -10.0]
+    assert female['growth'].tolist()[1:] == pytest.approx([0.25, -0.1])
+
+
+def test_trend_and_latest_changes(store_dir):
+    store = survey_store.load_store(store_dir)
+    trend = survey_store.trend_series(store, 3, '上网人数', '性别', ['男', '女'])
+    assert trend['value'].index.tolist() == [2022, 2023, 2024]
+    assert trend['value']['女'].tolist() == [80.0, 100.0, 90.0]
+
+    year, previous, changes = survey_store.latest_changes(store, 3, '上网人数', '性别')
+    assert (year, previous) == (2024, 2023)
+    assert changes.index.tolist() == ['男', '女']
+    assert changes.loc['女', 'delta'] == -10.0
+
+
+def test_reingesting_a_year_updates_the_following_year(store_dir):
+    table = yearly_table(2023)
+    table['value'] = [100.0, 100.0]
+    survey_store.ingest_tables(table, 'SC_UTI_FR_2023_Y.xls', 'fixed', store_dir)
+    store = survey_store.load_store(store_dir)
+    male = store.xs((3, '性别', '男', '', '上网人数', '男女'),
+                    level=['table', 'dimension', 'category', 'group', 'indicator', 'sex'])
+    assert male['delta'].tolist()[1:] == [0.0, 21.0]
+    assert survey_store.load_manifest(store_dir)['partitions']['2023']['sha256'] == 'fixed'
+
+
+def test_ingest_skips_a_workbook_already_in_the_manifest(store_dir, tmp_path, monkeypatch):
+    workbook = tmp_path / 'SC_UTI_FR_2023_Y.xls'
+    workbook.write_bytes(b'workbook')
+    monkeypatch.setattr(survey_store, 'parse_workbook', lambda path: yearly_table(2023))
+    assert survey_store.ingest(str(workbook), store_dir) == [2023]
+    assert survey_store.load_manifest(store_dir)['partitions']['2023']['sha256'] == file_digest(str(workbook))
+    assert survey_store.ingest(str(workbook), store_dir) == []
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+回调请求的采集与回放。
+
+采集：在 Flask 服务器上注册请求钩子，把 /_dash-update-component 请求
+（请求体、耗时、状态码、响应大小）按采样率追加到 JSONL 文件，文件达到
+上限后轮转。通过环境变量开启（app.py 启动时调用 install_from_env）：
+
+    CAPTURE_CALLBACKS=captures/callbacks-{pid}.jsonl   # 开启采集；{pid} 使每个 worker 写自己的文件
+    CAPTURE_SAMPLE_RATE=0.1                            # 采样率，默认 1
+    CAPTURE_MAX_BYTES=52428800  CAPTURE_BACKUPS=5      # 单个文件上限与保留的轮转文件数
+
+回放：按原始时间间隔（或 --speed 倍速）把采集的请求重新发给本地服务，
+报告每个回调的延迟与响应大小的变化，用真实的筛选状态分布评估缓存或优化：
+
+    python traffic_capture.py 'captures/*.jsonl*' --url http://127.0.0.1:8050 --speed 10
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
+
+import numpy as np
+from flask import g, request
+
+from warmup import is_warmup_request
+
+CAPTURE_PATH = 'captures/callbacks-{pid}.jsonl'
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+UPDATE_PATH = '_dash-update-component'
+
+
+def _capture_logger(path, max_bytes, backups):
+    """每个文件一个独立的 logger，消息原样写为一行 JSON"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    logger = logging.getLogger(f'traffic_capture.{path}')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if not logger.handlers:
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    return logger
+
+
+def install_capture(server, path=CAPTURE_PATH, sample_rate=1.0, max_bytes=DEFAULT_MAX_BYTES,
+                    backups=DEFAULT_BACKUPS):
+    """在 Flask 服务器上注册采集钩子"""
+    state = {'logger': None, 'pid': None}
+    lock = threading.Lock()
+
+    def logger():
+        # gunicorn 在 fork 之后才处理请求，按当前进程号打开文件
+        with lock:
+            if state['pid'] != os.getpid():
+                state['logger'] = _capture_logger(path.format(pid=os.getpid()), max_bytes, backups)
+                state['pid'] = os.getpid()
+            return state['logger']
+
+    @server.before_request
+    def _start_capture():
+        if request.path.endswith(UPDATE_PATH) and not is_warmup_request(request) \
+                and random.random() < sample_rate:
+            g.capture_start = time.perf_counter()
+
+    @server.after_request
+    def _finish_capture(response):
+        start = g.pop('capture_start', None)
+        if start is None:
+            return response
+        body = request.get_json(silent=True) or {}
+        logger().info(json.dumps({
+            'ts': time.time(),
+            'output': body.get('output'),
+            'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+            'status': response.status_code,
+            'response_bytes': response.calculate_content_length(),
+            'request': body,
+        }, ensure_ascii=False, separators=(',', ':')))
+        return response
+
+    return server
+
+
+def install_from_env(server, environ=os.environ):
+    """CAPTURE_CALLBACKS 设置时开启采集，返回是否已开启"""
+    path = environ.get('CAPTURE_CALLBACKS')
+    if not path:
+        return False
+    if path in ('1', 'true', 'yes'):
+        path = CAPTURE_PATH
+    install_capture(server, path,
+                    sample_rate=float(environ.get('CAPTURE_SAMPLE_RATE', 1.0)),
+                    max_bytes=int(environ.get('CAPTURE_MAX_BYTES', DEFAULT_MAX_BYTES)),
+                    backups=int(environ.get('CAPTURE_BACKUPS', DEFAULT_BACKUPS)))
+    print(f"Callback capture enabled: {path}")
+    return True
+
+
+def load_capture(paths):
+    """读取一个或多个采集文件（含轮转文件），按时间排序"""
+    entries = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entries.append(json.loads(line))
+    entries.sort(key=lambda entry: entry['ts'])
+    return entries
+
+
+def replay(entries, base_url, speed=1.0, concurrency=8):
+    """
+    按采集的时间间隔重发请求，返回 ({回调: 统计}, 用时秒数)。
+
+    speed 为时间压缩倍数，0 表示不等待、尽快发送；
+    同时在途的请求最多 concurrency 个。
+    """
+    from dash_session import SessionPlan
+    from loadtest import Client
+
+    local = threading.local()
+    lock = threading.Lock()
+    stats = defaultdict(lambda: {'latency': [], 'captured': [], 'bytes_changed': 0, 'errors': 0})
+
+    def send(entry):
+        if not hasattr(local, 'client'):
+            local.client = Client(base_url)
+        start = time.perf_counter()
+        try:
+            status, content = local.client.request('POST', '/' + UPDATE_PATH, entry['request'])
+        except OSError:
+            status, content = None, b''
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            row = stats[SessionPlan.label(entry['request']) if entry['request'].get('output') else '?']
+            row['latency'].append(elapsed)
+            row['captured'].append(entry.get('duration_ms') or 0)
+            if status != entry.get('status'):
+                row['errors'] += 1
+            elif entry.get('response_bytes') is not None and len(content) != entry['response_bytes']:
+                row['bytes_changed'] += 1
+
+    start, first = time.perf_counter(), entries[0]['ts'] if entries else 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for entry in entries:
+            if speed:
+                delay = (entry['ts'] - first) / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(send, entry)
+    elapsed = time.perf_counter() - start
+
+    summary = {}
+    for output, row in sorted(stats.items()):
+        p50, p95, p99 = np.percentile(row['latency'], [50, 95, 99])
+        summary[output] = {
+            'requests': len(row['latency']),
+            'p50_ms': round(float(p50), 1),
+            'p95_ms': round(float(p95), 1),
+            'p99_ms': round(float(p99), 1),
+            'captured_p50_ms': round(float(np.percentile(row['captured'], 50)), 1),
+            'status_mismatch': row['errors'],
+            'bytes_changed': row['bytes_changed'],
+        }
+    return summary, elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='回放采集的回调请求')
+    parser.add_argument('paths', nargs='+', help='采集文件（支持通配符）')
+    parser.add_argument('--url', default='http://127.0.0.1:8050', help='目标服务')
+    parser.add_argument('--speed', type=float, default=1.0, help='回放倍速，0 表示尽快发送')
+    parser.add_argument('--concurrency', type=int, default=8, help='同时在途的请求数')
+    parser.add_argument('--output', default=None, help='把结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    paths = sorted({path for pattern in args.paths for path in glob.glob(pattern)})
+    entries = load_capture(paths)
+    if not entries:
+        parser.error("采集文件中没有请求")
+    span = entries[-1]['ts'] - entries[0]['ts']
+    print(f"回放 {len(entries)} 个请求（来自 {len(paths)} 个文件，原始时长 {span:.0f}s）-> {args.url}")
+
+    summary, elapsed = replay(entries, args.url, args.speed, args.concurrency)
+    print(f"用时 {elapsed:.1f}s，{len(entries) / max(elapsed, 1e-9):.1f} req/s")
+    print(f"  {'回调':<42}{'次数':>6}{'p50':>8}{'p95':>8}{'原p50':>8}{'状态不同':>8}{'大小变化':>8}")
+    for output, row in summary.items():
+        print(f"  {output:<42}{row['requests']:>6}{row['p50_ms']:>8.0f}{row['p95_ms']:>8.0f}"
+              f"{row['captured_p50_ms']:>8.0f}{row['status_mismatch']:>8}{row['bytes_changed']:>8}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.output}")
@@ -41,6 +41,14 @@ for col in df.columns:
 
 df = df.rename(columns=clean_columns)
 
+
+def usage_values(frame, variable):
+    """点阵图与箱线图的变量取值；数据中没有 computer 列，用手提或桌面电脑任一为 1 表示"""
+    if variable == 'computer':
+        return frame[['laptop_computer', 'desktop_computer']].max(axis=1)
+    return frame[variable]
+
+
 # 读取分析数据（用于词云等功能）
 try:
     with open('viz_data.json', 'r', encoding='utf-8') as f:
@@ -106,9 +114,8 @@ app.layout = html.Div([
                     {'label': '移动电话使用', 'value': 'mobile_phone'},
                     {'label': '电脑使用', 'value': 'computer'},
                     {'label': '平板电脑使用', 'value': 'tablet'},
-                    {'label': '智能电视使用', 'value': 'smart_tv'},
-                    {'label': '社交媒体使用', 'value': 'social_media'},
-                    {'label': '在线购物', 'value': 'online_shopping'}
+                    {'label': '社交媒体使用', 'value': 'communication_social_platforms'},
+                    {'label': '在线购物', 'value': 'purchase_goods_services'}
                 ],
                 value='mobile_phone'
             )
@@ -177,7 +184,7 @@ def update_scatter_plot(selected_ages, selected_genders, selected_internet):
         age_data = filtered_df[filtered_df['age_group'] == age_group]
         fig.add_trace(go.Scatter(
             x=age_data['mobile_phone'] + np.random.normal(0, 0.1, len(age_data)),  # 添加随机噪声
-            y=age_data['computer'] + np.random.normal(0, 0.1, len(age_data)),
+            y=usage_values(age_data, 'computer') + np.random.normal(0, 0.1, len(age_data)),
             mode='markers',
             name=f'年龄: {age_group}',
             marker=dict(
@@ -231,7 +238,7 @@ def update_box_dot_plot(selected_variable, selected_ages, selected_genders):
     fig.add_trace(
         go.Box(
             x=age_filtered['age_group'],
-            y=age_filtered[selected_variable],
+            y=usage_values(age_filtered, selected_variable),
             name='年龄组分布',
             marker_color='lightblue',
             boxmean=True
@@ -246,7 +253,7 @@ def update_box_dot_plot(selected_variable, selected_ages, selected_genders):
             fig.add_trace(
                 go.Scatter(
                     x=[age] * len(age_data),
-                    y=age_data[selected_variable] + np.random.normal(0, 0.05, len(age_data)),
+                    y=usage_values(age_data, selected_variable) + np.random.normal(0, 0.05, len(age_data)),
                     mode='markers',
                     marker=dict(size=4, color='rgba(255, 0, 0, 0.6)'),
                     showlegend=False,
@@ -259,7 +266,7 @@ def update_box_dot_plot(selected_variable, selected_ages, selected_genders):
     fig.add_trace(
         go.Box(
             x=filtered_df['gender'],
-            y=filtered_df[selected_variable],
+            y=usage_values(filtered_df, selected_variable),
             name='性别分布',
             marker_color='lightgreen',
             boxmean=True
@@ -273,7 +280,7 @@ def update_box_dot_plot(selected_variable, selected_ages, selected_genders):
         fig.add_trace(
             go.Scatter(
                 x=[gender] * len(gender_data),
-                y=gender_data[selected_variable] + np.random.normal(0, 0.05, len(gender_data)),
+                y=usage_values(gender_data, selected_variable) + np.random.normal(0, 0.05, len(gender_data)),
                 mode='markers',
                 marker=dict(size=4, color='rgba(255, 0, 0, 0.6)'),
                 showlegend=False,
@@ -286,9 +293,8 @@ def update_box_dot_plot(selected_variable, selected_ages, selected_genders):
         'mobile_phone': '移动电话使用',
         'computer': '电脑使用',
         'tablet': '平板电脑使用',
-        'smart_tv': '智能电视使用',
-        'social_media': '社交媒体使用',
-        'online_shopping': '在线购物'
+        'communication_social_platforms': '社交媒体使用',
+        'purchase_goods_services': '在线购物'
     }
 
     fig.update_layout(
@@ -393,11 +399,9 @@ def update_wordcloud(selected_ages, selected_genders):
         if len(word) >= 2:
             keyword_counts[word] = keyword_counts.get(word, 0) + 1
 
-    # 生成词云文本
-    text = ' '.join([word * count for word, count in keyword_counts.items()])
-
-    if not text.strip():
-        text = '澳门 ICT 技术 使用 分析 数据 可视化'
+    # 按词频生成词云；把词重复 count 次拼成一个长词会超出画布，导致 WordCloud 报错
+    if not keyword_counts:
+        keyword_counts = {word: 1 for word in ['澳门', 'ICT', '技术', '使用', '分析', '数据', '可视化']}
 
     # 生成词云
     try:
@@ -411,7 +415,7 @@ def update_wordcloud(selected_ages, selected_genders):
             contour_width=0,
             contour_color='steelblue',
             prefer_horizontal=0.8
-        ).generate(text)
+        ).generate_from_frequencies(keyword_counts)
     except:
         # 如果中文字体不可用，使用默认字体
         wordcloud = WordCloud(
@@ -423,7 +427,7 @@ def update_wordcloud(selected_ages, selected_genders):
             contour_width=0,
             contour_color='steelblue',
             prefer_horizontal=0.8
-        ).generate(text)
+        ).generate_from_frequencies(keyword_counts)
 
     # 转换为base64图片
     plt.figure(figsize=(4, 2.5))
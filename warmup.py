@@ -0,0 +1,146 @@
+"""
+worker 启动后的缓存预热与就绪检查。
+
+预热通过 Flask 测试客户端发出与浏览器相同的回调请求，让结果进入 callback_cache，
+涵盖：
+- 页面初次加载的全部回调；
+- 每个按钮点击后的状态；
+- 第六章筛选器的常见状态：设置 WARMUP_CAPTURE 时取采集日志（traffic_capture.py）
+  中出现次数最多的 WARMUP_TOP 个请求，否则取每个筛选器单选一项的状态。
+
+/ready 在预热完成前返回 503，完成后返回 200，负载均衡据此只把流量发给已预热的 worker。
+预热本身出错（如布局请求失败）时状态为 failed，/ready 继续返回 503，响应中带 error。
+预热请求带 X-Warmup 头，不计入回调指标、采集日志和请求分析。
+
+环境变量：
+    WARMUP=0                 不预热（/ready 直接返回 200）
+    WARMUP_CAPTURE='captures/*.jsonl*'
+    WARMUP_TOP=50
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+from flask import jsonify
+
+from dash_session import SessionPlan
+
+WARMUP_HEADER = 'X-Warmup'
+DEFAULT_TOP = 50
+UPDATE_PATH = '/_dash-update-component'
+
+# idle：没有安排预热（如本地开发）；warming：进行中；ready：已完成；failed：预热出错
+# failed 为返回错误状态码的预热请求数，error 为中断预热的异常
+state = {'status': 'idle', 'requests': 0, 'failed': 0, 'total': 0, 'seconds': None, 'error': None}
+
+
+def is_warmup_request(request):
+    return WARMUP_HEADER in request.headers
+
+
+def _request_key(body):
+    """采集日志中的同一状态：同一输出、同样的输入值与触发的输入"""
+    inputs = [item.get('value') for item in body.get('inputs', [])]
+    return json.dumps([body.get('output'), inputs, sorted(body.get('changedPropIds', []))],
+                      sort_keys=True, default=str)
+
+
+def captured_requests(paths, top=DEFAULT_TOP):
+    """采集日志中出现次数最多的 top 个回调请求"""
+    from traffic_capture import load_capture
+
+    counts, bodies = Counter(), {}
+    for entry in load_capture(paths):
+        if entry.get('status') != 200 or not entry.get('request'):
+            continue
+        key = _request_key(entry['request'])
+        counts[key] += 1
+        bodies.setdefault(key, entry['request'])
+    return [bodies[key] for key, _ in counts.most_common(top)]
+
+
+def default_requests(plan):
+    """初次加载、每个按钮、每个筛选器单选一项"""
+    bodies = [body for _, body in plan.initial_burst()]
+    changes = [((button, 'n_clicks'), 1) for button in plan.buttons]
+    for component_id in plan.filters:
+        for option in plan.props[component_id]['options']:
+            changes.append(((component_id, 'value'), [option['value'] if isinstance(option, dict) else option]))
+    for key, value in changes:
+        for dep in plan.callbacks:
+            if any((item['id'], item['property']) == key for item in dep['inputs']):
+                bodies.append(plan.payload(dep, {key: value}, [f'{key[0]}.{key[1]}']))
+    return bodies
+
+
+def run_warmup(server, capture_paths=None, top=DEFAULT_TOP):
+    """依次发出预热请求，更新 state；预热出错时记录为 failed 并返回 False"""
+    state.update(status='warming', requests=0, failed=0, total=0, seconds=None, error=None)
+    start = time.perf_counter()
+    headers = {WARMUP_HEADER: '1'}
+    client = server.test_client()
+    try:
+        layout = client.get('/_dash-layout', headers=headers).get_json()
+        dependencies = client.get('/_dash-dependencies', headers=headers).get_json()
+        bodies = default_requests(SessionPlan(layout, dependencies))
+        if capture_paths:
+            bodies += captured_requests(capture_paths, top)
+        state['total'] = len(bodies)
+        for body in bodies:
+            response = client.post(UPDATE_PATH, json=body, headers=headers)
+            state['requests'] += 1
+            # 204 为 PreventUpdate，属于正常结果
+            if response.status_code not in (200, 204):
+                state['failed'] += 1
+    except Exception as e:
+        state.update(status='failed', error=f'{type(e).__name__}: {e}',
+                     seconds=round(time.perf_counter() - start, 2))
+        print(f"Warm-up failed (pid {os.getpid()}) after {state['requests']} requests: {state['error']}",
+              flush=True)
+        return False
+    state.update(status='ready', seconds=round(time.perf_counter() - start, 2))
+    print(f"Warm-up finished (pid {os.getpid()}): {state['requests']} requests, "
+          f"{state['failed']} failed, {state['seconds']}s", flush=True)
+    return True
+
+
+def start(server, capture_paths=None, top=DEFAULT_TOP):
+    """在后台线程中预热，立即返回；/ready 在此之后返回 503 直到完成"""
+    state['status'] = 'warming'
+    thread = threading.Thread(target=run_warmup, args=(server, capture_paths, top),
+                              name='warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def warm_from_env(server, background=True, environ=os.environ):
+    """
+    按环境变量预热，WARMUP=0 时跳过，返回是否已预热（或已开始预热）。
+
+    gunicorn.conf.py 在主进程 fork 前同步调用一次（缓存随 fork 共享给所有 worker），
+    每个 worker 启动后再在后台调用一次（此时大多直接命中）。
+    """
+    if environ.get('WARMUP') in ('0', 'false', 'no'):
+        return False
+    pattern = environ.get('WARMUP_CAPTURE')
+    paths = sorted(glob.glob(pattern)) if pattern else None
+    top = int(environ.get('WARMUP_TOP', DEFAULT_TOP))
+    if background:
+        start(server, paths, top)
+    else:
+        run_warmup(server, paths, top)
+    return True
+
+
+def install_ready(server):
+    """注册 /ready"""
+
+    @server.route('/ready')
+    def ready():
+        return jsonify(state), 503 if state['status'] in ('warming', 'failed') else 200
+
+    return server